@@ -1,50 +1,251 @@
 # backend/api_helper.py
 import os
 import json
-from typing import Dict, Optional
-from openai import OpenAI
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
+from backend.instrumentation import profiler
+
 load_dotenv()
 
-def analyze_with_openai(feedback_data: Dict) -> Dict:
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_TOKENS = 800
+DEFAULT_TIMEOUT = 60.0   # seconds per request
+DEFAULT_MAX_RETRIES = 3  # retried with exponential backoff by the OpenAI client
+
+SYSTEM_PROMPT = "You are an expert volleyball coach specializing in biomechanical analysis of serve technique. Provide specific, actionable feedback based on the data provided."
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'spikesight', 'coaching')
+
+# Concurrent requests in analyze_batch
+DEFAULT_CONCURRENCY = 8
+
+
+class ResponseCache:
+    """Coaching responses on disk, one JSON file per request key"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.getenv('SPIKESIGHT_AI_CACHE_DIR') or DEFAULT_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)['text']
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, text: str, model: str) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'model': model, 'created_at': datetime.now().isoformat(timespec='seconds'), 'text': text}, f)
+        os.replace(tmp_path, path)
+
+
+class CoachingClient:
+    """
+    Long-lived OpenAI client for coaching feedback.
+
+    The underlying HTTP connection pool is reused across requests, every request
+    has a timeout and is retried with exponential backoff, and responses are cached
+    on disk by a hash of the prompt, model and sampling settings, so re-analyzing
+    an unchanged clip makes no network call. base_url (or OPENAI_BASE_URL) can
+    point the client at any OpenAI compatible server, e.g. a local stand-in.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, cache: Optional[ResponseCache] = None,
+                 use_cache: bool = True):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL')
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = (cache or ResponseCache()) if use_cache else None
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> OpenAI:
+        """The OpenAI client, created on first use and then reused"""
+        with self._lock:
+            if self._client is None:
+                self._client = OpenAI(api_key=self.api_key, base_url=self.base_url,
+                                      timeout=self.timeout, max_retries=self.max_retries)
+            return self._client
+
+    def warm_up(self) -> None:
+        """Build the client ahead of the first request (it takes a noticeable fraction of a second)"""
+        if self.api_key:
+            self.client.chat.completions
+
+    def messages(self, prompt: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+    def cache_key(self, prompt: str) -> str:
+        request = json.dumps([self.model, self.temperature, self.max_tokens, SYSTEM_PROMPT, prompt])
+        return hashlib.sha256(request.encode()).hexdigest()[:32]
+
+    def cached(self, prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_key(prompt))
+
+    def complete(self, prompt: str) -> str:
+        """Coaching text for a prompt, from the cache or a (retried) API request"""
+        text = self.cached(prompt)
+        if text is not None:
+            return text
+        if not self.api_key:
+            raise RuntimeError("No OpenAI API key found in environment variables")
+
+        start = profiler.start()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        profiler.stop('openai', start)
+
+        text = response.choices[0].message.content
+        if self.cache is not None and text:
+            self.cache.put(self.cache_key(prompt), text, self.model)
+        return text
+
+    def stream(self, prompt: str, should_stop: Optional[Callable[[], bool]] = None) -> Iterator[str]:
+        """
+        Yield coaching text as it arrives. A cached response is yielded in one piece.
+        The request is abandoned (and nothing is cached) once should_stop() is true.
+        """
+        text = self.cached(prompt)
+        if text is not None:
+            yield text
+            return
+        if not self.api_key:
+            raise RuntimeError("No OpenAI API key found in environment variables")
+
+        start = profiler.start()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True
+        )
+        parts = []
+        try:
+            for chunk in response:
+                if should_stop is not None and should_stop():
+                    return
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not parts:
+                        profiler.stop('openai_first_token', start)
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # Drops the connection if the stream was abandoned part way
+            response.response.close()
+        profiler.stop('openai', start)
+
+        text = ''.join(parts)
+        if self.cache is not None and text:
+            self.cache.put(self.cache_key(prompt), text, self.model)
+
+    def async_client(self) -> AsyncOpenAI:
+        """A new AsyncOpenAI client with the same settings (bound to the running event loop)"""
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                           timeout=self.timeout, max_retries=self.max_retries)
+
+    def estimate_tokens(self, prompt: str) -> int:
+        """Rough upper bound on the tokens a request uses, for rate limiting"""
+        return (len(SYSTEM_PROMPT) + len(prompt)) // 4 + self.max_tokens
+
+    async def complete_async(self, async_client: AsyncOpenAI, prompt: str) -> str:
+        """Async complete(); the caller owns async_client"""
+        text = self.cached(prompt)
+        if text is not None:
+            return text
+        if not self.api_key:
+            raise RuntimeError("No OpenAI API key found in environment variables")
+
+        start = profiler.start()
+        response = await async_client.chat.completions.create(
+            model=self.model,
+            messages=self.messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        profiler.stop('openai', start)
+
+        text = response.choices[0].message.content
+        if self.cache is not None and text:
+            self.cache.put(self.cache_key(prompt), text, self.model)
+        return text
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_coaching_client() -> CoachingClient:
+    """Process-wide CoachingClient, so connections and settings are shared"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = CoachingClient()
+        return _shared_client
+
+
+def analyze_with_openai(feedback_data: Dict, client: Optional[CoachingClient] = None) -> Dict:
     """
     Send analysis data directly to OpenAI for AI coaching feedback
     
     Args:
         feedback_data: The feedback dict from AnalysisEngine with frame_data
+        client: CoachingClient to use (default: the shared one)
         
     Returns:
         Enhanced feedback with AI insights
     """
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
+    client = client or get_coaching_client()
+    prompt = build_analysis_prompt(feedback_data)
+
+    # A cached answer needs neither an API key nor the network
+    if client.cached(prompt) is None and not client.api_key:
         print("No OpenAI API key found in environment variables")
         feedback_data['ai_enabled'] = False
         return feedback_data
     
     try:
-        client = OpenAI(api_key=api_key)
-        prompt = build_analysis_prompt(feedback_data)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert volleyball coach specializing in biomechanical analysis of serve technique. Provide specific, actionable feedback based on the data provided."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        ai_feedback = response.choices[0].message.content
-        feedback_data['ai_analysis'] = ai_feedback
+        feedback_data['ai_analysis'] = client.complete(prompt)
         feedback_data['ai_enabled'] = True
         
         return feedback_data
@@ -55,6 +256,110 @@ def analyze_with_openai(feedback_data: Dict) -> Dict:
         return feedback_data
 
 
+def stream_openai_analysis(feedback_data: Dict, should_stop: Optional[Callable[[], bool]] = None,
+                           client: Optional[CoachingClient] = None) -> Iterator[str]:
+    """
+    Streaming version of analyze_with_openai: yields the coaching text in pieces
+    as it arrives. Yields nothing if there is no API key and no cached answer.
+    """
+    client = client or get_coaching_client()
+    prompt = build_analysis_prompt(feedback_data)
+    if client.cached(prompt) is None and not client.api_key:
+        print("No OpenAI API key found in environment variables")
+        return
+    yield from client.stream(prompt, should_stop)
+
+
+class RateLimiter:
+    """Sliding one-minute window on requests and tokens for asyncio code"""
+
+    WINDOW = 60.0
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._sent = deque()  # (time, tokens) of requests in the window
+        self._tokens = 0
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._sent and now - self._sent[0][0] >= self.WINDOW:
+            self._tokens -= self._sent.popleft()[1]
+
+    def _fits(self, tokens: int) -> bool:
+        if self.requests_per_minute and len(self._sent) >= self.requests_per_minute:
+            return False
+        # A single request larger than the budget still goes through on an empty window
+        if self.tokens_per_minute and self._sent and self._tokens + tokens > self.tokens_per_minute:
+            return False
+        return True
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request of this many tokens fits in the window"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if self._fits(tokens):
+                    self._sent.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                await asyncio.sleep(self.WINDOW - (now - self._sent[0][0]))
+
+
+async def analyze_batch_async(feedback_list: List[Dict], client: Optional[CoachingClient] = None,
+                              concurrency: int = DEFAULT_CONCURRENCY,
+                              requests_per_minute: Optional[int] = None,
+                              tokens_per_minute: Optional[int] = None) -> List[Dict]:
+    """
+    analyze_with_openai for many feedback dicts at once.
+
+    Identical prompts are sent once. At most `concurrency` requests are in flight
+    and the optional per-minute limits are respected. Each dict gets 'ai_analysis'
+    and 'ai_enabled' as in analyze_with_openai (plus 'ai_error' when its request
+    failed), and the dicts are returned in input order.
+    """
+    client = client or get_coaching_client()
+    prompts = [build_analysis_prompt(feedback_data) for feedback_data in feedback_list]
+    unique_prompts = list(dict.fromkeys(prompts))
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    async_client = client.async_client()
+
+    async def run(prompt):
+        if client.cached(prompt) is not None:
+            return client.cached(prompt)
+        async with semaphore:
+            await limiter.acquire(client.estimate_tokens(prompt))
+            return await client.complete_async(async_client, prompt)
+
+    try:
+        texts = await asyncio.gather(*(run(prompt) for prompt in unique_prompts), return_exceptions=True)
+    finally:
+        await async_client.close()
+
+    by_prompt = dict(zip(unique_prompts, texts))
+    for feedback_data, prompt in zip(feedback_list, prompts):
+        result = by_prompt[prompt]
+        if isinstance(result, Exception):
+            feedback_data['ai_enabled'] = False
+            feedback_data['ai_error'] = str(result)
+        else:
+            feedback_data['ai_analysis'] = result
+            feedback_data['ai_enabled'] = True
+
+    failed = sum(isinstance(text, Exception) for text in texts)
+    if failed:
+        print(f"OpenAI API error for {failed} of {len(unique_prompts)} unique prompts")
+    return feedback_list
+
+
+def analyze_batch(feedback_list: List[Dict], **kwargs) -> List[Dict]:
+    """Blocking wrapper around analyze_batch_async for scripts and worker threads"""
+    return asyncio.run(analyze_batch_async(feedback_list, **kwargs))
+
+
 def build_analysis_prompt(feedback_data: Dict) -> str:
     """Build detailed prompt with all biomechanical data"""
     
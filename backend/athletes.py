@@ -0,0 +1,34 @@
+# backend/athletes.py
+from backend.serve_analysis import ServeAnalyzer
+
+class MultiAthleteAnalyzer:
+    """
+    One ServeAnalyzer per tracked athlete. Frames arrive tagged with the track ID
+    from vision/multi_athlete.py, and each athlete's serve is analyzed on its own.
+    """
+
+    def __init__(self, min_frames=15, verbose=False):
+        self.analyzers = {}
+        self.min_frames = min_frames  # tracks shorter than this are passers-by, not serves
+        self.verbose = verbose
+
+    def analyzer_for(self, track_id):
+        analyzer = self.analyzers.get(track_id)
+        if analyzer is None:
+            analyzer = self.analyzers[track_id] = ServeAnalyzer(verbose=self.verbose)
+        return analyzer
+
+    def process_frame(self, track_id, pose_frame):
+        self.analyzer_for(track_id).process_frame(pose_frame)
+
+    def generate_feedback(self):
+        """{track_id: feedback with frame_data} for every athlete seen for at least min_frames"""
+        results = {}
+        for track_id, analyzer in sorted(self.analyzers.items()):
+            if analyzer.frame_count < self.min_frames:
+                continue
+            feedback = analyzer.generate_feedback()
+            feedback['title'] = f"Athlete {track_id}: {feedback['title']}"
+            feedback['frame_data'] = analyzer.export_frame_data()
+            results[track_id] = feedback
+        return results
@@ -0,0 +1,289 @@
+# backend/batch.py
+"""
+Headless batch analysis of a directory of serve videos.
+
+Usage:
+    python -m backend.batch <video_dir> [--output DIR] [--workers N] [--recursive] [--ai] [--export]
+
+Each video runs through decode -> MediaPipe -> ServeAnalyzer -> generate_feedback
+in a pool of worker processes (one warm Pose model per worker). A JSON result is
+written per video and an aggregate report.json is rebuilt at the end of every run.
+Videos that already have a result file are skipped, so an interrupted run can be
+resumed by running the same command again. With --ai, AI coaching is requested
+concurrently for every result that does not have it yet. With --export, the
+per-frame metrics and raw landmarks are also saved as a memory-mappable .npz
+session file next to each result (see backend/session_export.py).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from backend.serve_analysis import ServeAnalyzer
+from backend.vectorized_engine import VectorizedAnalyzer
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi')
+REPORT_NAME = 'report.json'
+
+# Landmark cache owned by the current worker process
+_worker_cache = None
+
+def _init_worker(cache_dir=None):
+    """Load the pose model once per worker process"""
+    global _worker_cache
+    from vision.pose_runner import init_worker_pose
+    init_worker_pose()
+    if cache_dir:
+        from vision.landmark_cache import LandmarkCache
+        _worker_cache = LandmarkCache(cache_dir)
+
+def analyze_video(video_path, pose, cache=None, export_path=None):
+    """
+    Run the full analysis pipeline on a single video without Qt.
+    With export_path, the metrics and landmarks are also saved as a session file.
+    """
+    from vision.pose_runner import iter_pose_frames
+
+    records = cache.load(video_path) if cache else None
+    if records is not None:
+        # The whole clip is available up front, so analyze it in one vectorized pass
+        analyzer = VectorizedAnalyzer().analyze(records['landmarks'], records['timestamp'], records['frame'])
+    else:
+        from vision.landmark_cache import to_records
+
+        analyzer = ServeAnalyzer(verbose=False)
+        keep_frames = cache is not None or export_path is not None
+        pose_frames = []
+        for pose_frame in iter_pose_frames(video_path, pose):
+            if keep_frames:
+                pose_frames.append(pose_frame)
+            analyzer.process_frame(pose_frame)
+        if keep_frames:
+            records = to_records(pose_frames)
+        if cache:
+            cache.store_records(video_path, records)
+
+    feedback = feedback_with_frame_data(analyzer)
+    if export_path:
+        from backend.session_export import export_session
+        export_session(export_path, analyzer, records, feedback=feedback, video_path=video_path)
+    return feedback
+
+def json_frame_data(frame_data):
+    """export_frame_data() output in a JSON friendly form"""
+    # Columns are stored as JSON lists rather than one object per frame
+    return dict(frame_data, all_frames={name: column.tolist() for name, column in frame_data['all_frames'].items()})
+
+def feedback_with_frame_data(analyzer):
+    """generate_feedback() plus the exported frame data, in a JSON friendly form"""
+    feedback = analyzer.generate_feedback()
+    feedback['frame_data'] = json_frame_data(analyzer.export_frame_data())
+    return feedback
+
+def _process_job(video_path, export_path=None):
+    from vision.pose_runner import worker_pose
+
+    start = time.perf_counter()
+    try:
+        pose = worker_pose()
+        # Clear the tracker state left over from the previous video
+        pose.reset()
+        feedback = analyze_video(video_path, pose, _worker_cache, export_path)
+    except Exception as e:
+        return {'video': video_path, 'error': str(e)}
+
+    return {
+        'video': video_path,
+        'processed_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': time.perf_counter() - start,
+        'frames_analyzed': feedback['frame_data']['total_frames'],
+        'feedback': feedback,
+    }
+
+def find_videos(video_dir, recursive=False):
+    videos = []
+    for root, dirs, files in os.walk(video_dir):
+        for name in files:
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                videos.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(videos)
+
+def result_path_for(video_path, video_dir, output_dir, extension='.json'):
+    """Map a video to its result file, flattening sub-directories into the name"""
+    relative = os.path.relpath(video_path, video_dir)
+    name = relative.replace(os.sep, '__')
+    return os.path.join(output_dir, name + extension)
+
+def write_json(path, data):
+    """Write JSON atomically so an interrupted run never leaves a partial result"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, default=float)
+    os.replace(tmp_path, path)
+
+def build_report(result_files, failures, run_stats):
+    """Aggregate per-video results into a single report"""
+    serves = []
+    for path in result_files:
+        with open(path) as f:
+            result = json.load(f)
+
+        phases = result['feedback']['frame_data']['phases']
+        trophy = phases.get('trophy_pose', {})
+        contact = phases.get('ball_contact', {})
+        serves.append({
+            'video': result['video'],
+            'result_file': os.path.basename(path),
+            'frames_analyzed': result['frames_analyzed'],
+            'seconds': result['seconds'],
+            'trophy_elbow': trophy.get('elbow_flexion'),
+            'contact_shoulder': contact.get('shoulder_abduction'),
+            'contact_elbow': contact.get('elbow_extension'),
+            'max_velocity': contact.get('max_velocity'),
+            'recommendations': [rec['title'] for rec in result['feedback']['recommendations']],
+        })
+
+    def mean_of(key):
+        values = [s[key] for s in serves if s[key] is not None]
+        return sum(values) / len(values) if values else None
+
+    recommendation_counts = {}
+    for serve in serves:
+        for title in serve['recommendations']:
+            recommendation_counts[title] = recommendation_counts.get(title, 0) + 1
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'run': run_stats,
+        'videos_analyzed': len(serves),
+        'videos_failed': len(failures),
+        'failures': failures,
+        'averages': {
+            'trophy_elbow': mean_of('trophy_elbow'),
+            'contact_shoulder': mean_of('contact_shoulder'),
+            'contact_elbow': mean_of('contact_elbow'),
+            'max_velocity': mean_of('max_velocity'),
+        },
+        'recommendation_counts': recommendation_counts,
+        'serves': serves,
+    }
+
+def add_ai_feedback(result_files, concurrency=8, requests_per_minute=None, tokens_per_minute=None):
+    """Request AI coaching for every result that doesn't have it yet, concurrently"""
+    from backend.api_helper import analyze_batch
+
+    results = {}
+    for path in result_files:
+        with open(path) as f:
+            result = json.load(f)
+        if not result['feedback'].get('ai_enabled'):
+            results[path] = result
+    if not results:
+        return 0
+
+    print(f"Requesting AI feedback for {len(results)} videos")
+    start = time.perf_counter()
+    analyze_batch([result['feedback'] for result in results.values()], concurrency=concurrency,
+                  requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+    for path, result in results.items():
+        write_json(path, result)
+    enabled = sum(1 for result in results.values() if result['feedback'].get('ai_enabled'))
+    print(f"AI feedback for {enabled}/{len(results)} videos in {time.perf_counter() - start:.1f}s")
+    return enabled
+
+def run_batch(video_dir, output_dir, workers=None, recursive=False, cache_dir=None, ai_options=None,
+              export_sessions=False):
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    videos = find_videos(video_dir, recursive)
+    pending = [v for v in videos if not os.path.exists(result_path_for(v, video_dir, output_dir))]
+    print(f"Found {len(videos)} videos, {len(videos) - len(pending)} already done, {len(pending)} to process")
+
+    failures = []
+    frames_processed = 0
+    start = time.perf_counter()
+
+    if pending:
+        # Spawn keeps MediaPipe's native threads out of forked children
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                 mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(cache_dir,)) as pool:
+            futures = [pool.submit(_process_job, video,
+                                   result_path_for(video, video_dir, output_dir, '.npz') if export_sessions else None)
+                       for video in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                if 'error' in result:
+                    failures.append({'video': result['video'], 'error': result['error']})
+                    print(f"[{done}/{len(pending)}] FAILED {result['video']}: {result['error']}")
+                    continue
+
+                write_json(result_path_for(result['video'], video_dir, output_dir), result)
+                frames_processed += result['frames_analyzed']
+                print(f"[{done}/{len(pending)}] {result['video']} ({result['frames_analyzed']} frames, {result['seconds']:.1f}s)")
+
+    elapsed = time.perf_counter() - start
+    run_stats = {
+        'workers': workers,
+        'videos_found': len(videos),
+        'videos_skipped': len(videos) - len(pending),
+        'videos_processed': len(pending) - len(failures),
+        'wall_seconds': elapsed,
+        'frames_per_second': frames_processed / elapsed if elapsed > 0 else 0,
+    }
+
+    result_files = [result_path_for(v, video_dir, output_dir) for v in videos]
+    result_files = [p for p in result_files if os.path.exists(p)]
+    if ai_options is not None:
+        add_ai_feedback(result_files, **ai_options)
+    report = build_report(result_files, failures, run_stats)
+    write_json(os.path.join(output_dir, REPORT_NAME), report)
+
+    print(f"Done in {elapsed:.1f}s: {run_stats['videos_processed']} processed, "
+          f"{run_stats['videos_skipped']} skipped, {len(failures)} failed")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory of serve videos without the GUI")
+    parser.add_argument('video_dir', help="Directory containing serve videos")
+    parser.add_argument('--output', '-o', default=None,
+                        help="Directory for per-video results and report.json (default: <video_dir>/spikesight_results)")
+    parser.add_argument('--workers', '-j', type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--recursive', '-r', action='store_true',
+                        help="Also search sub-directories for videos")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Reuse pose landmarks cached in this directory (skips decoding and inference on a hit)")
+    parser.add_argument('--ai', action='store_true',
+                        help="Also request AI coaching for every video (concurrently, cached)")
+    parser.add_argument('--ai-concurrency', type=int, default=8,
+                        help="Maximum concurrent AI requests")
+    parser.add_argument('--ai-rpm', type=int, default=None,
+                        help="Limit AI requests per minute")
+    parser.add_argument('--ai-tpm', type=int, default=None,
+                        help="Limit AI tokens per minute")
+    parser.add_argument('--export', action='store_true',
+                        help="Also save per-frame metrics and landmarks as a columnar .npz session file per video")
+    args = parser.parse_args(argv)
+
+    ai_options = None
+    if args.ai:
+        ai_options = {'concurrency': args.ai_concurrency,
+                      'requests_per_minute': args.ai_rpm,
+                      'tokens_per_minute': args.ai_tpm}
+    output_dir = args.output or os.path.join(args.video_dir, 'spikesight_results')
+    report = run_batch(args.video_dir, output_dir, args.workers, args.recursive, args.cache_dir, ai_options,
+                       args.export)
+    return 1 if report['videos_failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
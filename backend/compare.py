@@ -0,0 +1,347 @@
+# backend/compare.py
+"""
+Compares a serve's elbow/shoulder/wrist trajectory against a library of reference serves.
+
+Every serve is cropped around trophy pose and contact, resampled to a fixed
+length and aligned with dynamic time warping inside a Sakoe-Chiba band. A query
+against the library:
+
+  1. computes an LB_Keogh lower bound for every reference in one vectorized pass,
+  2. runs DTW on the references in ascending lower-bound order, a chunk at a time,
+     vectorized across the chunk, and stops once the next lower bound can't beat
+     the k-th best distance so far,
+  3. abandons references inside a chunk as soon as the partial DTW cost plus the
+     lower bound of the remaining rows exceeds that distance.
+
+Usage:
+    python -m backend.compare build <results_or_sessions>... --output library.npz
+    python -m backend.compare query <result_or_session> --library library.npz [-k 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backend.session_export import write_session, open_session
+
+# Trajectory channels and the scale that brings each to roughly 0..1
+CHANNELS = ('elbow_angle', 'shoulder_abduction', 'wrist_height')
+CHANNEL_SCALES = np.array([180.0, 180.0, 1.0])
+
+DEFAULT_LENGTH = 64
+# Warping band as a fraction of the trajectory length
+DEFAULT_WINDOW = 0.1
+PHASES = ('preparation', 'acceleration', 'follow_through')
+
+# DTW chunks start small so a good k-th best distance is found early, then grow
+FIRST_CHUNK = 32
+MAX_CHUNK = 1024
+
+def serve_trajectory(frame_data, length=DEFAULT_LENGTH):
+    """
+    The serve part of export_frame_data() output as a (length, channels) float32
+    trajectory, plus the (trophy, contact) positions within it (-1 if not detected).
+    The serve window runs from trophy pose to contact, extended by that span on
+    either side; without both phases the whole clip is used. None if too short.
+    """
+    columns = frame_data['all_frames']
+    frames = np.asarray(columns['frame'], dtype=np.float64)
+    if len(frames) < 2:
+        return None
+
+    phases = frame_data.get('phases') or {}
+    trophy = (phases.get('trophy_pose') or {}).get('frame')
+    contact = (phases.get('ball_contact') or {}).get('frame')
+    if trophy is not None and contact is not None and contact > trophy:
+        span = contact - trophy
+        mask = (frames >= trophy - span) & (frames <= contact + span)
+    else:
+        mask = np.ones(len(frames), dtype=bool)
+    if mask.sum() < 2:
+        return None
+
+    t = frames[mask]
+    grid = np.linspace(t[0], t[-1], length)
+    trajectory = np.stack([np.interp(grid, t, np.asarray(columns[name], dtype=np.float64)[mask])
+                           for name in CHANNELS], axis=1) / CHANNEL_SCALES
+
+    def position(frame):
+        return int(np.clip(np.searchsorted(grid, frame), 0, length - 1)) if frame is not None else -1
+
+    return trajectory.astype(np.float32), np.array([position(trophy), position(contact)], dtype=np.int32)
+
+def envelopes(trajectories, radius):
+    """LB_Keogh (lower, upper) envelopes of (..., length, channels) trajectories"""
+    pad = [(0, 0)] * trajectories.ndim
+    pad[-2] = (radius, radius)
+    windows = sliding_window_view(np.pad(trajectories, pad, mode='edge'), 2 * radius + 1, axis=-2)
+    return windows.min(axis=-1), windows.max(axis=-1)
+
+def lb_keogh(query, lower, upper):
+    """Per-point LB_Keogh terms (candidates, length) of a query against candidate envelopes"""
+    above = np.maximum(query - upper, 0)
+    below = np.maximum(lower - query, 0)
+    return (above * above + below * below).sum(axis=-1)
+
+def _band(i, length, radius):
+    """Columns lo..hi (1-based, inclusive) of DTW row i inside the band"""
+    return max(1, i - radius), min(length, i + radius)
+
+def _dtw_row(prev, query_point, candidates, i, radius):
+    """
+    Next row of the banded DTW cost matrix for a batch of candidates.
+
+    D[i, j] = c[i, j] + min(D[i-1, j-1], D[i-1, j], D[i, j-1]) is a running
+    minimum along the row: with a[j] = min(D[i-1, j-1], D[i-1, j]) and S the
+    cumulative cost, D[i, j] = S[j] + min over k <= j of (a[k] - S[k-1]), which
+    NumPy evaluates for the whole row at once.
+    """
+    length = candidates.shape[1]
+    lo, hi = _band(i, length, radius)
+    diff = candidates[:, lo - 1:hi] - query_point
+    cost = (diff * diff).sum(axis=-1)
+    reach = np.minimum(prev[:, lo - 1:hi], prev[:, lo:hi + 1])
+    cumulative = np.cumsum(cost, axis=1)
+    row = np.full_like(prev, np.inf)
+    row[:, lo:hi + 1] = cumulative + np.minimum.accumulate(reach - (cumulative - cost), axis=1)
+    return row, lo, hi
+
+def dtw_batch(query, candidates, radius, lb_rest=None, threshold=np.inf):
+    """
+    Banded DTW distances (sum of squared differences) from a query to each of a
+    batch of candidates. With lb_rest[b, i] (a lower bound on the cost of query
+    rows i+1.. for candidate b), candidates whose partial cost plus that bound
+    reaches threshold are abandoned. Returns (indices kept, their distances).
+    """
+    candidates = np.asarray(candidates, dtype=np.float64)
+    query = np.asarray(query, dtype=np.float64)
+    count, length = candidates.shape[:2]
+    alive = np.arange(count)
+    prev = np.full((count, length + 1), np.inf)
+    prev[:, 0] = 0.0
+
+    for i in range(1, length + 1):
+        prev, lo, hi = _dtw_row(prev, query[i - 1], candidates, i, radius)
+        if lb_rest is None:
+            continue
+        bound = prev[:, lo:hi + 1].min(axis=1) + lb_rest[:, i]
+        keep = bound < threshold
+        if not keep.all():
+            alive, prev, candidates, lb_rest = alive[keep], prev[keep], candidates[keep], lb_rest[keep]
+            if not len(alive):
+                break
+    return alive, prev[:, length]
+
+def dtw_path(query, reference, radius):
+    """Banded DTW distance and warping path [(i, j), ...] between two trajectories"""
+    query = np.asarray(query, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)[None]
+    length = len(query)
+    D = np.full((length + 1, length + 1), np.inf)
+    D[0, 0] = 0.0
+    for i in range(1, length + 1):
+        D[i] = _dtw_row(D[i - 1][None], query[i - 1], reference, i, radius)[0][0]
+
+    path = []
+    i = j = length
+    while i > 0 and j > 0:
+        path.append((i - 1, j - 1))
+        steps = ((D[i - 1, j - 1], i - 1, j - 1), (D[i - 1, j], i - 1, j), (D[i, j - 1], i, j - 1))
+        _, i, j = min(steps, key=lambda step: step[0])
+    path.reverse()
+    return D[length, length], path
+
+def phase_deviations(query, reference, marks, radius):
+    """
+    Mean signed difference (query - reference, in degrees / wrist height units)
+    per channel along the DTW path, per serve phase of the query.
+    """
+    _, path = dtw_path(query, reference, radius)
+    trophy, contact = (int(mark) for mark in marks)
+    groups = {}
+    for i, j in path:
+        if trophy < 0 or contact < 0:
+            phase = 'serve'
+        elif i < trophy:
+            phase = 'preparation'
+        elif i < contact:
+            phase = 'acceleration'
+        else:
+            phase = 'follow_through'
+        groups.setdefault(phase, []).append((i, j))
+
+    deviations = {}
+    for phase, pairs in groups.items():
+        qi, rj = np.array(pairs).T
+        diff = (np.asarray(query)[qi] - np.asarray(reference)[rj]).mean(axis=0) * CHANNEL_SCALES
+        deviations[phase] = {name: float(value) for name, value in zip(CHANNELS, diff)}
+    return deviations
+
+class ReferenceLibrary:
+    """Reference serve trajectories with precomputed LB_Keogh envelopes"""
+
+    def __init__(self, trajectories, names, marks, window=DEFAULT_WINDOW, lower=None, upper=None):
+        self.trajectories = trajectories
+        self.names = list(names)
+        self.marks = marks
+        self.window = window
+        self.length = trajectories.shape[1] if len(trajectories) else DEFAULT_LENGTH
+        self.radius = max(1, int(round(window * self.length)))
+        if lower is None or upper is None:
+            lower, upper = envelopes(trajectories, self.radius)
+        self.lower = lower
+        self.upper = upper
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, items, length=DEFAULT_LENGTH, window=DEFAULT_WINDOW):
+        """Library from (name, frame_data) pairs; serves without a usable trajectory are skipped"""
+        names, trajectories, marks = [], [], []
+        for name, frame_data in items:
+            result = serve_trajectory(frame_data, length)
+            if result is None:
+                continue
+            names.append(name)
+            trajectories.append(result[0])
+            marks.append(result[1])
+        trajectories = np.array(trajectories, dtype=np.float32).reshape(-1, length, len(CHANNELS))
+        marks = np.array(marks, dtype=np.int32).reshape(-1, 2)
+        return cls(trajectories, names, marks, window)
+
+    def save(self, path):
+        columns = {'trajectories': self.trajectories, 'marks': self.marks,
+                   'lower': self.lower, 'upper': self.upper}
+        header = {'names': self.names, 'window': self.window, 'channels': list(CHANNELS)}
+        return write_session(path, columns, header)
+
+    @classmethod
+    def load(cls, path):
+        """Open a saved library; the arrays stay memory-mapped"""
+        session = open_session(path)
+        header = session.header
+        if tuple(header.get('channels', ())) != CHANNELS:
+            raise ValueError(f"{path} was built with channels {header.get('channels')}, expected {list(CHANNELS)}")
+        return cls(session['trajectories'], header['names'], session['marks'], header['window'],
+                   session['lower'], session['upper'])
+
+    def query(self, frame_data, k=5):
+        """
+        The k closest references to a serve: a list of {'name', 'distance',
+        'phase_deviations'} dicts (closest first) and pruning stats.
+        """
+        result = serve_trajectory(frame_data, self.length)
+        if result is None or not len(self):
+            return [], {'references': len(self)}
+        query, marks = result
+
+        start = time.perf_counter()
+        per_point = lb_keogh(query, self.lower, self.upper)
+        bounds = per_point.sum(axis=1)
+        order = np.argsort(bounds, kind='stable')
+
+        best = []   # (distance, index), at most k, closest first
+        stats = {'references': len(self), 'lb_pruned': 0, 'abandoned': 0, 'dtw_computed': 0}
+        position, chunk = 0, FIRST_CHUNK
+        while position < len(order):
+            threshold = best[-1][0] if len(best) >= k else np.inf
+            indices = order[position:position + chunk]
+            indices = indices[bounds[indices] < threshold]
+            if not len(indices):
+                # Lower bounds are sorted, so nothing further can get in either
+                stats['lb_pruned'] += len(order) - position
+                break
+            stats['lb_pruned'] += min(chunk, len(order) - position) - len(indices)
+
+            # lb_rest[:, i]: bound on the cost of query rows i+1.. (1-based), for early abandoning
+            rest = per_point[indices][:, ::-1].cumsum(axis=1)[:, ::-1]
+            lb_rest = np.concatenate([rest, np.zeros((len(indices), 1))], axis=1)
+            kept, distances = dtw_batch(query, self.trajectories[indices], self.radius, lb_rest, threshold)
+            stats['abandoned'] += len(indices) - len(kept)
+            stats['dtw_computed'] += len(kept)
+            best = sorted(best + [(float(d), int(indices[b])) for b, d in zip(kept, distances)])[:k]
+
+            position += chunk
+            chunk = min(chunk * 2, MAX_CHUNK)
+        stats['query_ms'] = 1000 * (time.perf_counter() - start)
+
+        matches = [{
+            'name': self.names[index],
+            # Root mean square difference per resampled point, in scaled units
+            'distance': float(np.sqrt(distance / self.length)),
+            'phase_deviations': phase_deviations(query, self.trajectories[index], marks, self.radius),
+        } for distance, index in best]
+        return matches, stats
+
+def frame_data_from_file(path):
+    """(name, frame_data) pairs from a session file, a batch result or segmenter output"""
+    if path.endswith('.npz'):
+        with open_session(path) as session:
+            header = session.header
+            frame_data = {'phases': header['phases'],
+                          'all_frames': {name: np.array(session[name]) for name in ('frame',) + CHANNELS}}
+        yield header.get('video') or path, frame_data
+        return
+
+    with open(path) as f:
+        data = json.load(f)
+    results = data if isinstance(data, list) else [data]
+    for result in results:
+        feedback = result.get('feedback') or {}
+        frame_data = result.get('frame_data') or feedback.get('frame_data')
+        if not frame_data:
+            continue
+        name = result.get('video') or path
+        if 'serve' in result:
+            name = f"{name}#{result['serve']}"
+        yield name, frame_data
+
+def _expand(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.json', '.npz')) and name != 'report.json':
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare serves against a library of reference serves")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Build a reference library")
+    build.add_argument('paths', nargs='+', help="Session files, batch results or segmenter output (files or directories)")
+    build.add_argument('--output', '-o', required=True)
+    build.add_argument('--window', type=float, default=DEFAULT_WINDOW, help="Warping band as a fraction of the serve")
+
+    query = commands.add_parser('query', help="Find the closest reference serves")
+    query.add_argument('path', help="Session file, batch result or segmenter output")
+    query.add_argument('--library', '-l', required=True)
+    query.add_argument('-k', type=int, default=5, help="Number of matches")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        items = (item for path in _expand(args.paths) for item in frame_data_from_file(path))
+        library = ReferenceLibrary.build(items, window=args.window)
+        library.save(args.output)
+        print(f"{len(library)} reference serves written to {args.output}")
+        return 0
+
+    library = ReferenceLibrary.load(args.library)
+    for name, frame_data in frame_data_from_file(args.path):
+        matches, stats = library.query(frame_data, args.k)
+        print(f"{name}: {stats.get('dtw_computed', 0)} of {stats['references']} references compared "
+              f"in {stats.get('query_ms', 0):.1f} ms")
+        for match in matches:
+            print(f"  {match['distance']:.4f}  {match['name']}")
+            for phase, deviation in match['phase_deviations'].items():
+                print(f"      {phase:<15}" + '  '.join(f"{channel} {value:+.1f}" for channel, value in deviation.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
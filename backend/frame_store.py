@@ -0,0 +1,150 @@
+# backend/frame_store.py
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Per-frame metrics recorded by the analyzers, one typed column each
+FRAME_COLUMNS = (
+    ('frame', np.int32),
+    ('elbow_angle', np.float32),
+    ('shoulder_abduction', np.float32),
+    ('wrist_height', np.float32),
+    ('wrist_velocity', np.float32),
+    ('frame_index', np.int32),  # video frame the metrics came from, -1 if unknown
+)
+
+# Rows kept in RAM before the columns move to memory-mapped files (~23 MB)
+DEFAULT_SPILL_ROWS = 1_000_000
+
+class FrameMetricStore:
+    """
+    Growable columnar storage for per-frame metrics.
+
+    Columns are preallocated NumPy arrays that double in capacity when full, so
+    appending a frame costs a handful of scalar writes instead of a new dict.
+    Past spill_rows the columns are moved to memory-mapped files in a temporary
+    directory. column()/columns() return views of the filled rows, not copies.
+    """
+
+    def __init__(self, initial_capacity=1024, spill_rows=DEFAULT_SPILL_ROWS, spill_dir=None):
+        self.spill_rows = spill_rows
+        self.spill_dir = spill_dir
+        self._spill_path = None
+        self._closed = False
+        self._size = 0
+        self._capacity = 0
+        self._columns = {}
+        self._grow(max(initial_capacity, 1))
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def spilled(self):
+        return self._spill_path is not None
+
+    @property
+    def nbytes(self):
+        return sum(col.nbytes for col in self._columns.values())
+
+    def _allocate(self, name, dtype, capacity):
+        if capacity <= self.spill_rows:
+            return np.empty(capacity, dtype=dtype)
+
+        if self._spill_path is None:
+            self._spill_path = tempfile.mkdtemp(prefix='spikesight-frames-', dir=self.spill_dir)
+        path = os.path.join(self._spill_path, f"{name}-{capacity}.npy")
+        return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(capacity,))
+
+    def _grow(self, capacity):
+        if self._closed:
+            raise ValueError("FrameMetricStore is closed")
+        old_columns = self._columns
+        self._columns = {}
+        for name, dtype in FRAME_COLUMNS:
+            column = self._allocate(name, dtype, capacity)
+            if name in old_columns:
+                column[:self._size] = old_columns[name][:self._size]
+                self._release(old_columns[name])
+            self._columns[name] = column
+        self._capacity = capacity
+
+    def _release(self, column):
+        # Old spill files are unlinked right away; existing views keep their mapping alive
+        filename = getattr(column, 'filename', None)
+        if filename and os.path.exists(filename):
+            os.remove(filename)
+
+    def append(self, frame, elbow_angle, shoulder_abduction, wrist_height, wrist_velocity, frame_index=-1):
+        if self._size == self._capacity:
+            self._grow(self._capacity * 2)
+        i = self._size
+        columns = self._columns
+        columns['frame'][i] = frame
+        columns['elbow_angle'][i] = elbow_angle
+        columns['shoulder_abduction'][i] = shoulder_abduction
+        columns['wrist_height'][i] = wrist_height
+        columns['wrist_velocity'][i] = wrist_velocity
+        columns['frame_index'][i] = frame_index
+        self._size = i + 1
+
+    def extend(self, columns):
+        """Append many rows at once from a dict of equal-length arrays"""
+        count = len(columns['frame'])
+        needed = self._size + count
+        if needed > self._capacity:
+            capacity = self._capacity
+            while capacity < needed:
+                capacity *= 2
+            self._grow(capacity)
+        for name, _ in FRAME_COLUMNS:
+            self._columns[name][self._size:needed] = columns[name]
+        self._size = needed
+
+    def column(self, name):
+        if self._closed:
+            raise ValueError("FrameMetricStore is closed")
+        return self._columns[name][:self._size]
+
+    def columns(self):
+        return {name: self.column(name) for name, _ in FRAME_COLUMNS}
+
+    def as_dicts(self):
+        """Materialize the rows as a list of dicts (the original all_frame_data layout)"""
+        names = [name for name, _ in FRAME_COLUMNS]
+        values = [self.column(name).tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def row_for(self, frame):
+        """Row holding analyzer frame number `frame`, or None (frame numbers only increase)"""
+        frames = self.column('frame')
+        row = int(np.searchsorted(frames, frame))
+        if row < len(frames) and frames[row] == frame:
+            return row
+        return None
+
+    def drop_front(self, count):
+        """Forget the oldest `count` rows, keeping the rest in order"""
+        count = min(count, self._size)
+        remaining = self._size - count
+        for column in self._columns.values():
+            column[:remaining] = column[count:self._size]
+        self._size = remaining
+
+    def clear(self):
+        self._size = 0
+
+    def close(self):
+        """Drop the columns and delete any spill files; the store can't be used afterwards"""
+        self._closed = True
+        self._columns = {}
+        self._size = self._capacity = 0
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+    def __del__(self):
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
@@ -0,0 +1,353 @@
+# backend/history.py
+"""
+Local SQLite history of analyzed serves, for trends across sessions.
+
+One row per serve holds the athlete, date, video hash, the trophy pose and
+ball contact metrics, the summary stats and the recommendations; the
+recommendation titles are also kept in their own indexed table. Queries
+filter on indexed columns, so they stay fast with hundreds of thousands of serves.
+A serve is identified by its video, the athlete's track (multi-athlete videos)
+and its index in the video; analyzing it again updates the stored row.
+
+Usage:
+    python -m backend.history ingest <results_dir_or_json>... --athlete NAME
+    python -m backend.history trend NAME contact_elbow [--since 2024-01-01] [--by month]
+    python -m backend.history find [--athlete NAME] [--below trophy_elbow 80] [--recommendation TITLE]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+DEFAULT_HISTORY_PATH = os.getenv('SPIKESIGHT_HISTORY_DB',
+                                 os.path.join(os.path.expanduser('~'), '.local', 'share', 'spikesight', 'history.sqlite3'))
+DEFAULT_BATCH_SIZE = 1000
+
+# Queryable per-serve metrics: column -> (phase or summary key, field)
+METRICS = {
+    'trophy_frame': ('trophy_pose', 'frame'),
+    'trophy_elbow': ('trophy_pose', 'elbow_flexion'),
+    'trophy_wrist_height': ('trophy_pose', 'wrist_height'),
+    'contact_frame': ('ball_contact', 'frame'),
+    'contact_shoulder': ('ball_contact', 'shoulder_abduction'),
+    'contact_elbow': ('ball_contact', 'elbow_extension'),
+    'contact_velocity': ('ball_contact', 'max_velocity'),
+    'min_elbow_angle': ('summary_stats', 'min_elbow_angle'),
+    'max_wrist_velocity': ('summary_stats', 'max_wrist_velocity'),
+}
+
+# Metrics that get their own index for threshold queries
+INDEXED_METRICS = ('trophy_elbow', 'contact_shoulder', 'contact_elbow', 'max_wrist_velocity')
+
+# How trend() can aggregate by date; recorded_at is an ISO timestamp, so prefixes group it
+TREND_BUCKETS = {'day': 10, 'month': 7, 'year': 4}
+
+SERVE_COLUMNS = ('athlete', 'recorded_at', 'video_hash', 'video_path', 'track', 'serve_index', 'total_frames') + \
+    tuple(METRICS) + ('recommendations', 'ingested_at')
+
+# PRAGMA user_version of the current schema (see HistoryStore._migrate)
+SCHEMA_VERSION = 1
+
+SERVES_TABLE = f"""
+CREATE TABLE IF NOT EXISTS serves (
+    id INTEGER PRIMARY KEY,
+    athlete TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    video_hash TEXT,
+    video_path TEXT,
+    track INTEGER NOT NULL DEFAULT 0,
+    serve_index INTEGER NOT NULL DEFAULT 1,
+    total_frames INTEGER,
+    {', '.join(f'{name} REAL' for name in METRICS)},
+    recommendations TEXT,
+    ingested_at TEXT NOT NULL,
+    UNIQUE (video_hash, track, serve_index)
+);"""
+
+SCHEMA = SERVES_TABLE + f"""
+CREATE TABLE IF NOT EXISTS recommendations (
+    serve_id INTEGER NOT NULL REFERENCES serves(id),
+    title TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS serves_athlete_date ON serves (athlete, recorded_at);
+CREATE INDEX IF NOT EXISTS serves_date ON serves (recorded_at);
+{''.join(f'CREATE INDEX IF NOT EXISTS serves_{name} ON serves ({name});' for name in INDEXED_METRICS)}
+CREATE INDEX IF NOT EXISTS recommendations_title ON recommendations (title, serve_id);
+"""
+
+def serve_record(feedback, athlete, recorded_at=None, video_hash=None, video_path=None,
+                 serve_index=1, frame_data=None, track=0):
+    """
+    Flatten generate_feedback() output plus export_frame_data() output (passed
+    as frame_data, or already attached as feedback['frame_data']) into a row dict.
+    track is the athlete's track ID in a multi-athlete video, 0 otherwise.
+    """
+    frame_data = frame_data if frame_data is not None else feedback.get('frame_data') or {}
+    sources = dict(frame_data.get('phases') or {}, summary_stats=frame_data.get('summary_stats') or {})
+
+    record = {
+        'athlete': athlete,
+        'recorded_at': recorded_at or datetime.now().isoformat(timespec='seconds'),
+        'video_hash': video_hash,
+        'video_path': video_path,
+        'track': track,
+        'serve_index': serve_index,
+        'total_frames': frame_data.get('total_frames'),
+        'recommendations': json.dumps(feedback.get('recommendations', [])),
+    }
+    for column, (source, field) in METRICS.items():
+        value = (sources.get(source) or {}).get(field)
+        record[column] = float(value) if value is not None else None
+    return record
+
+def video_record_info(video_path):
+    """(recorded_at, video_hash) for a video file; the date comes from its modification time"""
+    from vision.landmark_cache import fingerprint_video
+
+    recorded_at = datetime.fromtimestamp(os.path.getmtime(video_path)).isoformat(timespec='seconds')
+    return recorded_at, fingerprint_video(video_path)
+
+class HistoryStore:
+    """Serve history in a single SQLite file"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets readers (e.g. a notebook) query while the app writes
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        """Bring a history written by an older version up to SCHEMA_VERSION"""
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        columns = [row['name'] for row in self.conn.execute("PRAGMA table_info(serves)")]
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if columns and 'track' not in columns:
+                # Version 0 keyed serves on (video_hash, serve_index); the unique
+                # constraint can only change by rebuilding the table
+                self.conn.execute("ALTER TABLE serves RENAME TO serves_v0")
+                self.conn.execute(SERVES_TABLE)
+                self.conn.execute(f"INSERT INTO serves (id, {', '.join(columns[1:])}) "
+                                  f"SELECT {', '.join(columns)} FROM serves_v0")
+                self.conn.execute("DROP TABLE serves_v0")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def add_serve(self, record):
+        """Store one serve (updating it if it is already stored); returns its id"""
+        ids, _ = self._insert_batch([record])
+        return ids[0]
+
+    def add_serves(self, records, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Bulk insert, one transaction per batch_size serves. Returns (added, updated):
+        how many serves were new and how many replaced an earlier analysis.
+        """
+        added = updated = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                ids, replaced = self._insert_batch(batch)
+                added += len(ids) - replaced
+                updated += replaced
+                batch = []
+        if batch:
+            ids, replaced = self._insert_batch(batch)
+            added += len(ids) - replaced
+            updated += replaced
+        return added, updated
+
+    def _insert_batch(self, records):
+        """
+        Store records in one transaction. Returns (ids, updated): the id of every
+        record in order, and how many of them replaced a stored serve.
+        """
+        ingested_at = datetime.now().isoformat(timespec='seconds')
+        names = SERVE_COLUMNS[:-1]
+        insert = (f"INSERT INTO serves ({', '.join(SERVE_COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(SERVE_COLUMNS))})")
+        update = f"UPDATE serves SET {', '.join(f'{name} = ?' for name in SERVE_COLUMNS)} WHERE id = ?"
+        ids, replaced, titles = [], [], []
+        with self.conn:
+            # Take the write lock before looking anything up, so another writer (the
+            # GUI and the ingest CLI) can't store the same serve in between
+            self.conn.execute("BEGIN IMMEDIATE")
+            for record in records:
+                row = tuple(record.get(name) for name in names) + (ingested_at,)
+                existing = None
+                if record.get('video_hash') is not None:
+                    existing = self.conn.execute(
+                        "SELECT id FROM serves WHERE video_hash = ? AND track = ? AND serve_index = ?",
+                        (record['video_hash'], record.get('track', 0), record.get('serve_index', 1))).fetchone()
+                if existing is None:
+                    serve_id = self.conn.execute(insert, row).lastrowid
+                else:
+                    serve_id = existing[0]
+                    self.conn.execute(update, row + (serve_id,))
+                    replaced.append((serve_id,))
+                ids.append(serve_id)
+                titles.extend((serve_id, title) for title in
+                              {rec['title'] for rec in json.loads(record.get('recommendations') or '[]')})
+            self.conn.executemany("DELETE FROM recommendations WHERE serve_id = ?", replaced)
+            self.conn.executemany("INSERT INTO recommendations (serve_id, title) VALUES (?, ?)", titles)
+        return ids, len(replaced)
+
+    def athletes(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT athlete FROM serves ORDER BY athlete")]
+
+    def count(self, athlete=None):
+        if athlete is None:
+            return self.conn.execute("SELECT COUNT(*) FROM serves").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM serves WHERE athlete = ?", (athlete,)).fetchone()[0]
+
+    def trend(self, athlete, metric, since=None, until=None, by=None):
+        """
+        (recorded_at, value) for every serve of an athlete in date order, or with
+        by='day'/'month'/'year' one (period, mean, count) row per period.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}; choose from {', '.join(METRICS)}")
+        where, params = self._where(athlete=athlete, since=since, until=until)
+        where += f" AND {metric} IS NOT NULL"
+        if by is None:
+            query = f"SELECT recorded_at, {metric} FROM serves WHERE {where} ORDER BY recorded_at"
+        else:
+            if by not in TREND_BUCKETS:
+                raise ValueError(f"Unknown trend period {by!r}; choose from {', '.join(TREND_BUCKETS)}")
+            period = f"substr(recorded_at, 1, {TREND_BUCKETS[by]})"
+            query = (f"SELECT {period} AS period, AVG({metric}), COUNT(*) FROM serves "
+                     f"WHERE {where} GROUP BY period ORDER BY period")
+        return [tuple(row) for row in self.conn.execute(query, params)]
+
+    def find_serves(self, athlete=None, since=None, until=None, recommendation=None,
+                    below=None, above=None, limit=None):
+        """
+        Serves matching every given filter, newest first. below/above map metric
+        names to thresholds, e.g. find_serves(below={'trophy_elbow': 80}).
+        """
+        where, params = self._where(athlete, since, until, recommendation, below, above)
+        # With a filter, '+' keeps SQLite from walking the date index to skip the sort
+        # instead of using the filter's index
+        order = 'recorded_at' if where == '1' else '+recorded_at'
+        query = f"SELECT * FROM serves WHERE {where} ORDER BY {order} DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def _where(self, athlete=None, since=None, until=None, recommendation=None, below=None, above=None):
+        clauses, params = ['1'], []
+        if athlete is not None:
+            clauses.append("athlete = ?")
+            params.append(athlete)
+        if since is not None:
+            clauses.append("recorded_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("recorded_at < ?")
+            params.append(until)
+        if recommendation is not None:
+            clauses.append("id IN (SELECT serve_id FROM recommendations WHERE title = ?)")
+            params.append(recommendation)
+        for thresholds, op in ((below, '<'), (above, '>')):
+            for metric, value in (thresholds or {}).items():
+                if metric not in METRICS:
+                    raise ValueError(f"Unknown metric {metric!r}; choose from {', '.join(METRICS)}")
+                clauses.append(f"{metric} {op} ?")
+                params.append(value)
+        return ' AND '.join(clauses), params
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def records_from_results(paths, athlete):
+    """
+    Serve records from batch result files ({'video', 'feedback', ...}) and
+    segmenter output (a list of per-serve results). Directories are searched
+    for *.json results, skipping report.json.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path) if name.endswith('.json') and name != 'report.json')
+            yield from records_from_results([os.path.join(path, name) for name in names], athlete)
+            continue
+
+        with open(path) as f:
+            data = json.load(f)
+        results = data if isinstance(data, list) else [data]
+        for result in results:
+            if 'feedback' not in result:
+                continue
+            video = result.get('video')
+            recorded_at, video_hash = None, None
+            if video and os.path.isfile(video):
+                recorded_at, video_hash = video_record_info(video)
+            yield serve_record(result['feedback'], athlete,
+                               recorded_at=recorded_at or result.get('processed_at'),
+                               video_hash=video_hash or result.get('video_hash'),
+                               video_path=video,
+                               serve_index=result.get('serve', 1))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store and query the serve history")
+    parser.add_argument('--db', default=DEFAULT_HISTORY_PATH, help="History database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Add batch or segmenter results to the history")
+    ingest.add_argument('paths', nargs='+', help="Result JSON files or result directories")
+    ingest.add_argument('--athlete', required=True)
+
+    trend = commands.add_parser('trend', help="A metric over time for one athlete")
+    trend.add_argument('athlete')
+    trend.add_argument('metric', choices=list(METRICS))
+    trend.add_argument('--since', default=None, help="ISO date, e.g. 2024-01-01")
+    trend.add_argument('--until', default=None)
+    trend.add_argument('--by', choices=list(TREND_BUCKETS), default=None, help="Average per period")
+
+    find = commands.add_parser('find', help="Serves matching filters")
+    find.add_argument('--athlete', default=None)
+    find.add_argument('--since', default=None)
+    find.add_argument('--until', default=None)
+    find.add_argument('--recommendation', default=None, help="Recommendation title, e.g. 'Low Contact Point'")
+    find.add_argument('--below', nargs=2, action='append', metavar=('METRIC', 'VALUE'), default=[])
+    find.add_argument('--above', nargs=2, action='append', metavar=('METRIC', 'VALUE'), default=[])
+    find.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with HistoryStore(args.db) as store:
+        if args.command == 'ingest':
+            added, updated = store.add_serves(records_from_results(args.paths, args.athlete))
+            print(f"Added {added} serves, updated {updated} ({store.count()} in {args.db})")
+        elif args.command == 'trend':
+            for row in store.trend(args.athlete, args.metric, args.since, args.until, args.by):
+                print('  '.join(f"{value:.1f}" if isinstance(value, float) else str(value) for value in row))
+        else:
+            serves = store.find_serves(args.athlete, args.since, args.until, args.recommendation,
+                                       below={m: float(v) for m, v in args.below},
+                                       above={m: float(v) for m, v in args.above},
+                                       limit=args.limit)
+            for serve in serves:
+                metrics = ', '.join(f"{name} {serve[name]:.1f}" for name in ('trophy_elbow', 'contact_shoulder', 'contact_elbow')
+                                    if serve[name] is not None)
+                print(f"{serve['recorded_at']}  {serve['athlete']}  {serve['video_path'] or '-'}#{serve['serve_index']}  {metrics}")
+            print(f"{len(serves)} serves")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# backend/instrumentation.py
+"""
+Low-overhead stage timing for the whole app.
+
+    from backend.instrumentation import profiler
+
+    start = profiler.start()
+    frame = decode()
+    profiler.stop('decode', start)
+
+    with profiler.timed('analysis'):
+        ...
+
+Each stage keeps a count, total/min/max and a fixed log-spaced latency histogram,
+so recording is a perf_counter() call, a bisect and a few additions. Profiling is
+on by default; set SPIKESIGHT_PROFILE=0 to turn every call into a no-op.
+Set SPIKESIGHT_PROFILE_DIR to have the GUI dump a JSON and CSV profile per video.
+"""
+import bisect
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Histogram bucket upper edges in seconds: 10us .. ~84s, four buckets per doubling
+BUCKET_EDGES = [1e-5 * 2 ** (i / 4) for i in range(93)]
+
+class StageTimer:
+    """Latency statistics for one named stage"""
+    __slots__ = ('name', 'count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        # One extra bucket for anything slower than the last edge
+        self.buckets = [0] * (len(BUCKET_EDGES) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(BUCKET_EDGES, seconds)] += 1
+
+    def percentile(self, q):
+        """Approximate latency percentile (0-100) from the histogram, in seconds"""
+        if not self.count:
+            return 0.0
+        target = self.count * q / 100.0
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                edge = BUCKET_EDGES[i] if i < len(BUCKET_EDGES) else self.max
+                return min(edge, self.max)
+        return self.max
+
+    def summary(self, elapsed):
+        return {
+            'count': self.count,
+            'total_ms': 1000 * self.total,
+            'mean_ms': 1000 * self.total / self.count if self.count else 0.0,
+            'min_ms': 1000 * self.min if self.count else 0.0,
+            'max_ms': 1000 * self.max,
+            'p50_ms': 1000 * self.percentile(50),
+            'p95_ms': 1000 * self.percentile(95),
+            'p99_ms': 1000 * self.percentile(99),
+            # Calls per second of wall time since the profile was reset
+            'rate_per_s': self.count / elapsed if elapsed > 0 else 0.0,
+        }
+
+class Profiler:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, label=None):
+        """Start a new profile (e.g. for the next video)"""
+        with self._lock:
+            self.label = label
+            self.stages = {}
+            self.started = time.perf_counter()
+            self.started_at = datetime.now().isoformat(timespec='seconds')
+
+    def start(self):
+        """Timestamp for a later stop(); None when profiling is off"""
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage, start):
+        if start is None:
+            return
+        self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.stages.get(stage)
+            if timer is None:
+                timer = self.stages[stage] = StageTimer(stage)
+            timer.add(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        start = self.start()
+        try:
+            yield
+        finally:
+            self.stop(stage, start)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        elapsed = self.elapsed()
+        with self._lock:
+            stages = {name: timer.summary(elapsed) for name, timer in self.stages.items()}
+        return {
+            'label': self.label,
+            'started_at': self.started_at,
+            'wall_seconds': elapsed,
+            'stages': stages,
+        }
+
+    def status_line(self, fps_stage='frame', stages=('decode', 'pose', 'draw', 'analysis')):
+        """One-line live summary for a status bar"""
+        if not self.enabled:
+            return ""
+        parts = []
+        with self._lock:
+            # fps_stage records the interval between frames
+            timer = self.stages.get(fps_stage)
+            if timer is not None and timer.total > 0:
+                parts.append(f"{timer.count / timer.total:.1f} fps")
+            for name in stages:
+                timer = self.stages.get(name)
+                if timer is not None and timer.count:
+                    parts.append(f"{name} {1000 * timer.total / timer.count:.1f} ms")
+        return " · ".join(parts)
+
+    def dump(self, directory, name=None):
+        """Write <name>.json (full summary and histograms) and <name>.csv (one row per stage)"""
+        if not self.enabled:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        name = name or 'profile_' + datetime.now().strftime('%Y%m%d_%H%M%S')
+        summary = self.summary()
+        with self._lock:
+            summary['histogram_edges_ms'] = [1000 * edge for edge in BUCKET_EDGES]
+            for stage, stats in summary['stages'].items():
+                stats['histogram'] = list(self.stages[stage].buckets)
+
+        json_path = os.path.join(directory, name + '.json')
+        with open(json_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        csv_path = os.path.join(directory, name + '.csv')
+        columns = ['count', 'total_ms', 'mean_ms', 'min_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'rate_per_s']
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage'] + columns)
+            for stage, stats in summary['stages'].items():
+                writer.writerow([stage] + [round(stats[c], 4) for c in columns])
+        return json_path
+
+# Shared instance used across the app
+profiler = Profiler(enabled=os.getenv('SPIKESIGHT_PROFILE', '1') != '0')
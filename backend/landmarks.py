@@ -0,0 +1,49 @@
+# backend/landmarks.py
+import numpy as np
+
+NUM_LANDMARKS = 33
+LANDMARK_VALUES = 4  # x, y, z, visibility
+
+# MediaPipe Pose landmark indices (mp.solutions.pose.PoseLandmark), so code that
+# only reads landmark arrays doesn't have to import mediapipe
+POSE_LANDMARKS = {name: index for index, name in enumerate((
+    'NOSE', 'LEFT_EYE_INNER', 'LEFT_EYE', 'LEFT_EYE_OUTER', 'RIGHT_EYE_INNER', 'RIGHT_EYE', 'RIGHT_EYE_OUTER',
+    'LEFT_EAR', 'RIGHT_EAR', 'MOUTH_LEFT', 'MOUTH_RIGHT',
+    'LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_ELBOW', 'RIGHT_ELBOW', 'LEFT_WRIST', 'RIGHT_WRIST',
+    'LEFT_PINKY', 'RIGHT_PINKY', 'LEFT_INDEX', 'RIGHT_INDEX', 'LEFT_THUMB', 'RIGHT_THUMB',
+    'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE', 'LEFT_ANKLE', 'RIGHT_ANKLE',
+    'LEFT_HEEL', 'RIGHT_HEEL', 'LEFT_FOOT_INDEX', 'RIGHT_FOOT_INDEX',
+))}
+
+def landmarks_to_array(pose_landmarks, out=None):
+    """Pack a MediaPipe landmark list into a (33, 4) float32 array"""
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, LANDMARK_VALUES), dtype=np.float32)
+    for i, lm in enumerate(pose_landmarks.landmark):
+        out[i, 0] = lm.x
+        out[i, 1] = lm.y
+        out[i, 2] = lm.z
+        out[i, 3] = lm.visibility
+    return out
+
+class PoseFrame:
+    """
+    Compact pose record for one video frame: a (33, 4) float32 landmark array
+    plus the frame index and timestamp in seconds. The decoded image is only
+    attached when a caller asks for it, so records are cheap to send across
+    signals, pickle to worker processes or write to the landmark cache.
+    """
+    __slots__ = ('landmarks', 'frame_index', 'timestamp', 'image')
+
+    def __init__(self, landmarks, frame_index, timestamp, image=None):
+        self.landmarks = landmarks
+        self.frame_index = frame_index
+        self.timestamp = timestamp
+        self.image = image
+
+    @classmethod
+    def from_mediapipe(cls, pose_landmarks, frame_index, timestamp, image=None):
+        return cls(landmarks_to_array(pose_landmarks), frame_index, timestamp, image)
+
+    def __repr__(self):
+        return f"PoseFrame(frame_index={self.frame_index}, timestamp={self.timestamp:.3f})"
@@ -0,0 +1,186 @@
+# backend/segmenter.py
+"""
+Splits a continuous landmark stream (e.g. a practice session) into serves.
+
+Usage:
+    python -m backend.segmenter <video> [--output serves.json]
+"""
+import argparse
+import json
+import sys
+from collections import deque
+
+from backend.serve_analysis import ServeAnalyzer, ServePhase, DEFAULT_FRAME_INTERVAL
+
+# The arm counts as raised with the same trigger as STANCE -> ARM_COCKING
+ARM_UP_WRIST_HEIGHT = 0.6
+ARM_UP_ABDUCTION = 60
+
+class ServeSegmenter:
+    """
+    Streaming multi-serve analysis on top of ServeAnalyzer.
+
+    Frames go to a single analyzer. Once it reaches FOLLOW_THROUGH the serve ends
+    as soon as the arm has been down for rest_seconds (or follow_through_seconds
+    have passed), its result is handed to on_serve and the analyzer is reset for
+    the next serve. Serves that never get past contact within max_serve_seconds
+    are dropped, and while idle in STANCE the per-frame data is trimmed to
+    max_idle_seconds, so memory stays bounded however long the stream is.
+    """
+
+    def __init__(self, on_serve=None, on_phase_changed=None, verbose=False,
+                 rest_seconds=0.3, follow_through_seconds=2.0,
+                 max_serve_seconds=5.0, max_idle_seconds=10.0):
+        self.analyzer = ServeAnalyzer(verbose=verbose)
+        if on_phase_changed is not None:
+            self.analyzer.on_phase_changed = on_phase_changed
+        self.on_serve = on_serve
+        self.rest_seconds = rest_seconds
+        self.follow_through_seconds = follow_through_seconds
+        self.max_serve_seconds = max_serve_seconds
+        self.max_idle_seconds = max_idle_seconds
+
+        self.serves_found = 0
+        self.serves_dropped = 0
+        self._segment_start()
+
+    def _segment_start(self):
+        # (video frame index, timestamp) of every analyzed frame in the segment, one per frame_store row
+        self._frames = deque()
+        self._serve_started = None   # timestamp of ARM_COCKING
+        self._follow_started = None  # timestamp of FOLLOW_THROUGH
+        self._rest_started = None    # timestamp the arm came down after the serve
+
+    def _timestamp(self, pose_frame):
+        timestamp = getattr(pose_frame, 'timestamp', None)
+        if timestamp is None:
+            # No timestamps: fall back to the analyzer's frame count at the default rate
+            timestamp = self.analyzer.frame_count * DEFAULT_FRAME_INTERVAL
+        return timestamp
+
+    def process_frame(self, pose_frame):
+        """Analyze one PoseFrame; returns the result of a serve that just finished, else None"""
+        analyzer = self.analyzer
+        timestamp = self._timestamp(pose_frame)
+        rows_before = len(analyzer.frame_store)
+        analyzer.process_frame(pose_frame)
+        if len(analyzer.frame_store) == rows_before:
+            return None  # the frame could not be analyzed
+
+        self._frames.append((getattr(pose_frame, 'frame_index', None), timestamp))
+        phase = analyzer.current_phase
+
+        if phase == ServePhase.STANCE:
+            # Nothing is happening; only keep the last max_idle_seconds of history
+            stale = 0
+            while timestamp - self._frames[0][1] > self.max_idle_seconds:
+                self._frames.popleft()
+                stale += 1
+            if stale:
+                analyzer.frame_store.drop_front(stale)
+            return None
+
+        if self._serve_started is None:
+            self._serve_started = timestamp
+
+        if phase != ServePhase.FOLLOW_THROUGH:
+            if timestamp - self._serve_started > self.max_serve_seconds:
+                # Arm went up but no serve followed (a stretch, a catch, ...)
+                analyzer.log(f"Dropping serve attempt stuck in {phase.name}")
+                self.serves_dropped += 1
+                analyzer.reset_serve()
+                self._segment_start()
+            return None
+
+        if self._follow_started is None:
+            self._follow_started = timestamp
+
+        store = analyzer.frame_store
+        arm_up = (store.column('wrist_height')[-1] < ARM_UP_WRIST_HEIGHT and
+                  store.column('shoulder_abduction')[-1] > ARM_UP_ABDUCTION)
+        if arm_up:
+            self._rest_started = None
+        elif self._rest_started is None:
+            self._rest_started = timestamp
+
+        rested = self._rest_started is not None and timestamp - self._rest_started >= self.rest_seconds
+        if rested or timestamp - self._follow_started >= self.follow_through_seconds:
+            return self._finish_serve()
+        return None
+
+    def _finish_serve(self):
+        analyzer = self.analyzer
+        self.serves_found += 1
+
+        frame_data = analyzer.export_frame_data()
+        frame_data['all_frames'] = {name: column.tolist() for name, column in frame_data['all_frames'].items()}
+        start = self._serve_started
+        result = {
+            'serve': self.serves_found,
+            'start_time': start,
+            'end_time': self._frames[-1][1],
+            'start_frame': next(frame for frame, t in self._frames if t >= start),
+            'end_frame': self._frames[-1][0],
+            'trophy_video_frame': analyzer.video_frame_for(frame_data['phases']['trophy_pose'].get('frame')),
+            'contact_video_frame': analyzer.video_frame_for(frame_data['phases']['ball_contact'].get('frame')),
+            'feedback': analyzer.generate_feedback(),
+            'frame_data': frame_data,
+        }
+        result['feedback']['frame_data'] = frame_data
+        analyzer.log(f"Serve {self.serves_found} finished at frame {result['end_frame']}")
+
+        analyzer.reset_serve()
+        self._segment_start()
+        if self.on_serve is not None:
+            self.on_serve(result)
+        return result
+
+    def finish(self):
+        """End of stream: returns the result of a serve still in follow-through, else None"""
+        if self.analyzer.current_phase == ServePhase.FOLLOW_THROUGH:
+            return self._finish_serve()
+        return None
+
+def segment_video(video_path, on_serve=None, verbose=False):
+    """Headless multi-serve analysis of a video; returns the list of serve results"""
+    from vision.pose_runner import create_pose, iter_pose_frames
+
+    serves = []
+    segmenter = ServeSegmenter(on_serve=on_serve, verbose=verbose)
+    pose = create_pose()
+    try:
+        for pose_frame in iter_pose_frames(video_path, pose):
+            result = segmenter.process_frame(pose_frame)
+            if result is not None:
+                serves.append(result)
+    finally:
+        pose.close()
+    result = segmenter.finish()
+    if result is not None:
+        serves.append(result)
+    return serves
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze every serve in a practice video")
+    parser.add_argument('video', help="Video file to analyze")
+    parser.add_argument('--output', '-o', default=None,
+                        help="Write the per-serve results here (default: <video>.serves.json)")
+    args = parser.parse_args(argv)
+
+    def report(result):
+        recommendations = ', '.join(rec['title'] for rec in result['feedback']['recommendations'])
+        print(f"Serve {result['serve']}: {result['start_time']:.1f}s - {result['end_time']:.1f}s  {recommendations}")
+
+    try:
+        serves = segment_video(args.video, on_serve=report)
+    except OSError as e:
+        print(f"FAILED {args.video}: {e}")
+        return 1
+    output = args.output or args.video + '.serves.json'
+    with open(output, 'w') as f:
+        json.dump(serves, f, indent=2, default=float)
+    print(f"{len(serves)} serves written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+# backend/serve_analysis.py
+import numpy as np
+from enum import Enum
+
+from backend.frame_store import FrameMetricStore
+from backend.landmarks import PoseFrame, POSE_LANDMARKS, landmarks_to_array
+
+# Frame interval assumed when a frame carries no usable timestamp
+DEFAULT_FRAME_INTERVAL = 1 / 30
+
+# Landmarks the analysis reads, in the order they are unpacked below
+ARM_LANDMARKS = [
+    POSE_LANDMARKS['RIGHT_SHOULDER'],
+    POSE_LANDMARKS['RIGHT_ELBOW'],
+    POSE_LANDMARKS['RIGHT_WRIST'],
+    POSE_LANDMARKS['RIGHT_HIP'],
+]
+
+class ServePhase(Enum):
+    STANCE = 0
+    ARM_COCKING = 1
+    ACCELERATION = 2
+    BALL_CONTACT = 3
+    FOLLOW_THROUGH = 4
+
+class ServeAnalyzer:
+    """Qt-free serve analysis state machine shared by the GUI and headless tools"""
+
+    def __init__(self, verbose=True, frame_store=None):
+        self.verbose = verbose
+        self.frame_count = 0
+        self.current_phase = ServePhase.STANCE
+
+        # Store all frame data for better analysis, one column per metric
+        self.frame_store = frame_store if frame_store is not None else FrameMetricStore()
+        self._reset_tracking()
+
+    def _reset_tracking(self):
+        # Store metrics at key phases
+        self.phase_metrics = {
+            ServePhase.STANCE: {},
+            ServePhase.ARM_COCKING: {},
+            ServePhase.ACCELERATION: {},
+            ServePhase.BALL_CONTACT: {},
+            ServePhase.FOLLOW_THROUGH: {}
+        }
+
+        # Tracking variables
+        self.prev_wrist_y = None
+        self.prev_timestamp = None
+        self.max_wrist_velocity = 0
+        self.contact_frame = None
+        self.min_elbow_angle = 180
+        self.min_elbow_frame = None
+        self.max_arm_height = 1.0  # Start high (y decreases going up)
+        self.arm_raising = False
+
+    def reset_serve(self):
+        """
+        Forget the current serve (phase, tracking, per-frame data) so the next one
+        can be analyzed. frame_count keeps counting, so frame numbers stay unique.
+        """
+        self._reset_tracking()
+        self.frame_store.clear()
+        if self.current_phase != ServePhase.STANCE:
+            self.set_phase(ServePhase.STANCE)
+
+    @property
+    def all_frame_data(self):
+        """Per-frame metrics as a list of dicts (materialized on every access)"""
+        return self.frame_store.as_dicts()
+
+    def video_frame_for(self, frame_number):
+        """Video frame index for an analyzer frame number (e.g. a phase's 'frame'), or None"""
+        if frame_number is None:
+            return None
+        row = self.frame_store.row_for(frame_number)
+        if row is None:
+            return None
+        frame_index = int(self.frame_store.column('frame_index')[row])
+        return frame_index if frame_index >= 0 else None
+
+    def log(self, message):
+        if self.verbose:
+            print(message)
+
+    def process_frame(self, pose_frame):
+        """Analyze one PoseFrame (a raw MediaPipe landmark list is also accepted)"""
+        self.frame_count += 1
+
+        try:
+            if isinstance(pose_frame, PoseFrame):
+                landmarks = pose_frame.landmarks
+                timestamp = pose_frame.timestamp
+                frame_index = pose_frame.frame_index
+            else:
+                landmarks = landmarks_to_array(pose_frame)
+                timestamp = None
+                frame_index = None
+
+            # One small float64 copy of just the joints we need
+            right_shoulder, right_elbow, right_wrist, right_hip = landmarks[ARM_LANDMARKS, :3].astype(np.float64)
+
+            elbow_angle = self.calculate_angle_3d(right_shoulder, right_elbow, right_wrist)
+            shoulder_abduction = self.calculate_shoulder_abduction_improved(right_shoulder, right_elbow, right_hip)
+            wrist_height = float(right_wrist[1])
+
+            # Velocity per second from real frame timestamps, so skipped frames don't distort it
+            wrist_velocity = 0
+            if self.prev_wrist_y is not None:
+                wrist_velocity = abs(self.prev_wrist_y - wrist_height) / self.frame_interval(timestamp)
+            self.prev_wrist_y = wrist_height
+            self.prev_timestamp = timestamp
+
+            self.frame_store.append(self.frame_count, elbow_angle, shoulder_abduction,
+                                    wrist_height, wrist_velocity,
+                                    -1 if frame_index is None else frame_index)
+
+            self.update_phase(elbow_angle, shoulder_abduction, wrist_height, wrist_velocity)
+
+            if self.frame_count % 5 == 0:
+                self.log(f"Frame {self.frame_count}: Phase={self.current_phase.name}, Elbow={elbow_angle:.1f}°, Shoulder={shoulder_abduction:.1f}°, Height={wrist_height:.3f}, Vel={wrist_velocity:.3f}")
+
+        except Exception as e:
+            if self.frame_count % 30 == 0:
+                self.log(f"Frame {self.frame_count}: Processing error - {e}")
+
+    def frame_interval(self, timestamp):
+        """Seconds since the previous analyzed frame"""
+        if timestamp is None or self.prev_timestamp is None:
+            return DEFAULT_FRAME_INTERVAL
+        interval = timestamp - self.prev_timestamp
+        return interval if interval > 0 else DEFAULT_FRAME_INTERVAL
+
+    def set_phase(self, phase):
+        self.current_phase = phase
+        self.on_phase_changed(phase)
+
+    def on_phase_changed(self, phase):
+        """Called after every phase transition; subclasses override to publish it"""
+
+    def on_phase_event(self, event):
+        """
+        Called as soon as a phase of the serve is characterized, with a dict:
+        'phase' ('trophy_pose', 'ball_contact' or 'follow_through'), 'frame' (the
+        analyzer frame it happened at), 'detected_at' (the frame that revealed it)
+        and its 'metrics'. After follow_through the feedback no longer changes.
+        """
+
+    def emit_phase_event(self, phase, frame, metrics):
+        self.on_phase_event({'phase': phase, 'frame': frame, 'detected_at': self.frame_count,
+                             'metrics': metrics})
+
+    def update_phase(self, elbow_angle, shoulder_abduction, wrist_height, wrist_velocity):
+        """Improved state machine logic for serve phase detection"""
+
+        if self.current_phase == ServePhase.STANCE:
+            # Detect arm raising (wrist moving up)
+            if wrist_height < 0.6 and shoulder_abduction > 60:
+                self.set_phase(ServePhase.ARM_COCKING)
+                self.arm_raising = True
+                self.log(f"\n>>> Transitioned to ARM_COCKING at frame {self.frame_count}")
+                self.log(f"    Wrist height: {wrist_height:.3f}, Shoulder: {shoulder_abduction:.1f}°")
+
+        elif self.current_phase == ServePhase.ARM_COCKING:
+            # Track the min elbow angle (maximum cocking)
+            if elbow_angle < self.min_elbow_angle:
+                self.min_elbow_angle = elbow_angle
+                self.min_elbow_frame = self.frame_count
+
+            # Track max arm height
+            if wrist_height < self.max_arm_height:
+                self.max_arm_height = wrist_height
+
+            # Trophy pose is when arm is highest and elbow is around 90-120°
+            # Transition when elbow starts extending rapidly (angle increasing)
+            if self.min_elbow_angle < 130 and elbow_angle > self.min_elbow_angle + 10:
+                self.phase_metrics[ServePhase.ARM_COCKING] = {
+                    'frame': self.min_elbow_frame,
+                    'elbow_flexion': self.min_elbow_angle,
+                    'wrist_height': self.max_arm_height
+                }
+                self.set_phase(ServePhase.ACCELERATION)
+                self.emit_phase_event('trophy_pose', self.min_elbow_frame, self.phase_metrics[ServePhase.ARM_COCKING])
+                self.log(f">>> Transitioned to ACCELERATION at frame {self.frame_count}")
+                self.log(f"    Trophy pose was at frame {self.min_elbow_frame} with elbow {self.min_elbow_angle:.1f}°")
+
+        elif self.current_phase == ServePhase.ACCELERATION:
+            # Track maximum wrist velocity (indicates contact point)
+            if wrist_velocity > self.max_wrist_velocity:
+                self.max_wrist_velocity = wrist_velocity
+                self.contact_frame = self.frame_count
+
+            # Only transition after significant velocity build-up
+            # Contact happens when velocity starts decreasing after peak
+            if (wrist_velocity < self.max_wrist_velocity * 0.6 and
+                self.max_wrist_velocity > 0.3 and
+                self.frame_count > self.contact_frame + 3):
+
+                self.phase_metrics[ServePhase.BALL_CONTACT] = {
+                    'frame': self.contact_frame,
+                    'shoulder_abduction': shoulder_abduction,
+                    'elbow_extension': elbow_angle,
+                    'max_velocity': self.max_wrist_velocity
+                }
+                self.set_phase(ServePhase.BALL_CONTACT)
+                self.emit_phase_event('ball_contact', self.contact_frame, self.phase_metrics[ServePhase.BALL_CONTACT])
+                self.log(f">>> Transitioned to BALL_CONTACT at frame {self.contact_frame}")
+                self.log(f"    Max velocity: {self.max_wrist_velocity:.3f}, Shoulder: {shoulder_abduction:.1f}°")
+
+        elif self.current_phase == ServePhase.BALL_CONTACT:
+            self.set_phase(ServePhase.FOLLOW_THROUGH)
+            self.emit_phase_event('follow_through', self.frame_count, {
+                'elbow_angle': elbow_angle,
+                'shoulder_abduction': shoulder_abduction,
+                'wrist_height': wrist_height,
+            })
+            self.log(f">>> Transitioned to FOLLOW_THROUGH at frame {self.frame_count}")
+
+    def calculate_angle_3d(self, a, b, c):
+        """Calculates the angle at point b between xyz points a-b-c"""
+        ba = a - b
+        bc = c - b
+
+        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
+        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
+
+        return np.degrees(angle)
+
+    def calculate_shoulder_abduction_improved(self, shoulder, elbow, hip):
+        """Improved shoulder abduction - angle from vertical"""
+        arm_vector = elbow - shoulder
+
+        # Dot product with the vertical reference (0, -1, 0): negative y is up
+        cosine_angle = -arm_vector[1] / np.linalg.norm(arm_vector)
+        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
+
+        return np.degrees(angle)
+
+    def export_frame_data(self, as_dicts=False):
+        """
+        Phase metrics, summary stats and per-frame data. 'all_frames' is a dict of
+        column views ({'frame': array, 'elbow_angle': array, ...}) unless as_dicts
+        is set, in which case it is the list-of-dicts layout.
+        """
+        return {
+            'total_frames': self.frame_count,
+            'phases': {
+                'trophy_pose': self.phase_metrics[ServePhase.ARM_COCKING],
+                'ball_contact': self.phase_metrics[ServePhase.BALL_CONTACT],
+            },
+            'all_frames': self.frame_store.as_dicts() if as_dicts else self.frame_store.columns(),
+            'summary_stats': {
+                'min_elbow_angle': self.min_elbow_angle,
+                'min_elbow_frame': self.min_elbow_frame,
+                'max_wrist_velocity': self.max_wrist_velocity,
+                'contact_frame': self.contact_frame,
+            }
+        }
+
+    def generate_feedback(self):
+        """Generate detailed feedback based on the detected phases"""
+        feedback = {
+            'title': 'Serve Analysis Complete',
+            'phases_detected': [],
+            'recommendations': []
+        }
+
+        # Trophy Pose
+        if self.phase_metrics[ServePhase.ARM_COCKING]:
+            trophy = self.phase_metrics[ServePhase.ARM_COCKING]
+            elbow_angle = trophy['elbow_flexion']
+
+            feedback['phases_detected'].append(
+                f"Trophy Pose (Frame {trophy['frame']}): Elbow at {elbow_angle:.1f}°"
+            )
+
+            if elbow_angle < 80:
+                feedback['recommendations'].append({
+                    'title': 'Elbow is too Bent in Trophy Pose',
+                    'advice': f"Your elbow was at {elbow_angle:.1f}° (target: 90-110°). This reduces your power arc. Form a 'bow and arrow' shape with your arm more extended."
+                })
+            elif elbow_angle > 130:
+                feedback['recommendations'].append({
+                    'title': 'Elbow is too Straight in Trophy Pose',
+                    'advice': f"Your elbow was at {elbow_angle:.1f}° (target: 90-110°). Bend your elbow more to create a powerful cocking position."
+                })
+            else:
+                feedback['phases_detected'].append("✓ Good trophy pose elbow angle")
+
+        if self.phase_metrics[ServePhase.BALL_CONTACT]:
+            contact = self.phase_metrics[ServePhase.BALL_CONTACT]
+            shoulder_angle = contact['shoulder_abduction']
+            elbow_ext = contact['elbow_extension']
+
+            feedback['phases_detected'].append(
+                f"Ball Contact (Frame {contact['frame']}): Shoulder {shoulder_angle:.1f}°, Elbow {elbow_ext:.1f}°"
+            )
+
+            if shoulder_angle < 100:
+                feedback['recommendations'].append({
+                    'title': 'Low Contact Point',
+                    'advice': f"Shoulder angle was {shoulder_angle:.1f}° (target: 120-150°). Reach higher! Contact the ball at full extension for better power and angle."
+                })
+
+            if elbow_ext < 160:
+                feedback['recommendations'].append({
+                    'title': 'Incomplete Arm Extension',
+                    'advice': f"Your elbow was at {elbow_ext:.1f}° at contact (target: 170-180°). Fully extend your arm for maximum reach and power."
+                })
+
+        if not feedback['recommendations']:
+            feedback['recommendations'].append({
+                'title': 'Excellent Form!',
+                'advice': 'Your serve mechanics look solid. Keep practicing to maintain consistency.'
+            })
+
+        return feedback
@@ -0,0 +1,482 @@
+# backend/service.py
+"""
+Local HTTP analysis service: upload clips from any machine on the network and
+collect the results later.
+
+Usage:
+    python -m backend.service [--host 0.0.0.0] [--port 8765] [--workers N] [--data-dir DIR]
+
+    curl --data-binary @serve.mp4 'http://host:8765/jobs?filename=serve.mp4&ai=1'
+    curl http://host:8765/jobs/<id>            # status and latency
+    curl http://host:8765/jobs/<id>/result     # feedback, frame data and AI text
+    curl http://host:8765/stats                # queue depth and latency percentiles
+
+Uploads are streamed to disk and hashed on the way, so identical clips are
+stored and analyzed once. Jobs live in an SQLite queue in the data directory and
+survive a restart. A dispatcher hands at most one job per worker to a pool of
+processes that each keep a warm pose model (the same workers as backend.batch),
+so memory stays bounded however many clips are waiting. If a worker process
+dies (a native crash or the OOM killer), the pool is rebuilt and the jobs it was
+running are queued again. Results are written to JSON files and served from disk.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from backend.batch import VIDEO_EXTENSIONS, _init_worker, _process_job, write_json
+from backend.instrumentation import Profiler
+
+DEFAULT_DATA_DIR = os.getenv('SPIKESIGHT_SERVICE_DIR',
+                             os.path.join(os.path.expanduser('~'), '.local', 'share', 'spikesight', 'service'))
+DEFAULT_PORT = 8765
+DEFAULT_MAX_UPLOAD_MB = 2048
+UPLOAD_CHUNK = 1024 * 1024
+# Concurrent OpenAI requests for jobs submitted with ai=1
+AI_THREADS = 4
+# A job running while a worker died this many times fails instead of being queued again
+# (a dead pool fails every job it was running, so this can't be 1)
+MAX_WORKER_CRASHES = 3
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    filename TEXT,
+    video_path TEXT NOT NULL,
+    ai INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_content ON jobs (content_hash, ai);
+"""
+
+class JobQueue:
+    """Persistent job queue in SQLite, shared by the HTTP threads and the dispatcher"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(JOB_SCHEMA)
+        self._lock = threading.Lock()
+
+    def submit(self, content_hash, filename, video_path, ai):
+        """Queue a job; returns (job, deduplicated). A failed duplicate is queued again."""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT * FROM jobs WHERE content_hash = ? AND ai = ?",
+                                    (content_hash, int(ai))).fetchone()
+            if row is not None and row['status'] != 'failed':
+                return dict(row), True
+            now = time.time()
+            if row is not None:
+                self.conn.execute("UPDATE jobs SET status = 'queued', submitted_at = ?, started_at = NULL, "
+                                  "finished_at = NULL, error = NULL WHERE id = ?", (now, row['id']))
+                job_id = row['id']
+            else:
+                job_id = uuid.uuid4().hex[:16]
+                self.conn.execute("INSERT INTO jobs (id, content_hash, filename, video_path, ai, status, submitted_at) "
+                                  "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                                  (job_id, content_hash, filename, video_path, int(ai), now))
+            return dict(self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()), False
+
+    def claim(self, limit):
+        """Mark up to `limit` of the oldest queued jobs as running and return them"""
+        with self._lock, self.conn:
+            rows = self.conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY submitted_at LIMIT ?",
+                                     (limit,)).fetchall()
+            now = time.time()
+            self.conn.executemany("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                                  [(now, row['id']) for row in rows])
+        return [dict(row, status='running', started_at=now) for row in rows]
+
+    def requeue(self, job_id):
+        """Put a running job back at its place in the queue"""
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE id = ?", (job_id,))
+
+    def finish(self, job_id, error=None):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                              ('failed' if error else 'done', time.time(), error, job_id))
+
+    def requeue_running(self):
+        """Jobs that were running when the service stopped start over"""
+        with self._lock, self.conn:
+            return self.conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL "
+                                     "WHERE status = 'running'").rowcount
+
+    def get(self, job_id):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def list(self, status=None, limit=100):
+        query, params = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY submitted_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(query, params)]
+
+    def counts(self):
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        self.conn.close()
+
+def job_summary(job):
+    """Public view of a job row, with its latency so far"""
+    now = time.time()
+    submitted, started, finished = job['submitted_at'], job['started_at'], job['finished_at']
+    summary = {
+        'id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'ai': bool(job['ai']),
+        'content_hash': job['content_hash'],
+        'submitted_at': submitted,
+        'queue_seconds': (started or now) - submitted,
+        'run_seconds': (finished or now) - started if started else None,
+        'total_seconds': (finished or now) - submitted,
+        'error': job['error'],
+    }
+    if job['status'] == 'done':
+        summary['result'] = f"/jobs/{job['id']}/result"
+    return summary
+
+class AnalysisService:
+    """Upload storage, the job queue and the worker pool behind the HTTP handler"""
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, workers=None, cache_dir=None,
+                 max_upload_bytes=DEFAULT_MAX_UPLOAD_MB * 1024 * 1024):
+        self.data_dir = data_dir
+        self.upload_dir = os.path.join(data_dir, 'uploads')
+        self.result_dir = os.path.join(data_dir, 'results')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.result_dir, exist_ok=True)
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.max_upload_bytes = max_upload_bytes
+
+        self.queue = JobQueue(os.path.join(data_dir, 'jobs.sqlite3'))
+        # Latency per job stage: queue_wait, analysis, ai and total
+        self.profiler = Profiler(enabled=True)
+        self.started_at = time.time()
+        self.pool = None
+        self.ai_pool = None
+        self._in_flight = 0
+        self._crashes = {}  # job id -> worker deaths while it was running
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._dispatcher = None
+
+    def start(self):
+        requeued = self.queue.requeue_running()
+        if requeued:
+            print(f"Requeued {requeued} jobs interrupted by the last shutdown")
+        self.pool = self._new_pool()
+        self.ai_pool = ThreadPoolExecutor(max_workers=AI_THREADS, thread_name_prefix='ai')
+        self._running = True
+        self._dispatcher = threading.Thread(target=self._dispatch, name='dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def _new_pool(self):
+        # Spawn keeps MediaPipe's native threads out of forked children
+        pool = ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(self.cache_dir,))
+        # Start every worker now so the first uploads don't wait for model loading
+        for _ in range(self.workers):
+            pool.submit(int)
+        return pool
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5)
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.ai_pool is not None:
+            self.ai_pool.shutdown(wait=False, cancel_futures=True)
+        self.queue.close()
+
+    def store_upload(self, stream, length, filename):
+        """Copy an upload to disk in chunks while hashing it; returns (content hash, path)"""
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension not in VIDEO_EXTENSIONS:
+            extension = '.mp4'
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(self.upload_dir, f".upload_{uuid.uuid4().hex}")
+        try:
+            with open(tmp_path, 'wb') as f:
+                remaining = length
+                while remaining > 0:
+                    chunk = stream.read(min(UPLOAD_CHUNK, remaining))
+                    if not chunk:
+                        raise ValueError(f"Upload ended {remaining} bytes early")
+                    digest.update(chunk)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            content_hash = digest.hexdigest()
+            path = os.path.join(self.upload_dir, content_hash + extension)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return content_hash, path
+
+    def submit(self, stream, length, filename=None, ai=False):
+        content_hash, path = self.store_upload(stream, length, filename)
+        job, deduplicated = self.queue.submit(content_hash, filename, path, ai)
+        if not deduplicated:
+            self._wake.set()
+        return job, deduplicated
+
+    def result_path(self, job_id):
+        return os.path.join(self.result_dir, job_id + '.json')
+
+    def _dispatch(self):
+        """Keep every worker busy with one job; the rest wait in the queue, not in memory"""
+        while self._running:
+            with self._lock:
+                free = self.workers - self._in_flight
+            if free > 0:
+                for job in self.queue.claim(free):
+                    with self._lock:
+                        self._in_flight += 1
+                    self.profiler.record('queue_wait', job['started_at'] - job['submitted_at'])
+                    try:
+                        future = self.pool.submit(_process_job, job['video_path'])
+                    except BrokenProcessPool:
+                        # A worker died; its jobs are being requeued by _on_analyzed
+                        print("A worker process died; restarting the worker pool")
+                        self.pool.shutdown(wait=False)
+                        self.pool = self._new_pool()
+                        future = self.pool.submit(_process_job, job['video_path'])
+                    future.add_done_callback(lambda future, job=job: self._on_analyzed(job, future))
+            self._wake.wait(timeout=1.0)
+            self._wake.clear()
+
+    def _on_analyzed(self, job, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._wake.set()
+
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            self._on_worker_died(job)
+            return
+        except Exception as e:
+            result = {'error': f"{type(e).__name__}: {e}"}
+        if 'error' in result:
+            self._finish(job, None, result['error'])
+            return
+        self.profiler.record('analysis', result['seconds'])
+        if job['ai']:
+            self.ai_pool.submit(self._add_ai, job, result)
+        else:
+            self._finish(job, result)
+
+    def _on_worker_died(self, job):
+        """Queue a job that was running in a dead worker pool again, up to MAX_WORKER_CRASHES times"""
+        with self._lock:
+            crashes = self._crashes[job['id']] = self._crashes.get(job['id'], 0) + 1
+        if crashes >= MAX_WORKER_CRASHES:
+            self._finish(job, None, f"Worker process died {crashes} times while analyzing this video")
+            return
+        self.queue.requeue(job['id'])
+        print(f"Job {job['id']} ({job['filename']}) requeued: a worker process died")
+        self._wake.set()
+
+    def _add_ai(self, job, result):
+        from backend.api_helper import analyze_with_openai
+
+        with self.profiler.timed('ai'):
+            analyze_with_openai(result['feedback'])
+        self._finish(job, result)
+
+    def _finish(self, job, result, error=None):
+        if result is not None:
+            result = dict(result, job=job['id'], filename=job['filename'], content_hash=job['content_hash'])
+            try:
+                write_json(self.result_path(job['id']), result)
+            except OSError as e:
+                error = f"Could not write result: {e}"
+        self.queue.finish(job['id'], error)
+        with self._lock:
+            self._crashes.pop(job['id'], None)
+        self.profiler.record('total', time.time() - job['submitted_at'])
+        print(f"Job {job['id']} ({job['filename']}) {'failed: ' + error if error else 'done'}")
+
+    def stats(self):
+        counts = self.queue.counts()
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            'workers': self.workers,
+            'uptime_s': time.time() - self.started_at,
+            'queue_depth': counts.get('queued', 0),
+            'running': in_flight,
+            'jobs': counts,
+            'latency': self.profiler.summary()['stages'],
+        }
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service = None   # set by make_server
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, data):
+        body = json.dumps(data, indent=2, default=float).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': message})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            self.send_error_json(404, "Not found")
+            return
+        params = parse_qs(url.query)
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self.send_error_json(411, "Content-Length required")
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            self.send_error_json(400, "Empty upload")
+            return
+        if length > self.service.max_upload_bytes:
+            # Don't read the body; drop the connection instead
+            self.close_connection = True
+            self.send_error_json(413, f"Upload larger than {self.service.max_upload_bytes} bytes")
+            return
+
+        filename = params.get('filename', [None])[0]
+        ai = params.get('ai', ['0'])[0].lower() in ('1', 'true', 'yes')
+        try:
+            job, deduplicated = self.service.submit(self.rfile, length, filename, ai)
+        except (OSError, ValueError) as e:
+            self.close_connection = True
+            self.send_error_json(400, str(e))
+            return
+        self.send_json(200 if deduplicated else 202, dict(job_summary(job), deduplicated=deduplicated))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        params = parse_qs(url.query)
+
+        if parts == ['stats']:
+            self.send_json(200, self.service.stats())
+        elif parts == ['jobs']:
+            status = params.get('status', [None])[0]
+            try:
+                limit = int(params.get('limit', ['100'])[0])
+            except ValueError:
+                limit = 0
+            if limit <= 0:
+                self.send_error_json(400, "limit must be a positive integer")
+                return
+            self.send_json(200, [job_summary(job) for job in self.service.queue.list(status, limit)])
+        elif len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.queue.get(parts[1])
+            if job is None:
+                self.send_error_json(404, "No such job")
+            elif len(parts) == 2:
+                self.send_json(200, job_summary(job))
+            elif parts[2] != 'result':
+                self.send_error_json(404, "Not found")
+            elif job['status'] != 'done':
+                self.send_error_json(409, f"Job is {job['status']}")
+            else:
+                self.send_result(job['id'])
+        else:
+            self.send_error_json(404, "Not found")
+
+    def send_result(self, job_id):
+        """Stream the stored result file instead of loading it"""
+        path = self.service.result_path(job_id)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            self.send_error_json(404, "Result file missing")
+            return
+        with f:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+            while True:
+                chunk = f.read(UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+def make_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    handler = type('BoundServiceHandler', (ServiceHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve analysis jobs over HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (0.0.0.0 for the whole network)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', '-j', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Uploads, results and the job database")
+    parser.add_argument('--cache-dir', default=None, help="Landmark cache shared with the workers")
+    parser.add_argument('--max-upload-mb', type=int, default=DEFAULT_MAX_UPLOAD_MB)
+    args = parser.parse_args(argv)
+
+    service = AnalysisService(args.data_dir, args.workers, args.cache_dir, args.max_upload_mb * 1024 * 1024)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    print(f"SpikeSight service on http://{args.host}:{server.server_port} with {service.workers} workers "
+          f"(data in {args.data_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# backend/session_export.py
+"""
+Columnar session files: per-frame metrics and raw landmarks on disk.
+
+A session file is an uncompressed .npz: one .npy member per column plus a
+header.json member with the phases, summary_stats, feedback and column list.
+Any NumPy can read it with np.load, but open_session() memory-maps each column
+straight out of the zip on first access, so opening a session only parses the
+header and loading a column costs I/O proportional to that column.
+
+    with open_session('serve.npz') as session:
+        session.header['phases']['trophy_pose']
+        session['elbow_angle'].min()        # maps just this column
+"""
+import json
+import os
+import struct
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+FORMAT_VERSION = 1
+HEADER_NAME = 'header.json'
+
+# Columns taken from landmark records (e.g. LandmarkCache entries), one row per detected pose
+RECORD_COLUMNS = {'frame': 'video_frame', 'timestamp': 'timestamp', 'landmarks': 'landmarks'}
+
+# Size of the fixed part of a zip local file header
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+def write_session(path, columns, header):
+    """Write named arrays and a JSON-able header as an uncompressed, memory-mappable .npz"""
+    header = dict(header, format_version=FORMAT_VERSION, columns={
+        name: {'dtype': np.asarray(array).dtype.str, 'shape': list(np.shape(array))}
+        for name, array in columns.items()
+    })
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+        zf.writestr(HEADER_NAME, json.dumps(header, indent=2, default=float))
+        for name, array in columns.items():
+            with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+                np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+    os.replace(tmp_path, path)
+    return path
+
+def export_session(path, analyzer, records=None, feedback=None, video_path=None, **extra):
+    """
+    Save an analyzer's per-frame metrics, phases and summary stats, plus the raw
+    landmarks from `records` (CACHE_DTYPE records, e.g. from LandmarkCache.load).
+    Metric columns have one row per analyzed frame; record columns one per pose.
+    """
+    frame_data = analyzer.export_frame_data()
+    columns = dict(frame_data['all_frames'])
+    if records is not None:
+        for field, name in RECORD_COLUMNS.items():
+            columns[name] = records[field]
+
+    header = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'video': video_path,
+        'total_frames': frame_data['total_frames'],
+        'phases': frame_data['phases'],
+        'summary_stats': frame_data['summary_stats'],
+        'feedback': feedback if feedback is not None else analyzer.generate_feedback(),
+    }
+    header.update(extra)
+    # The feedback may already carry a copy of the frame data
+    header['feedback'] = {key: value for key, value in header['feedback'].items() if key != 'frame_data'}
+    return write_session(path, columns, header)
+
+class SessionArchive:
+    """A session file opened for lazy, memory-mapped column access"""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.header = json.loads(self._zip.read(HEADER_NAME))
+        self._columns = {}
+
+    def keys(self):
+        return list(self.header['columns'])
+
+    def __contains__(self, name):
+        return name in self.header['columns']
+
+    def __getitem__(self, name):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = self._map(name)
+        return column
+
+    def _map(self, name):
+        info = self._zip.getinfo(name + '.npy')
+        if info.compress_type != zipfile.ZIP_STORED:
+            # Written by something else (e.g. np.savez_compressed); read it normally
+            with self._zip.open(info) as f:
+                return np.lib.format.read_array(f, allow_pickle=False)
+
+        with open(self.path, 'rb') as f:
+            f.seek(info.header_offset)
+            fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            name_length, extra_length = fields[-2], fields[-1]
+            f.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    def close(self):
+        self._columns.clear()
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_session(path):
+    return SessionArchive(path)
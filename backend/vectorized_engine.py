@@ -0,0 +1,166 @@
+# backend/vectorized_engine.py
+import numpy as np
+
+from backend.landmarks import POSE_LANDMARKS
+from backend.serve_analysis import DEFAULT_FRAME_INTERVAL, ServeAnalyzer, ServePhase
+
+# Landmarks used by the analysis
+RIGHT_SHOULDER = POSE_LANDMARKS['RIGHT_SHOULDER']
+RIGHT_ELBOW = POSE_LANDMARKS['RIGHT_ELBOW']
+RIGHT_WRIST = POSE_LANDMARKS['RIGHT_WRIST']
+
+def compute_clip_metrics(landmarks, timestamps=None):
+    """
+    Per-frame metrics for a whole clip.
+
+    landmarks: (n_frames, 33, 4) array of x, y, z, visibility.
+    timestamps: optional (n_frames,) frame times in seconds; without them
+    frames are assumed to be DEFAULT_FRAME_INTERVAL apart.
+    Returns a dict of (n_frames,) float64 arrays with the same values the
+    per-frame ServeAnalyzer computes.
+    """
+    landmarks = np.asarray(landmarks)
+    shoulder = landmarks[:, RIGHT_SHOULDER, :3].astype(np.float64)
+    elbow = landmarks[:, RIGHT_ELBOW, :3].astype(np.float64)
+    wrist = landmarks[:, RIGHT_WRIST, :3].astype(np.float64)
+
+    ba = shoulder - elbow
+    bc = wrist - elbow
+    cosine = np.einsum('ij,ij->i', ba, bc) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1))
+    elbow_angle = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+    # Angle between the upper arm and straight up (negative y)
+    arm = elbow - shoulder
+    cosine = -arm[:, 1] / np.linalg.norm(arm, axis=1)
+    shoulder_abduction = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+    wrist_height = wrist[:, 1]
+    wrist_velocity = np.zeros(len(wrist_height))
+    if timestamps is None:
+        intervals = np.full(max(len(wrist_height) - 1, 0), DEFAULT_FRAME_INTERVAL)
+    else:
+        intervals = np.diff(np.asarray(timestamps, dtype=np.float64))
+        intervals[intervals <= 0] = DEFAULT_FRAME_INTERVAL
+    wrist_velocity[1:] = np.abs(np.diff(wrist_height)) / intervals
+
+    return {
+        'elbow_angle': elbow_angle,
+        'shoulder_abduction': shoulder_abduction,
+        'wrist_height': wrist_height,
+        'wrist_velocity': wrist_velocity,
+    }
+
+def _running_min(values, initial):
+    """Running minimum seeded with `initial`, plus the index where each minimum was set (-1 if never)"""
+    running = np.minimum.accumulate(np.concatenate(([initial], values)))
+    is_new = values < running[:-1]
+    set_at = np.maximum.accumulate(np.where(is_new, np.arange(len(values)), -1))
+    return running[1:], set_at
+
+def _running_max(values, initial):
+    """Running maximum seeded with `initial`, plus the index where each maximum was set (-1 if never)"""
+    running = np.maximum.accumulate(np.concatenate(([initial], values)))
+    is_new = values > running[:-1]
+    set_at = np.maximum.accumulate(np.where(is_new, np.arange(len(values)), -1))
+    return running[1:], set_at
+
+def _first(mask):
+    hits = np.flatnonzero(mask)
+    return int(hits[0]) if len(hits) else None
+
+class VectorizedAnalyzer(ServeAnalyzer):
+    """
+    Offline drop-in for ServeAnalyzer that analyzes a whole clip at once.
+
+    Metrics are computed for every frame with array operations and the phase
+    transitions are located with running min/max scans that reproduce the
+    per-frame state machine in ServeAnalyzer.update_phase. After analyze() the
+    usual export_frame_data() and generate_feedback() work unchanged.
+    """
+
+    def __init__(self, verbose=False):
+        super().__init__(verbose)
+
+    def analyze(self, landmarks, timestamps=None, frame_indices=None):
+        """frame_indices: optional (n_frames,) video frame indices, for video_frame_for()"""
+        metrics = compute_clip_metrics(landmarks, timestamps)
+        self.frame_count = len(metrics['elbow_angle'])
+        if frame_indices is None:
+            frame_indices = np.full(self.frame_count, -1)
+        self.frame_store.extend(dict(metrics, frame=np.arange(1, self.frame_count + 1),
+                                     frame_index=frame_indices))
+        if self.frame_count:
+            self.prev_wrist_y = float(metrics['wrist_height'][-1])
+            if timestamps is not None:
+                self.prev_timestamp = float(timestamps[-1])
+        self.detect_phases(metrics)
+        return self
+
+    def detect_phases(self, metrics):
+        elbow = metrics['elbow_angle']
+        shoulder = metrics['shoulder_abduction']
+        height = metrics['wrist_height']
+        velocity = metrics['wrist_velocity']
+        n = len(elbow)
+
+        # STANCE -> ARM_COCKING on the first frame with the wrist raised
+        start = _first((height < 0.6) & (shoulder > 60))
+        if start is None:
+            return
+        self.set_phase(ServePhase.ARM_COCKING)
+        self.arm_raising = True
+        self.log(f"\n>>> Transitioned to ARM_COCKING at frame {start + 1}")
+
+        # ARM_COCKING tracks the running elbow minimum from the next frame on
+        offset = start + 1
+        min_elbow, min_at = _running_min(elbow[offset:], self.min_elbow_angle)
+        max_height, _ = _running_min(height[offset:], self.max_arm_height)
+        trophy = _first((min_elbow < 130) & (elbow[offset:] > min_elbow + 10))
+
+        end = trophy if trophy is not None else len(min_elbow) - 1
+        if end >= 0:
+            self.min_elbow_angle = min_elbow[end]
+            self.min_elbow_frame = offset + int(min_at[end]) + 1 if min_at[end] >= 0 else None
+            self.max_arm_height = max_height[end]
+        if trophy is None:
+            return
+
+        self.phase_metrics[ServePhase.ARM_COCKING] = {
+            'frame': self.min_elbow_frame,
+            'elbow_flexion': self.min_elbow_angle,
+            'wrist_height': self.max_arm_height
+        }
+        self.set_phase(ServePhase.ACCELERATION)
+        self.log(f">>> Transitioned to ACCELERATION at frame {offset + trophy + 1}")
+        self.log(f"    Trophy pose was at frame {self.min_elbow_frame} with elbow {self.min_elbow_angle:.1f}°")
+
+        # ACCELERATION tracks the running wrist velocity peak as the contact frame
+        offset = offset + trophy + 1
+        max_velocity, max_at = _running_max(velocity[offset:], self.max_wrist_velocity)
+        frames = np.arange(offset, n) + 1
+        contact_frames = np.where(max_at >= 0, offset + max_at + 1, 0)
+        contact = _first((velocity[offset:] < max_velocity * 0.6) &
+                         (max_velocity > 0.3) &
+                         (frames > contact_frames + 3))
+
+        end = contact if contact is not None else len(max_velocity) - 1
+        if end >= 0:
+            self.max_wrist_velocity = max_velocity[end]
+            self.contact_frame = int(contact_frames[end]) if max_at[end] >= 0 else None
+        if contact is None:
+            return
+
+        index = offset + contact
+        self.phase_metrics[ServePhase.BALL_CONTACT] = {
+            'frame': self.contact_frame,
+            'shoulder_abduction': shoulder[index],
+            'elbow_extension': elbow[index],
+            'max_velocity': self.max_wrist_velocity
+        }
+        self.set_phase(ServePhase.BALL_CONTACT)
+        self.log(f">>> Transitioned to BALL_CONTACT at frame {self.contact_frame}")
+
+        # BALL_CONTACT always moves on to FOLLOW_THROUGH on the next frame
+        if index + 1 < n:
+            self.set_phase(ServePhase.FOLLOW_THROUGH)
+            self.log(f">>> Transitioned to FOLLOW_THROUGH at frame {index + 2}")
@@ -0,0 +1,64 @@
+# benchmarks/bench_analysis.py
+"""
+Per-frame ServeAnalyzer vs VectorizedAnalyzer on synthetic landmark clips.
+
+Usage:
+    python -m benchmarks.bench_analysis [--frames 300 3000 30000] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.landmarks import PoseFrame
+from backend.serve_analysis import ServeAnalyzer
+from backend.vectorized_engine import VectorizedAnalyzer
+from benchmarks.synthetic import synthetic_serve_landmarks
+
+def run_per_frame(landmarks):
+    analyzer = ServeAnalyzer(verbose=False)
+    for i, frame in enumerate(landmarks):
+        analyzer.process_frame(PoseFrame(frame, i, i / 30))
+    return analyzer
+
+def run_vectorized(landmarks):
+    timestamps = np.arange(len(landmarks)) / 30
+    return VectorizedAnalyzer().analyze(landmarks, timestamps)
+
+def best_time(fn, landmarks, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(landmarks)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def phases_match(a, b):
+    """Same phase frames and metrics (to float rounding) from both engines"""
+    pa = a.export_frame_data()['phases']
+    pb = b.export_frame_data()['phases']
+    for phase in pa:
+        if pa[phase].keys() != pb[phase].keys():
+            return False
+        for key in pa[phase]:
+            if not np.isclose(pa[phase][key], pb[phase][key]):
+                return False
+    return a.generate_feedback() == b.generate_feedback()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame and vectorized analysis engines")
+    parser.add_argument('--frames', type=int, nargs='+', default=[300, 3000, 30000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'frames':>8} {'per-frame fps':>14} {'vectorized fps':>15} {'speedup':>8}  match")
+    for n_frames in args.frames:
+        landmarks = synthetic_serve_landmarks(n_frames)
+        t_frame, per_frame = best_time(run_per_frame, landmarks, args.repeat)
+        t_vec, vectorized = best_time(run_vectorized, landmarks, args.repeat)
+        print(f"{n_frames:>8} {n_frames / t_frame:>14,.0f} {n_frames / t_vec:>15,.0f} "
+              f"{t_frame / t_vec:>7.1f}x  {phases_match(per_frame, vectorized)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/decode.py
+"""
+Decode-only benchmark: the cost of getting a frame ready for pose inference.
+
+Usage:
+    python -m benchmarks.decode [--resolution 2160p] [--frames 120] [--width 1280]
+                                [--video clip.mp4] [--output decode.json]
+
+Each case decodes the whole video and converts every frame to the RGB input
+MediaPipe gets, in a fresh process:
+  opencv_full  cv2.VideoCapture.read() and cvtColor at full resolution, a new
+               frame and a new RGB copy per iteration (the previous pipeline)
+  opencv       vision.decode's OpenCV backend: reused decode buffer, downscaled
+               into the frame ring, RGB conversion of the small frame
+  ffmpeg       vision.decode's ffmpeg backend (skipped without an ffmpeg binary)
+Reported per case: decode+convert time per frame, fps, minor page faults per
+frame (fresh memory touched, i.e. allocation churn) and peak RSS.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.run import DEFAULT_VIDEO_DIR, RESOLUTIONS, _peak_rss_mb, video_path_for
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Phone footage sizes on top of the suite's resolutions
+DECODE_RESOLUTIONS = dict(RESOLUTIONS, **{'2160p': (3840, 2160)})
+BACKENDS = ('opencv_full', 'opencv', 'ffmpeg')
+
+def _minor_faults():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_minflt if resource is not None else 0
+
+def _run_case(backend, video_path, width):
+    """Runs in a fresh worker process"""
+    import cv2
+    from vision.decode import open_decoder, ring_slots_for
+
+    frames = 0
+    if backend == 'opencv_full':
+        cap = cv2.VideoCapture(video_path)
+        faults = _minor_faults()
+        start = time.perf_counter()
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            frames += 1
+        seconds = time.perf_counter() - start
+        cap.release()
+        size = None
+    else:
+        # Sized like the GUI pipeline's ring
+        decoder = open_decoder(video_path, backend, width, ring_slots=ring_slots_for([4, 4]))
+        rgb = None
+        faults = _minor_faults()
+        start = time.perf_counter()
+        while True:
+            item = decoder.read()
+            if item is None:
+                break
+            rgb = cv2.cvtColor(item[1], cv2.COLOR_BGR2RGB, dst=rgb)
+            frames += 1
+        seconds = time.perf_counter() - start
+        decoder.close()
+        size = list(decoder.size)
+    faults = _minor_faults() - faults
+
+    return {
+        'frames': frames,
+        'seconds': seconds,
+        'ms_per_frame': 1000 * seconds / frames if frames else 0.0,
+        'fps': frames / seconds if seconds > 0 else 0.0,
+        'page_faults_per_frame': faults / frames if frames else 0.0,
+        'output_size': size,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+def run_cases(video_path, width, backends=BACKENDS):
+    from vision.decode import FFMPEG
+
+    # Spawn gives every case a clean process, so peak RSS and page faults are per case
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for backend in backends:
+        if backend == 'ffmpeg' and not FFMPEG:
+            print(f"{backend:<12} skipped (no ffmpeg binary; set SPIKESIGHT_FFMPEG)")
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                result = pool.submit(_run_case, backend, video_path, width).result()
+            except Exception as e:
+                print(f"{backend:<12} FAILED: {e}")
+                results[backend] = {'error': str(e)}
+                continue
+        results[backend] = result
+        rss = result['peak_rss_mb']
+        print(f"{backend:<12} {result['ms_per_frame']:7.2f} ms/frame {result['fps']:8.1f} fps "
+              f"{result['page_faults_per_frame']:8.0f} faults/frame"
+              f"{'' if rss is None else f'{rss:7.0f} MB peak'}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark video decode backends")
+    parser.add_argument('--resolution', default='2160p', choices=list(DECODE_RESOLUTIONS),
+                        help="Synthetic video to render and decode")
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--width', type=int, default=None,
+                        help="Decode width for the ring backends (default: the app's SPIKESIGHT_DECODE_WIDTH)")
+    parser.add_argument('--video', default=None, help="Decode this file instead of a synthetic video")
+    parser.add_argument('--video-dir', default=DEFAULT_VIDEO_DIR)
+    parser.add_argument('--output', '-o', default=None, help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    from vision.decode import DEFAULT_DECODE_WIDTH
+    width = args.width or DEFAULT_DECODE_WIDTH
+    video_path = args.video
+    if video_path is None:
+        video_path = video_path_for(args.video_dir, args.resolution, args.frames)
+        if not os.path.exists(video_path):
+            from benchmarks.synthetic import write_synthetic_serve_video
+            os.makedirs(args.video_dir, exist_ok=True)
+            print(f"Rendering {video_path}")
+            write_synthetic_serve_video(video_path, args.frames, *DECODE_RESOLUTIONS[args.resolution])
+
+    print(f"Decoding {video_path} (ring backends at {width} px wide)")
+    results = run_cases(video_path, width)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'video': video_path, 'width': width, 'results': results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+# benchmarks/run.py
+"""
+Benchmark suite: decode, inference, analysis, rendering and end-to-end throughput.
+
+Usage:
+    python -m benchmarks.run [--quick] [--output results.json]
+                             [--baseline benchmarks/baseline.json] [--update-baseline]
+
+Synthetic serve videos are rendered at several resolutions and lengths (kept in
+--video-dir between runs) and synthetic landmark trajectories feed the analysis
+cases, so the suite runs offline on a CPU-only machine. Every case runs in a fresh
+process, which makes its peak RSS meaningful. Results are written as JSON and
+compared against the baseline file if one exists; --update-baseline replaces it
+with this run. The exit code is 1 when a case regressed beyond --tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESOLUTIONS = {
+    '480p': (854, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_VIDEO_DIR = os.path.join(tempfile.gettempdir(), 'spikesight_bench_videos')
+
+# Analysis cases take milliseconds, so report the best of a few runs
+ANALYSIS_REPEAT = 5
+
+# Relative slowdown (fps) or growth (peak memory) that counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+def build_cases(quick=False):
+    """(name, kind, params) for every benchmark case"""
+    lengths = [60] if quick else [150, 600]
+    resolutions = ['480p', '720p'] if quick else list(RESOLUTIONS)
+    inference_frames = 20 if quick else 60
+    analysis_lengths = [300, 3000] if quick else [300, 3000, 30000]
+
+    from vision.decode import FFMPEG
+
+    cases = []
+    # The app's decode backends, as VideoProcessor opens them (ffmpeg only where installed)
+    for backend in ('opencv', 'ffmpeg') if FFMPEG else ('opencv',):
+        for res in resolutions:
+            for n in lengths:
+                cases.append((f"decode/{backend}/{res}/{n}", 'decode',
+                              {'resolution': res, 'frames': n, 'backend': backend}))
+    for res in resolutions:
+        cases.append((f"inference/{res}", 'inference', {'resolution': res, 'frames': inference_frames}))
+    for n in analysis_lengths:
+        cases.append((f"analysis_per_frame/{n}", 'analysis_per_frame', {'frames': n}))
+        cases.append((f"analysis_vectorized/{n}", 'analysis_vectorized', {'frames': n}))
+    for res in resolutions:
+        cases.append((f"render/{res}", 'render', {'resolution': res, 'frames': lengths[0]}))
+    cases.append((f"e2e_headless/720p/{lengths[0]}", 'e2e_headless', {'resolution': '720p', 'frames': lengths[0]}))
+    cases.append((f"e2e_pipeline/720p/{lengths[0]}", 'e2e_pipeline', {'resolution': '720p', 'frames': lengths[0]}))
+    return cases
+
+def video_path_for(video_dir, resolution, n_frames):
+    return os.path.join(video_dir, f"serve_{resolution}_{n_frames}.mp4")
+
+def prepare_videos(cases, video_dir):
+    """Render every synthetic video the cases need that isn't already in video_dir"""
+    from benchmarks.synthetic import write_synthetic_serve_video
+
+    os.makedirs(video_dir, exist_ok=True)
+    needed = sorted({(p['resolution'], p['frames']) for _, kind, p in cases
+                     if 'resolution' in p and kind != 'render'})
+    for res, n in needed:
+        path = video_path_for(video_dir, res, n)
+        if not os.path.exists(path):
+            width, height = RESOLUTIONS[res]
+            print(f"Rendering {path}")
+            write_synthetic_serve_video(path, n, width, height)
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _decode(video_path, backend):
+    from vision.decode import open_decoder, ring_slots_for, DEFAULT_DECODE_WIDTH
+
+    # Sized and scaled like the GUI pipeline's decoder
+    decoder = open_decoder(video_path, backend, DEFAULT_DECODE_WIDTH, ring_slots=ring_slots_for([4, 4]))
+    start = time.perf_counter()
+    frames = 0
+    while decoder.read() is not None:
+        frames += 1
+    elapsed = time.perf_counter() - start
+    decoder.close()
+    return frames, elapsed
+
+def _warm_up(pose, video_path):
+    """Run the model once on the video's first frame: the first call builds the inference graph"""
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    ret, frame = cap.read()
+    cap.release()
+    if ret:
+        pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    pose.reset()
+
+def _inference(video_path, n_frames):
+    import cv2
+    from vision.pose_runner import create_pose
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < n_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+
+    pose = create_pose()
+    # The first call loads the model; keep it out of the timing
+    pose.process(frames[0])
+    start = time.perf_counter()
+    for frame in frames:
+        pose.process(frame)
+    elapsed = time.perf_counter() - start
+    pose.close()
+    return len(frames), elapsed
+
+def _analysis_per_frame(n_frames):
+    from benchmarks.bench_analysis import best_time, run_per_frame
+    from benchmarks.synthetic import synthetic_serve_landmarks
+
+    landmarks = synthetic_serve_landmarks(n_frames)
+    seconds, _ = best_time(run_per_frame, landmarks, ANALYSIS_REPEAT)
+    return n_frames, seconds
+
+def _analysis_vectorized(n_frames):
+    from benchmarks.bench_analysis import best_time, run_vectorized
+    from benchmarks.synthetic import synthetic_serve_landmarks
+
+    landmarks = synthetic_serve_landmarks(n_frames)
+    seconds, _ = best_time(run_vectorized, landmarks, ANALYSIS_REPEAT)
+    return n_frames, seconds
+
+def _render(resolution, n_frames):
+    """DisplayBuffer downscale + pose drawing + the GUI's QImage/QPixmap conversion"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import numpy as np
+    from PyQt5.QtGui import QGuiApplication, QImage, QPixmap
+    from benchmarks.synthetic import synthetic_serve_landmarks
+    from vision.display import DisplayBuffer
+    from vision.drawing import draw_pose
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    width, height = RESOLUTIONS[resolution]
+    frame = np.full((height, width, 3), 128, dtype=np.uint8)
+    landmarks = synthetic_serve_landmarks(n_frames)
+    display = DisplayBuffer(max_fps=0)
+    display.set_target_size(800, 450)
+
+    start = time.perf_counter()
+    for i in range(n_frames):
+        display.submit(frame, lambda image: draw_pose(image, landmarks[i]))
+        with display.latest() as rgb_image:
+            h, w, ch = rgb_image.shape
+            QPixmap.fromImage(QImage(rgb_image.data, w, h, ch * w, QImage.Format_RGB888))
+    elapsed = time.perf_counter() - start
+    del app
+    return n_frames, elapsed
+
+def _e2e_headless(video_path, n_frames):
+    from backend.batch import analyze_video
+    from vision.pose_runner import create_pose
+
+    # Model loading stays out of the timing, as in the pipeline case
+    pose = create_pose()
+    _warm_up(pose, video_path)
+    start = time.perf_counter()
+    analyze_video(video_path, pose)
+    elapsed = time.perf_counter() - start
+    pose.close()
+    return n_frames, elapsed
+
+def _e2e_pipeline(video_path, n_frames):
+    """VideoProcessor's staged pipeline driven synchronously, without a GUI"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from vision.pose_runner import shared_pose
+    from vision.video_processor import VideoProcessor
+
+    # Build and warm the shared model run() uses (the GUI loads it at start-up), so
+    # model loading stays out of the timing, as in the headless case
+    with shared_pose() as pose:
+        _warm_up(pose, video_path)
+    processor = VideoProcessor(video_path)
+    processor.display.set_target_size(800, 450)
+    start = time.perf_counter()
+    processor.run()
+    return n_frames, time.perf_counter() - start
+
+def _run_case(kind, params, video_dir):
+    """Runs in a fresh worker process"""
+    if 'resolution' in params and kind != 'render':
+        video_path = video_path_for(video_dir, params['resolution'], params['frames'])
+
+    if kind == 'decode':
+        frames, seconds = _decode(video_path, params['backend'])
+    elif kind == 'inference':
+        frames, seconds = _inference(video_path, params['frames'])
+    elif kind == 'analysis_per_frame':
+        frames, seconds = _analysis_per_frame(params['frames'])
+    elif kind == 'analysis_vectorized':
+        frames, seconds = _analysis_vectorized(params['frames'])
+    elif kind == 'render':
+        frames, seconds = _render(params['resolution'], params['frames'])
+    elif kind == 'e2e_headless':
+        frames, seconds = _e2e_headless(video_path, params['frames'])
+    elif kind == 'e2e_pipeline':
+        frames, seconds = _e2e_pipeline(video_path, params['frames'])
+    else:
+        raise ValueError(f"Unknown benchmark kind: {kind}")
+
+    return {
+        'frames': frames,
+        'seconds': seconds,
+        'fps': frames / seconds if seconds > 0 else 0.0,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+def machine_info():
+    import cv2
+    import numpy as np
+    try:
+        import mediapipe as mp
+        mediapipe_version = mp.__version__
+    except ImportError:
+        mediapipe_version = None
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'mediapipe': mediapipe_version,
+    }
+
+def run_suite(cases, video_dir):
+    # Spawn gives every case a clean process, so peak RSS is per case
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name, kind, params in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                result = pool.submit(_run_case, kind, params, video_dir).result()
+            except Exception as e:
+                print(f"{name:<32} FAILED: {e}")
+                results[name] = {'error': str(e)}
+                continue
+        results[name] = dict(result, kind=kind, params=params)
+        rss = result['peak_rss_mb']
+        print(f"{name:<32} {result['fps']:>10,.1f} fps  "
+              f"{'' if rss is None else f'{rss:>7.0f} MB peak'}")
+    return results
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline per case; return the names of regressed cases"""
+    base_results = baseline.get('results', {})
+    regressions = []
+    print()
+    print(f"{'case':<32} {'fps':>10} {'baseline':>10} {'change':>8} {'peak MB':>8} {'baseline':>9}")
+    for name, result in results.items():
+        base = base_results.get(name)
+        if 'error' in result or not base or 'error' in base:
+            continue
+        change = result['fps'] / base['fps'] - 1 if base['fps'] else 0.0
+        status = ''
+        if change < -tolerance:
+            status = 'SLOWER'
+        rss, base_rss = result.get('peak_rss_mb'), base.get('peak_rss_mb')
+        if rss and base_rss and rss > base_rss * (1 + tolerance):
+            status = (status + ' MORE MEMORY').strip()
+        if status:
+            regressions.append(name)
+        print(f"{name:<32} {result['fps']:>10,.1f} {base['fps']:>10,.1f} {change:>+7.0%} "
+              f"{rss or 0:>8.0f} {base_rss or 0:>9.0f}  {status}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the SpikeSight benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="Fewer and shorter cases")
+    parser.add_argument('--only', default=None, help="Only run cases whose name contains this text")
+    parser.add_argument('--output', '-o', default='bench_results.json', help="Results JSON to write")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="Save this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative fps drop / memory growth before a case counts as a regression")
+    parser.add_argument('--video-dir', default=DEFAULT_VIDEO_DIR,
+                        help="Where the synthetic videos are rendered and reused")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.quick)
+    if args.only:
+        cases = [case for case in cases if args.only in case[0]]
+    prepare_videos(cases, args.video_dir)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'quick': args.quick,
+        'results': run_suite(cases, args.video_dir),
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != report['machine']:
+            print("Note: the baseline was recorded on a different machine or library versions")
+        regressions = compare(report['results'], baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+    elif not args.update_baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
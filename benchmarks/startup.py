@@ -0,0 +1,113 @@
+# benchmarks/startup.py
+"""
+GUI startup latency: cold start to window, and time to the first annotated frame.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--open-delay 0] [--output startup.json]
+
+Each run starts a fresh interpreter with an offscreen Qt platform and an empty
+landmark cache, shows the main window, opens a synthetic serve video --open-delay
+seconds after the window is up (0: immediately, the worst case for background
+warm-up; a user picking a file takes a few seconds) and then a second video once
+the first frame of it is on screen.
+Reported per run (seconds):
+  window_shown      process launch -> main window shown
+  first_frame       opening the first video -> first annotated frame displayed
+  next_video_frame  opening another video -> its first annotated frame
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_VIDEO = os.path.join(tempfile.gettempdir(), 'spikesight_bench_videos', 'startup_480p.mp4')
+METRICS = ('window_shown', 'first_frame', 'next_video_frame')
+
+def child(video_path, launched_at, open_delay):
+    """Runs inside the measured process; prints one JSON line of timings"""
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+
+    app = QApplication(sys.argv)
+    import main
+    window = main.MainWindow()
+    window.show()
+    timings = {}
+
+    def open_video(key, then):
+        opened = time.perf_counter()
+        window.start_processing(video_path)
+
+        def on_frame():
+            if key in timings:
+                return
+            timings[key] = time.perf_counter() - opened
+            QTimer.singleShot(0, then)
+        window.video_thread.display_frame_ready.connect(on_frame)
+
+    def finish():
+        window.video_thread.stop()
+        print(json.dumps(timings), flush=True)
+        app.quit()
+
+    def shown():
+        timings['window_shown'] = time.time() - launched_at
+        QTimer.singleShot(int(1000 * open_delay),
+                          lambda: open_video('first_frame', lambda: open_video('next_video_frame', finish)))
+
+    QTimer.singleShot(0, shown)
+    QTimer.singleShot(120000, app.quit)
+    app.exec_()
+
+def measure(video_path, runs, open_delay=0.0):
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(os.environ, QT_QPA_PLATFORM='offscreen', SPIKESIGHT_CACHE_DIR=cache_dir,
+                       SPIKESIGHT_HISTORY_DB=os.path.join(cache_dir, 'history.sqlite3'), OPENAI_API_KEY='')
+            launched_at = time.time()
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child', video_path,
+                                  str(launched_at), str(open_delay)],
+                                 env=env, capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        lines = [line for line in out.stdout.splitlines() if line.startswith('{')]
+        if not lines:
+            raise RuntimeError(f"Startup run failed:\n{out.stderr[-2000:]}")
+        results.append(json.loads(lines[-1]))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure GUI startup and first-frame latency")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--video', default=DEFAULT_VIDEO, help="Video to open (a synthetic one is rendered if missing)")
+    parser.add_argument('--output', '-o', default=None, help="Also write the results as JSON")
+    parser.add_argument('--open-delay', type=float, default=0.0,
+                        help="Seconds between the window appearing and opening the first video")
+    parser.add_argument('--child', nargs=3, metavar=('VIDEO', 'LAUNCHED_AT', 'OPEN_DELAY'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child[0], float(args.child[1]), float(args.child[2]))
+        return 0
+
+    if not os.path.exists(args.video):
+        from benchmarks.synthetic import write_synthetic_serve_video
+        os.makedirs(os.path.dirname(args.video), exist_ok=True)
+        write_synthetic_serve_video(args.video, 150, 854, 480)
+
+    runs = measure(args.video, args.runs, args.open_delay)
+    summary = {metric: statistics.median(run[metric] for run in runs) for metric in METRICS}
+    for metric in METRICS:
+        print(f"{metric:<18} median {1000 * summary[metric]:7.0f} ms   "
+              f"runs: {', '.join(f'{1000 * run[metric]:.0f}' for run in runs)}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': runs, 'median_s': summary}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
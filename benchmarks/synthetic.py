@@ -0,0 +1,147 @@
+# benchmarks/synthetic.py
+import numpy as np
+
+from backend.landmarks import NUM_LANDMARKS, LANDMARK_VALUES
+
+RIGHT_SHOULDER = 12
+RIGHT_ELBOW = 14
+RIGHT_WRIST = 16
+RIGHT_HIP = 24
+
+UPPER_ARM = 0.15
+FOREARM = 0.13
+
+# Keyframes over normalized serve time:
+# (time, upper arm angle from straight up in degrees, elbow angle in degrees)
+SERVE_KEYFRAMES = [
+    (0.00, 170, 170),  # stance, arm hanging
+    (0.30, 170, 165),
+    (0.45, 80, 120),   # arm cocking
+    (0.52, 60, 95),    # trophy pose
+    (0.56, 60, 100),
+    (0.62, 15, 175),   # acceleration to contact
+    (0.66, 40, 175),
+    (0.76, 160, 160),  # follow-through
+    (1.00, 170, 165),
+]
+
+def _arm_positions(upper_arm_angle, elbow_angle, shoulder):
+    """Elbow and wrist positions for the given joint angles (image coords, y down)"""
+    phi = np.radians(upper_arm_angle)
+    upper_dir = np.stack([np.sin(phi), -np.cos(phi)], axis=-1)
+    elbow = shoulder + UPPER_ARM * upper_dir
+
+    # The forearm continues from the upper arm, bent back by (180 - elbow angle)
+    bend = np.radians(180 - elbow_angle)
+    fore_phi = phi + bend
+    fore_dir = np.stack([np.sin(fore_phi), -np.cos(fore_phi)], axis=-1)
+    wrist = elbow + FOREARM * fore_dir
+    return elbow, wrist
+
+def synthetic_serve_landmarks(n_frames=120, noise=0.002, seed=0):
+    """
+    Landmark trajectory of one serve: stance -> trophy -> acceleration -> contact -> follow-through.
+
+    Returns an (n_frames, 33, 4) float32 array laid out like MediaPipe's output.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 1.0, n_frames)
+    times, arm_angles, elbow_angles = zip(*SERVE_KEYFRAMES)
+    arm_angle = np.interp(t, times, arm_angles)
+    elbow_angle = np.interp(t, times, elbow_angles)
+
+    landmarks = np.empty((n_frames, NUM_LANDMARKS, LANDMARK_VALUES), dtype=np.float32)
+
+    # Body landmarks scattered around a standing figure
+    body = rng.uniform([0.4, 0.2, -0.1], [0.6, 0.95, 0.1], size=(NUM_LANDMARKS, 3))
+    landmarks[:, :, :3] = body + rng.normal(0, noise, size=(n_frames, NUM_LANDMARKS, 3))
+    landmarks[:, :, 3] = 0.95
+
+    shoulder = np.array([0.5, 0.4])
+    elbow, wrist = _arm_positions(arm_angle, elbow_angle, shoulder)
+
+    landmarks[:, RIGHT_SHOULDER, :2] = shoulder
+    landmarks[:, RIGHT_HIP, :2] = [0.5, 0.7]
+    landmarks[:, RIGHT_ELBOW, :2] = elbow + rng.normal(0, noise, size=elbow.shape)
+    landmarks[:, RIGHT_WRIST, :2] = wrist + rng.normal(0, noise, size=wrist.shape)
+    landmarks[:, [RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP], 2] = rng.normal(
+        0, noise, size=(n_frames, 4))
+    return landmarks
+
+def synthetic_session_landmarks(n_serves=10, serve_frames=90, gap_frames=60, noise=0.002, seed=0):
+    """
+    A practice session: n_serves serves separated by gap_frames of standing still.
+    Returns an (n_frames, 33, 4) float32 array.
+    """
+    rng = np.random.default_rng(seed)
+    parts = []
+    for i in range(n_serves):
+        serve = synthetic_serve_landmarks(serve_frames, noise, seed + i)
+        # Idle frames repeat the serve's starting stance
+        gap = np.repeat(serve[:1], gap_frames, axis=0)
+        gap[:, :, :3] += rng.normal(0, noise, size=gap[:, :, :3].shape).astype(np.float32)
+        parts.extend([gap, serve])
+    return np.concatenate(parts)
+
+# Standing figure for the synthetic videos in normalized (x, y) units of the frame height,
+# x centered on 0.5. The serving arm (RIGHT_ELBOW, RIGHT_WRIST) is animated.
+FIGURE_POINTS = {
+    'left_shoulder': (0.40, 0.40), 'right_shoulder': (0.50, 0.40),
+    'left_elbow': (0.38, 0.52), 'left_wrist': (0.38, 0.63),
+    'left_hip': (0.42, 0.69), 'right_hip': (0.49, 0.69),
+    'left_knee': (0.42, 0.82), 'right_knee': (0.50, 0.82),
+    'left_ankle': (0.42, 0.95), 'right_ankle': (0.51, 0.95),
+}
+FIGURE_LIMBS = [
+    ('left_shoulder', 'right_shoulder'), ('left_shoulder', 'left_elbow'), ('left_elbow', 'left_wrist'),
+    ('left_shoulder', 'left_hip'), ('right_shoulder', 'right_hip'), ('left_hip', 'right_hip'),
+    ('left_hip', 'left_knee'), ('left_knee', 'left_ankle'),
+    ('right_hip', 'right_knee'), ('right_knee', 'right_ankle'),
+    ('right_shoulder', 'right_elbow'), ('right_elbow', 'right_wrist'),
+]
+BACKGROUND_COLOR = (70, 110, 160)  # BGR, court-ish orange
+FIGURE_COLOR = (120, 160, 210)
+SHIRT_COLOR = (150, 60, 40)
+
+def render_serve_frame(image, elbow, wrist):
+    """Draw the synthetic athlete with the serving arm at (elbow, wrist) into a BGR image"""
+    import cv2
+
+    h, w = image.shape[:2]
+    image[:] = BACKGROUND_COLOR
+
+    def px(point):
+        x, y = point
+        return int(w / 2 + (x - 0.5) * h), int(y * h)
+
+    points = {name: px(p) for name, p in FIGURE_POINTS.items()}
+    points['right_elbow'] = px(elbow)
+    points['right_wrist'] = px(wrist)
+
+    torso = [points[k] for k in ('left_shoulder', 'right_shoulder', 'right_hip', 'left_hip')]
+    cv2.fillPoly(image, [np.array(torso, dtype=np.int32)], SHIRT_COLOR)
+    thickness = max(int(0.035 * h), 1)
+    for a, b in FIGURE_LIMBS:
+        cv2.line(image, points[a], points[b], FIGURE_COLOR, thickness, cv2.LINE_AA)
+    cv2.circle(image, px((0.45, 0.30)), int(0.05 * h), FIGURE_COLOR, -1, cv2.LINE_AA)
+    return image
+
+def write_synthetic_serve_video(path, n_frames=120, width=1280, height=720, fps=30):
+    """Render a synthetic serve video (mp4v) with the same arm motion as synthetic_serve_landmarks"""
+    import cv2
+
+    t = np.linspace(0.0, 1.0, n_frames)
+    times, arm_angles, elbow_angles = zip(*SERVE_KEYFRAMES)
+    elbow, wrist = _arm_positions(np.interp(t, times, arm_angles), np.interp(t, times, elbow_angles),
+                                  np.array(FIGURE_POINTS['right_shoulder']))
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    try:
+        for i in range(n_frames):
+            writer.write(render_serve_frame(image, elbow[i], wrist[i]))
+    finally:
+        writer.release()
+    return path
@@ -1,12 +1,20 @@
+import os
+import sqlite3
 import sys
-import cv2
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QFileDialog, QVBoxLayout, QWidget, QTextEdit, QHBoxLayout)
-from PyQt5.QtGui import QIcon, QPixmap, QImage
-from PyQt5.QtCore import Qt, pyqtSlot, QThread, pyqtSignal
+import threading
+import time
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, QFileDialog, QVBoxLayout, QWidget, QTextEdit, QHBoxLayout, QCheckBox, QInputDialog, QLineEdit, QSlider, QComboBox)
+from PyQt5.QtGui import QIcon, QPixmap, QImage, QTextCursor, QTextCharFormat, QColor
+from PyQt5.QtCore import Qt, pyqtSlot, QThread, pyqtSignal, QTimer
 import numpy as np
 
-from vision.video_processor import VideoProcessor
-from backend.analysis_engine import AnalysisEngine
+from vision.landmark_cache import LandmarkCache
+from backend.analysis_engine import AnalysisEngine, SessionEngine, MultiAthleteEngine
+from backend.instrumentation import profiler
+from backend.session_export import export_session
+from backend.batch import json_frame_data
+from backend.history import HistoryStore, serve_record, video_record_info
+from backend.compare import ReferenceLibrary
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -16,7 +24,34 @@ class MainWindow(QMainWindow):
         self.setWindowIcon(QIcon("MOLTEN.png"))
         self.video_thread = None
         self.analysis_engine = None
+        self.analysis_finalized = False  # feedback already published for the current video
+        self.processing_error = None     # why the current video could not be processed
+        self.ai_thread = None
+        self.retired_ai_threads = []
+        self.landmark_cache = LandmarkCache()
+        self.video_name = None
+        self.video_source = None
+        self.history = None
+        self.history_video_info = None
+        self.reference_library = None
+        # Stored frames of the last processed video (see vision/replay.py) and its phase frames
+        self.replay = None
+        self.replay_keys = []
         self.initUI()
+
+        # Live profiler summary in the status bar while a video is processing
+        self.profile_timer = QTimer(self)
+        self.profile_timer.setInterval(500)
+        self.profile_timer.timeout.connect(self.update_profile_status)
+
+        # Slow-motion replay: one single-shot step per stored frame
+        self.replay_timer = QTimer(self)
+        self.replay_timer.setSingleShot(True)
+        self.replay_timer.timeout.connect(self.replay_step)
+
+        # The heavy imports and the pose model load start once the event loop (and the window) is up
+        self.warm_up_thread = threading.Thread(target=self.warm_up, daemon=True)
+        QTimer.singleShot(0, self.warm_up_thread.start)
     
     def initUI(self):
         central_widget = QWidget()
@@ -37,6 +72,30 @@ class MainWindow(QMainWindow):
         """)
         self.video_label.setMinimumHeight(450)
         self.layout.addWidget(self.video_label, 3)
+
+        # Replay controls, shown once a video has been processed
+        self.replay_widget = QWidget(self)
+        replay_layout = QHBoxLayout(self.replay_widget)
+        replay_layout.setContentsMargins(0, 0, 0, 0)
+        self.replay_slider = QSlider(Qt.Horizontal, self)
+        self.replay_slider.setToolTip("Scrub through the processed video")
+        replay_layout.addWidget(self.replay_slider, 1)
+        self.replay_jump = QComboBox(self)
+        self.replay_jump.setToolTip("Jump to a phase of the serve")
+        self.replay_jump.setStyleSheet("QComboBox { font-size: 13px; padding: 4px; background-color: #404040; color: white; }")
+        replay_layout.addWidget(self.replay_jump)
+        self.replay_speed = QComboBox(self)
+        self.replay_speed.addItems(["0.1x", "0.25x", "0.5x", "1x"])
+        self.replay_speed.setCurrentIndex(1)
+        self.replay_speed.setStyleSheet(self.replay_jump.styleSheet())
+        replay_layout.addWidget(self.replay_speed)
+        self.replay_button = QPushButton("Slow-mo", self)
+        self.replay_button.setCheckable(True)
+        self.replay_button.setToolTip("Replay from the current frame at the selected speed")
+        self.replay_button.setStyleSheet("QPushButton { font-size: 13px; padding: 5px 12px; background-color: #404040; color: white; border: none; border-radius: 5px; } QPushButton:checked { background-color: #4a9eff; }")
+        replay_layout.addWidget(self.replay_button)
+        self.replay_widget.setVisible(False)
+        self.layout.addWidget(self.replay_widget)
         
         # Control buttons
         button_layout = QHBoxLayout()
@@ -57,6 +116,48 @@ class MainWindow(QMainWindow):
         """)
         
         button_layout.addWidget(self.open_button)
+
+        self.live_button = QPushButton("Live Camera", self)
+        self.live_button.setStyleSheet(self.open_button.styleSheet())
+        button_layout.addWidget(self.live_button)
+
+        self.export_button = QPushButton("Export Data", self)
+        self.export_button.setToolTip("Save per-frame metrics and landmarks as a columnar .npz session file")
+        self.export_button.setStyleSheet(self.open_button.styleSheet())
+        self.export_button.setEnabled(False)
+        button_layout.addWidget(self.export_button)
+
+        self.speed_mode_checkbox = QCheckBox("Speed mode", self)
+        self.speed_mode_checkbox.setToolTip("Skip and downscale frames before and after the serve")
+        self.speed_mode_checkbox.setStyleSheet("QCheckBox { font-size: 14px; color: #aaa; padding: 0 10px; }")
+        button_layout.addWidget(self.speed_mode_checkbox)
+
+        self.parallel_checkbox = QCheckBox("Use all cores", self)
+        self.parallel_checkbox.setToolTip("Split long videos into segments and extract poses in parallel (no live preview)")
+        self.parallel_checkbox.setStyleSheet("QCheckBox { font-size: 14px; color: #aaa; padding: 0 10px; }")
+        button_layout.addWidget(self.parallel_checkbox)
+
+        self.session_checkbox = QCheckBox("Multiple serves", self)
+        self.session_checkbox.setToolTip("Analyze every serve in a practice video separately")
+        self.session_checkbox.setStyleSheet("QCheckBox { font-size: 14px; color: #aaa; padding: 0 10px; }")
+        button_layout.addWidget(self.session_checkbox)
+
+        self.multi_athlete_checkbox = QCheckBox("Multiple athletes", self)
+        self.multi_athlete_checkbox.setToolTip("Track every player in the shot and analyze each one's serve separately")
+        self.multi_athlete_checkbox.setStyleSheet("QCheckBox { font-size: 14px; color: #aaa; padding: 0 10px; }")
+        button_layout.addWidget(self.multi_athlete_checkbox)
+
+        self.stop_after_serve_checkbox = QCheckBox("Stop after serve", self)
+        self.stop_after_serve_checkbox.setToolTip("Stop processing shortly after the follow-through instead of at the end of the video")
+        self.stop_after_serve_checkbox.setStyleSheet("QCheckBox { font-size: 14px; color: #aaa; padding: 0 10px; }")
+        button_layout.addWidget(self.stop_after_serve_checkbox)
+
+        self.athlete_input = QLineEdit(self)
+        self.athlete_input.setPlaceholderText("Athlete")
+        self.athlete_input.setToolTip("Every analyzed serve is saved to the history under this name")
+        self.athlete_input.setMaximumWidth(160)
+        self.athlete_input.setStyleSheet("QLineEdit { font-size: 14px; padding: 6px; background-color: #1e1e1e; color: #ddd; border: 1px solid #444; border-radius: 5px; }")
+        button_layout.addWidget(self.athlete_input)
         self.layout.addLayout(button_layout)
         
         self.status_label = QLabel("", self)
@@ -83,6 +184,11 @@ class MainWindow(QMainWindow):
         
         # Connect buttons
         self.open_button.clicked.connect(self.open_video_file)
+        self.live_button.clicked.connect(self.open_live_source)
+        self.export_button.clicked.connect(self.export_session_data)
+        self.replay_slider.valueChanged.connect(self.show_replay_frame)
+        self.replay_jump.activated.connect(self.jump_to_replay_key)
+        self.replay_button.toggled.connect(self.toggle_replay)
     
     def open_video_file(self):
         filepath, _ = QFileDialog.getOpenFileName(
@@ -93,54 +199,371 @@ class MainWindow(QMainWindow):
         )
         
         if filepath:
-            if self.video_thread and self.video_thread.isRunning():
-                self.video_thread.stop()
-            
-            self.feedback_text.setHtml("")
-            self.status_label.setText("Processing...")
-            
-            self.video_thread = VideoProcessor(filepath)
-            self.analysis_engine = AnalysisEngine()
-            
-            self.video_thread.frame_processed.connect(self.update_image)
+            self.start_processing(filepath)
+
+    def open_live_source(self):
+        """Analyze a camera or stream; a video file path is played back in real time"""
+        source, ok = QInputDialog.getText(self, "Live Camera", "Camera index, stream URL or video file:", text="0")
+        if ok and source.strip():
+            self.start_processing(source.strip(), live=True)
+
+    def start_processing(self, source, live=False):
+        if self.video_thread and self.video_thread.isRunning():
+            self.video_thread.stop()
+        self.cancel_ai_analysis()
+        self.reset_replay()
+        self.analysis_finalized = False
+        self.processing_error = None
+        
+        self.feedback_text.setHtml("")
+        self.status_label.setText("Processing...")
+        self.export_button.setEnabled(False)
+        self.video_source = None if live else source
+        self.history_video_info = None
+        self.video_name = os.path.splitext(os.path.basename(source))[0] or 'live'
+        profiler.reset(label=source)
+        self.profile_timer.start()
+        # Get the OpenAI client ready while the video processes, so coaching text starts promptly
+        # (the start-up warm-up does it too, after the pose model; don't compete with that for the CPU)
+        if not self.warm_up_thread.is_alive():
+            threading.Thread(target=self.warm_up_ai_client, daemon=True).start()
+
+        # Usually already imported by warm_up_vision
+        from vision.video_processor import VideoProcessor, DEFAULT_FOLLOW_THROUGH_TAIL
+        multi_athlete = self.multi_athlete_checkbox.isChecked() and not live
+        session = self.session_checkbox.isChecked() and not multi_athlete
+        # One serve per video: nothing left to analyze once it has been followed through
+        stop_after_serve = self.stop_after_serve_checkbox.isChecked() and not (live or multi_athlete or session)
+        self.video_thread = VideoProcessor(source, landmark_cache=self.landmark_cache,
+                                           speed_mode=self.speed_mode_checkbox.isChecked(),
+                                           workers=(os.cpu_count() or 1) if self.parallel_checkbox.isChecked() and not live else 1,
+                                           live=live, multi_athlete=multi_athlete,
+                                           stop_after_serve_tail=DEFAULT_FOLLOW_THROUGH_TAIL if stop_after_serve else None)
+        if multi_athlete:
+            self.analysis_engine = MultiAthleteEngine()
+        else:
+            self.analysis_engine = SessionEngine() if session else AnalysisEngine()
+        
+        self.video_thread.frame_processed.connect(self.update_image)
+        self.video_thread.display_frame_ready.connect(self.refresh_display)
+        if self.video_thread.display is not None:
+            self.video_thread.display.set_target_size(self.video_label.width(), self.video_label.height())
+        self.video_thread.processing_failed.connect(self.on_processing_failed)
+        self.video_thread.processing_finished.connect(self.on_processing_finished)
+        if multi_athlete:
+            self.video_thread.athlete_pose_extracted.connect(self.analysis_engine.process_frame)
+            self.analysis_engine.athletes_complete.connect(self.display_athletes_feedback)
+        else:
             self.video_thread.pose_data_extracted.connect(self.analysis_engine.process_frame)
-            self.video_thread.processing_finished.connect(self.on_processing_finished)
+            self.analysis_engine.phase_changed.connect(self.video_thread.set_phase)
+        if session:
+            self.analysis_engine.serve_analyzed.connect(self.append_serve_feedback)
+            self.analysis_engine.session_complete.connect(self.display_session_feedback)
+        elif not multi_athlete:
             self.analysis_engine.analysis_complete.connect(self.display_feedback)
-            
-            self.video_thread.start()
+            self.analysis_engine.phase_event.connect(self.on_phase_event)
+            self.analysis_engine.phase_event.connect(self.video_thread.on_phase_event)
+        
+        self.video_thread.start()
     
     @pyqtSlot(np.ndarray)
     def update_image(self, cv_img):
         """Updates video_label with a new opencv image"""
+        start = profiler.start()
         qt_img = self.convert_cv_qt(cv_img)
         self.video_label.setPixmap(qt_img)
+        profiler.stop('gui', start)
     
     def convert_cv_qt(self, cv_img):
         """Convert from an OpenCV image to QPixmap."""
+        import cv2
         rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
         h, w, ch = rgb_image.shape
         bytes_per_line = ch * w
         convert_to_Qt_format = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
         p = QPixmap.fromImage(convert_to_Qt_format)
         return p.scaled(self.video_label.width(), self.video_label.height(), Qt.KeepAspectRatio)
+
+    @pyqtSlot()
+    def refresh_display(self):
+        """Show the newest frame from the processor's display buffer (already RGB and widget-sized)"""
+        if not self.video_thread or self.video_thread.display is None:
+            return
+        start = profiler.start()
+        with self.video_thread.display.latest() as rgb_image:
+            if rgb_image is None:
+                return
+            h, w, ch = rgb_image.shape
+            # Wraps the buffer without copying; fromImage makes the only copy
+            qt_img = QImage(rgb_image.data, w, h, ch * w, QImage.Format_RGB888)
+            self.video_label.setPixmap(QPixmap.fromImage(qt_img))
+        profiler.stop('gui', start)
+        captured_at = self.video_thread.display.latest_captured_at
+        if captured_at is not None:
+            # Live capture to on screen
+            profiler.record('glass_to_glass', time.perf_counter() - captured_at)
+
+    @pyqtSlot()
+    def update_profile_status(self):
+        if self.analysis_finalized:
+            # The serve's feedback is already up; don't cover its status
+            return
+        summary = profiler.status_line(stages=('decode', 'pose', 'draw', 'analysis', 'glass_to_glass'))
+        self.status_label.setText(f"Processing...  {summary}" if summary else "Processing...")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.video_thread and self.video_thread.display is not None:
+            self.video_thread.display.set_target_size(self.video_label.width(), self.video_label.height())
     
+    @pyqtSlot(str)
+    def on_processing_failed(self, message):
+        """The video could not be read; on_processing_finished shows it instead of feedback"""
+        self.processing_error = message
+
+    def dump_profile(self):
+        """Write the run's profile to SPIKESIGHT_PROFILE_DIR, if set"""
+        profile_dir = os.getenv('SPIKESIGHT_PROFILE_DIR')
+        if profile_dir:
+            path = profiler.dump(profile_dir, f"{self.video_name}_{time.strftime('%Y%m%d_%H%M%S')}")
+            if path:
+                print(f"Profile written to {path}")
+
     @pyqtSlot()
     def on_processing_finished(self):
         """Called when video processing is complete"""
+        self.profile_timer.stop()
+        # Every stage has stopped by now, whatever the mode and whether or not AI feedback follows
+        self.dump_profile()
+        if self.processing_error is not None:
+            self.status_label.setText("Could not process video")
+            self.feedback_text.setPlainText(self.processing_error)
+            return
+        self.setup_replay()
+        if self.analysis_finalized:
+            # Feedback went out at follow-through; only the export was waiting for the video
+            self.export_button.setEnabled(True)
+            return
         self.status_label.setText("Generating feedback...")
+        self.analysis_finalized = True
         self.analysis_engine.finalize_analysis()
+
+    @pyqtSlot(dict)
+    def on_phase_event(self, event):
+        """Show the serve's feedback as its phases are detected, while the video is still processing"""
+        if self.analysis_finalized:
+            return
+        if event['phase'] == 'follow_through':
+            # The feedback can't change after follow-through: publish it and start the AI request now
+            self.analysis_finalized = True
+            self.analysis_engine.finalize_analysis()
+            return
+        feedback = self.analysis_engine.generate_feedback()
+        feedback['title'] = "Serve in progress..."
+        if event['phase'] == 'trophy_pose':
+            # Recommendations need contact too; the trophy pose alone would read as "Excellent Form!"
+            feedback['recommendations'] = [rec for rec in feedback['recommendations']
+                                           if rec['title'] != 'Excellent Form!']
+        self.feedback_text.setHtml(self.build_feedback_html(feedback))
+
+    def reset_replay(self):
+        self.replay_timer.stop()
+        self.replay_button.setChecked(False)
+        self.replay_widget.setVisible(False)
+        self.replay = None
+        self.replay_keys = []
+        self.replay_jump.clear()
+
+    def setup_replay(self):
+        """Enable scrubbing through the frames the processor kept"""
+        replay = self.video_thread.replay if self.video_thread else None
+        frame_range = replay.frame_range() if replay is not None else None
+        if frame_range is None:
+            return
+        self.replay = replay
+        for _, frame_index in self.replay_keys:
+            replay.mark_key(frame_index)
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setRange(*frame_range)
+        self.replay_slider.setValue(frame_range[1])
+        self.replay_slider.blockSignals(False)
+        self.replay_widget.setVisible(True)
+
+    def add_replay_key(self, label, frame_index):
+        """Offer a phase frame (a video frame index) in the jump list"""
+        if frame_index is None:
+            return
+        if not self.replay_keys:
+            self.replay_jump.addItem("Jump to...")
+        self.replay_keys.append((label, frame_index))
+        self.replay_jump.addItem(f"{label} (frame {frame_index})")
+        if self.replay is not None:
+            self.replay.mark_key(frame_index)
+
+    @pyqtSlot(int)
+    def jump_to_replay_key(self, index):
+        if index <= 0 or index > len(self.replay_keys):
+            return
+        self.replay_button.setChecked(False)
+        self.replay_slider.setValue(self.replay_keys[index - 1][1])
+
+    @pyqtSlot(int)
+    def show_replay_frame(self, frame_index):
+        """Show the stored frame nearest to frame_index with its skeleton"""
+        if self.replay is None:
+            return
+        stored = self.replay.get(self.replay.nearest(frame_index))
+        if stored is None:
+            return
+        timestamp, image, landmarks = stored
+        if landmarks is not None:
+            from vision.drawing import draw_pose
+            draw_pose(image, landmarks)
+        self.video_label.setPixmap(self.convert_cv_qt(image))
+        self.status_label.setText(f"Replay: frame {self.replay.nearest(frame_index)} ({timestamp:.2f}s)")
+
+    @pyqtSlot(bool)
+    def toggle_replay(self, playing):
+        if not playing:
+            self.replay_timer.stop()
+            return
+        if self.replay is None:
+            self.replay_button.setChecked(False)
+            return
+        # Start over from the beginning when at the end
+        if self.replay.next_after(self.replay_slider.value()) is None:
+            self.replay_slider.setValue(self.replay_slider.minimum())
+        self.replay_step()
+
+    @pyqtSlot()
+    def replay_step(self):
+        """Show the next stored frame and schedule the one after it at the replay speed"""
+        following = self.replay.next_after(self.replay.nearest(self.replay_slider.value()))
+        if following is None:
+            self.replay_button.setChecked(False)
+            return
+        self.replay_slider.setValue(following)
+        after = self.replay.next_after(following)
+        if after is None:
+            self.replay_button.setChecked(False)
+            return
+        speed = float(self.replay_speed.currentText().rstrip('x'))
+        interval = (self.replay.timestamp(after) - self.replay.timestamp(following)) / speed
+        self.replay_timer.start(max(int(1000 * interval), 1))
     
     @pyqtSlot(dict)
     def display_feedback(self, feedback_dict):
         """Display the analysis feedback in the GUI"""
         self.status_label.setText("Analyzing with AI...")
+        # After an early finalize the video is still processing; on_processing_finished enables it
+        self.export_button.setEnabled(not self.video_thread.isRunning())
+        frame_data = self.analysis_engine.export_frame_data()
+        self.save_to_history(feedback_dict, frame_data=frame_data)
+        self.add_replay_key("Trophy pose", self.analysis_engine.video_frame_for(frame_data['phases']['trophy_pose'].get('frame')))
+        self.add_replay_key("Ball contact", self.analysis_engine.video_frame_for(frame_data['phases']['ball_contact'].get('frame')))
+        matches = self.compare_to_references(frame_data)
+        if matches:
+            feedback_dict['reference_matches'] = matches
         
         html = self.build_feedback_html(feedback_dict)
         self.feedback_text.setHtml(html)
         
+        # The prompt (and the response cache key) is built from the serve's metrics
+        feedback_dict['frame_data'] = json_frame_data(frame_data)
         # Get AI analysis in background
         self.get_ai_analysis(feedback_dict)
     
+    @pyqtSlot(dict)
+    def append_serve_feedback(self, result):
+        """Add one finished serve of a session to the feedback panel"""
+        feedback = result['feedback']
+        self.save_to_history(feedback, serve_index=result['serve'])
+        self.add_replay_key(f"Serve {result['serve']} trophy pose", result['trophy_video_frame'])
+        self.add_replay_key(f"Serve {result['serve']} contact", result['contact_video_frame'])
+        html = "<div style='font-family: Arial, sans-serif; color: #ddd;'>"
+        html += (f"<h3 style='color: #4a9eff; margin: 5px 0;'>Serve {result['serve']} "
+                 f"<span style='font-size: 12px; color: #888;'>({result['start_time']:.1f}s - {result['end_time']:.1f}s)</span></h3>")
+        if feedback.get('phases_detected'):
+            html += "<p style='margin: 4px 0; color: #bbb;'>" + ", ".join(feedback['phases_detected']) + "</p>"
+        for rec in feedback['recommendations']:
+            html += f"<p style='margin: 4px 0;'><b style='color: #ffc876;'>{rec['title']}</b>: "
+            html += f"<span style='font-size: 12px; color: #ccc;'>{rec['advice']}</span></p>"
+        html += "</div>"
+        self.feedback_text.append(html)
+
+    @pyqtSlot(list)
+    def display_session_feedback(self, serves):
+        self.status_label.setText(f"Complete: {len(serves)} serves analyzed")
+        if not serves:
+            self.feedback_text.setHtml("<p style='color: #bbb;'>No complete serves were detected.</p>")
+
+    @pyqtSlot(dict)
+    def display_athletes_feedback(self, athletes):
+        """Show one feedback section per tracked athlete"""
+        self.status_label.setText(f"Complete: {len(athletes)} athletes analyzed")
+        if not athletes:
+            self.feedback_text.setHtml("<p style='color: #bbb;'>No athletes were tracked long enough to analyze.</p>")
+            return
+        name = self.athlete_input.text().strip() or 'default'
+        html = ""
+        for track_id, feedback in athletes.items():
+            frame_data = feedback.pop('frame_data')
+            self.save_to_history(feedback, frame_data=frame_data, athlete=f"{name} #{track_id}", track=track_id)
+            html += self.build_feedback_html(feedback)
+        self.feedback_text.setHtml(html)
+
+    def save_to_history(self, feedback, serve_index=1, frame_data=None, athlete=None, track=0):
+        """Record an analyzed serve in the local history database"""
+        try:
+            if self.history is None:
+                self.history = HistoryStore()
+            if self.history_video_info is None:
+                # Live sources have no file to hash; they are dated now
+                self.history_video_info = video_record_info(self.video_source) if self.video_source else (None, None)
+            recorded_at, video_hash = self.history_video_info
+            athlete = athlete or self.athlete_input.text().strip() or 'default'
+            self.history.add_serve(serve_record(feedback, athlete, recorded_at, video_hash, self.video_source,
+                                                serve_index, frame_data, track))
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not save serve to history: {e}")
+
+    def compare_to_references(self, frame_data, k=3):
+        """Closest serves in the reference library named by SPIKESIGHT_REFERENCE_LIBRARY, if any"""
+        path = os.getenv('SPIKESIGHT_REFERENCE_LIBRARY')
+        if not path:
+            return []
+        try:
+            if self.reference_library is None:
+                self.reference_library = ReferenceLibrary.load(path)
+            matches, stats = self.reference_library.query(frame_data, k)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not compare with reference library {path}: {e}")
+            return []
+        print(f"Compared with {stats.get('dtw_computed', 0)} of {stats['references']} reference serves "
+              f"in {stats.get('query_ms', 0):.1f} ms")
+        return matches
+
+    def export_session_data(self):
+        """Save the finished analysis (and the video's cached landmarks) as a session file"""
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Frame Data",
+            f"{self.video_name}.npz",
+            "Session Files (*.npz);;All Files (*)"
+        )
+        if not path:
+            return
+        # Landmarks are only available once the whole video went through the cache
+        records = (self.landmark_cache.load(self.video_source, self.video_thread.cache_decode)
+                   if self.video_source else None)
+        try:
+            export_session(path, self.analysis_engine, records, video_path=self.video_source)
+        except OSError as e:
+            self.status_label.setText(f"Export failed: {e}")
+            return
+        landmarks = "with landmarks" if records is not None else "metrics only"
+        self.status_label.setText(f"Exported {self.analysis_engine.frame_count} frames ({landmarks}) to {path}")
+
     def build_feedback_html(self, feedback_dict, ai_feedback=None):
         """Build HTML for feedback display"""
         html = "<div style='font-family: Arial, sans-serif; color: #ddd;'>"
@@ -162,6 +585,19 @@ class MainWindow(QMainWindow):
             html += "</div>"
         else:
             html += "<p style='color: #66bb6a; font-size: 14px; margin: 10px 0;'>✓ Good form detected</p>"
+
+        if feedback_dict.get('reference_matches'):
+            html += "<h4 style='color: #4a9eff; margin: 12px 0 4px 0;'>Closest Reference Serves</h4>"
+            for match in feedback_dict['reference_matches']:
+                html += f"<p style='margin: 4px 0;'><b style='color: #ddd;'>{os.path.basename(match['name'])}</b> "
+                html += f"<span style='font-size: 12px; color: #888;'>(distance {match['distance']:.3f})</span><br>"
+                deviations = []
+                for phase, channels in match['phase_deviations'].items():
+                    # Largest angle difference per phase, relative to the reference
+                    channel, value = max(((c, v) for c, v in channels.items() if c != 'wrist_height'),
+                                         key=lambda item: abs(item[1]))
+                    deviations.append(f"{phase.replace('_', ' ')}: {channel.replace('_', ' ')} {value:+.1f}°")
+                html += f"<span style='font-size: 12px; color: #ccc;'>{', '.join(deviations)}</span></p>"
         
         if ai_feedback:
             html += "<hr style='border: 1px solid #444; margin: 15px 0;'>"
@@ -175,34 +611,105 @@ class MainWindow(QMainWindow):
         return html
     
     def get_ai_analysis(self, feedback_dict):
-        """Get AI analysis from OpenAI in a separate thread"""
+        """Stream AI analysis from OpenAI in a separate thread"""
         
         class AIAnalysisThread(QThread):
+            text_received = pyqtSignal(str)
             analysis_complete = pyqtSignal(str)
+
+            # Streamed text is handed to the GUI at most this often
+            EMIT_INTERVAL = 0.05
             
             def __init__(self, feedback_data):
                 super().__init__()
                 self.feedback_data = feedback_data
+                self.cancelled = False
+
+            def cancel(self):
+                self.cancelled = True
             
             def run(self):
-                from backend.api_helper import analyze_with_openai
+                from backend.api_helper import stream_openai_analysis
+                parts = []
+                pending = []
+                last_emit = 0.0
                 try:
-                    enhanced = analyze_with_openai(self.feedback_data)
-                    if enhanced.get('ai_analysis'):
-                        self.analysis_complete.emit(enhanced['ai_analysis'])
-                    else:
-                        self.analysis_complete.emit("")
+                    for text in stream_openai_analysis(self.feedback_data, should_stop=lambda: self.cancelled):
+                        parts.append(text)
+                        pending.append(text)
+                        now = time.perf_counter()
+                        if now - last_emit >= self.EMIT_INTERVAL:
+                            self.text_received.emit(''.join(pending))
+                            pending.clear()
+                            last_emit = now
                 except Exception as e:
                     print(f"AI analysis failed: {e}")
-                    self.analysis_complete.emit("")
+                if self.cancelled:
+                    return
+                if pending:
+                    self.text_received.emit(''.join(pending))
+                self.analysis_complete.emit(''.join(parts))
         
+        self.ai_stream_started = False
         self.ai_thread = AIAnalysisThread(feedback_dict)
+        self.ai_thread.text_received.connect(self.append_ai_text)
         self.ai_thread.analysis_complete.connect(lambda ai_text: self.update_with_ai(feedback_dict, ai_text))
         self.ai_thread.start()
+
+    def warm_up(self):
+        """Start-up work off the GUI thread: the pose model first, since the first frame waits for it"""
+        self.warm_up_vision()
+        self.warm_up_ai_client()
+
+    @staticmethod
+    def warm_up_vision():
+        """Import OpenCV/MediaPipe and load the pose model while the window is already up"""
+        try:
+            import vision.video_processor  # noqa: F401
+            from vision.pose_runner import warm_up_pose
+            warm_up_pose()
+        except Exception as e:
+            print(f"Pose model warm-up failed: {e}")
+
+    @staticmethod
+    def warm_up_ai_client():
+        try:
+            from backend.api_helper import get_coaching_client
+            get_coaching_client().warm_up()
+        except Exception as e:
+            print(f"AI client warm-up failed: {e}")
+
+    def cancel_ai_analysis(self):
+        """Abandon a running AI stream and ignore anything it still sends"""
+        thread = self.ai_thread
+        self.ai_thread = None
+        if thread is None or thread.isFinished():
+            return
+        thread.cancel()
+        thread.text_received.disconnect()
+        thread.analysis_complete.disconnect()
+        # Keep it alive until run() returns; destroying a running QThread aborts the app
+        self.retired_ai_threads.append(thread)
+        thread.finished.connect(lambda: self.retired_ai_threads.remove(thread))
+
+    @pyqtSlot(str)
+    def append_ai_text(self, text):
+        """Append streamed AI text to the end of the feedback without rebuilding the HTML"""
+        cursor = self.feedback_text.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        if not self.ai_stream_started:
+            self.ai_stream_started = True
+            cursor.insertHtml("<hr style='border: 1px solid #444; margin: 15px 0;'>"
+                              "<h3 style='color: #66bb6a; margin: 10px 0;'>AI Coach Analysis</h3>")
+            cursor.insertBlock()
+        text_format = QTextCharFormat()
+        text_format.setForeground(QColor('#ddd'))
+        cursor.insertText(text, text_format)
     
     def update_with_ai(self, feedback_dict, ai_feedback):
-        """Update display with AI feedback"""
-        self.status_label.setText("Complete")
+        """Update display with AI feedback (the streamed text, formatted once at the end)"""
+        summary = profiler.status_line(stages=('pose', 'analysis', 'openai'))
+        self.status_label.setText(f"Complete  {summary}" if summary else "Complete")
         if ai_feedback:
             html = self.build_feedback_html(feedback_dict, ai_feedback)
             self.feedback_text.setHtml(html)
@@ -211,6 +718,12 @@ class MainWindow(QMainWindow):
         """Clean up when window is closed"""
         if self.video_thread and self.video_thread.isRunning():
             self.video_thread.stop()
+        for thread in [self.ai_thread] + self.retired_ai_threads:
+            if thread is not None and thread.isRunning():
+                thread.cancel()
+                thread.wait(2000)
+        if self.history is not None:
+            self.history.close()
         event.accept()
 
 def main():
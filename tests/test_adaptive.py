@@ -0,0 +1,59 @@
+# tests/test_adaptive.py
+import numpy as np
+
+from backend.serve_analysis import ServePhase
+from vision.adaptive import AdaptiveSampler
+
+WIDTH, HEIGHT = 160, 120
+
+def athlete(x0, y0, x1, y1):
+    """Full-frame landmarks whose visible points span the given box"""
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, 3] = 1.0
+    landmarks[0, :2] = x0, y0
+    landmarks[1:, :2] = x1, y1
+    return landmarks
+
+def test_tracker_is_reset_only_when_the_geometry_changes():
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    sampler = AdaptiveSampler(idle_stride=2)
+
+    resets = []
+    def infer(frame_index, landmarks):
+        prepared = sampler.prepare(frame_index, frame)
+        if prepared is not None:
+            image, roi, reset = prepared
+            resets.append(reset)
+            sampler.observe(landmarks)
+            return image, roi
+
+    # Idle: every other frame, downscaled, always the same geometry
+    for i in range(4):
+        infer(i, athlete(0.4, 0.4, 0.6, 0.8))
+    assert resets == [False, False]
+
+    # The serve starts: from the downscaled frame to a crop around the athlete
+    sampler.set_phase(ServePhase.ARM_COCKING)
+    image, roi = infer(4, athlete(0.4, 0.4, 0.6, 0.8))
+    assert resets[-1] and image.shape[:2] != (HEIGHT // 2, WIDTH // 2)
+
+    # Moving within the crop keeps it, and the tracker's state
+    for i, shift in enumerate((0.01, 0.02, 0.03)):
+        assert infer(5 + i, athlete(0.4 + shift, 0.4, 0.6 + shift, 0.8))[1] == roi
+    assert resets[-3:] == [False, False, False]
+
+    # Leaving it moves the crop on the next frame, once
+    infer(8, athlete(0.7, 0.4, 0.9, 0.8))
+    new_roi = infer(9, athlete(0.7, 0.4, 0.9, 0.8))[1]
+    assert infer(10, athlete(0.7, 0.4, 0.9, 0.8))[1] == new_roi != roi
+    assert resets[-3:] == [False, True, False]
+
+    # Back to idle at full-frame scale
+    sampler.set_phase(ServePhase.FOLLOW_THROUGH)
+    infer(12, None)
+    assert resets[-1]
+
+    report = sampler.report()
+    assert report['tracker_resets'] == sum(resets) == 3
+    assert report['frames_inferred'] == len(resets)
+    assert report['pose_call_reduction'] == report['frames_seen'] / report['frames_inferred']
@@ -0,0 +1,247 @@
+# tests/test_api_helper.py
+"""CoachingClient against a local OpenAI-compatible stand-in server (base_url)"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend import api_helper
+from backend.api_helper import (CoachingClient, ResponseCache, RateLimiter, analyze_batch,
+                                analyze_with_openai, build_analysis_prompt)
+
+class StandIn:
+    """Chat completions endpoint whose behavior each test sets up"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = 0         # answer this many requests with a retryable 500 first
+        self.delay = 0.0          # seconds before answering
+        self.chunks = ['Bend ', 'your ', 'elbow.']
+        self.chunk_delay = 0.0
+        self.fail_prompts = ()    # prompts (substrings) answered with a non-retryable 400
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.streams_finished = 0
+        self.lock = threading.Lock()
+
+    def answer(self, prompt):
+        return f"Coaching for {len(prompt)} characters"
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    stand_in = None
+
+    def do_POST(self):
+        stand_in = self.stand_in
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][-1]['content']
+        with stand_in.lock:
+            stand_in.requests.append(body)
+            fail = stand_in.failures > 0
+            stand_in.failures -= fail
+            stand_in.in_flight += 1
+            stand_in.max_in_flight = max(stand_in.max_in_flight, stand_in.in_flight)
+        try:
+            time.sleep(stand_in.delay)
+            if fail:
+                self.send_json(500, {'error': {'message': 'overloaded'}}, {'retry-after-ms': '10'})
+            elif any(marker in prompt for marker in stand_in.fail_prompts):
+                self.send_json(400, {'error': {'message': 'bad prompt'}})
+            elif body.get('stream'):
+                self.send_stream(stand_in)
+            else:
+                self.send_json(200, completion(stand_in.answer(prompt)))
+        finally:
+            with stand_in.lock:
+                stand_in.in_flight -= 1
+
+    def send_json(self, status, data, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_stream(self, stand_in):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for text in stand_in.chunks:
+                chunk = {'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'stand-in',
+                         'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(stand_in.chunk_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            stand_in.streams_finished += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def completion(text):
+    return {'id': 'c', 'object': 'chat.completion', 'created': 0, 'model': 'stand-in',
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}}
+
+@pytest.fixture
+def stand_in():
+    stand_in = StandIn()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), type('BoundHandler', (Handler,), {'stand_in': stand_in}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stand_in.base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    yield stand_in
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client_for(stand_in, tmp_path):
+    clients = []
+
+    def client_for(**kwargs):
+        kwargs.setdefault('cache', ResponseCache(str(tmp_path / 'coaching')))
+        client = CoachingClient(api_key='test', base_url=stand_in.base_url, **kwargs)
+        clients.append(client)
+        return client
+    yield client_for
+    for client in clients:
+        client.close()
+
+def feedback(elbow):
+    return {'recommendations': [], 'frame_data': {'phases': {'trophy_pose': {'elbow_flexion': elbow}}}}
+
+def clip_feedback(seed):
+    """Feedback for a synthetic clip as the GUI sends it to the coach"""
+    import numpy as np
+    from backend.batch import json_frame_data
+    from backend.vectorized_engine import VectorizedAnalyzer
+    from benchmarks.synthetic import synthetic_serve_landmarks
+
+    analyzer = VectorizedAnalyzer().analyze(synthetic_serve_landmarks(120, seed=seed), np.arange(120) / 30.0)
+    feedback = analyzer.generate_feedback()
+    feedback['frame_data'] = json_frame_data(analyzer.export_frame_data())
+    return feedback
+
+def test_different_clips_have_different_cache_keys(client_for):
+    client = client_for()
+    first, second = clip_feedback(0), clip_feedback(1)
+    # The same recommendation, different metrics
+    assert [rec['title'] for rec in first['recommendations']] == [rec['title'] for rec in second['recommendations']]
+    key = client.cache_key(build_analysis_prompt(first))
+    assert key != client.cache_key(build_analysis_prompt(second))
+    assert key == client.cache_key(build_analysis_prompt(clip_feedback(0)))
+    assert 'N/A' not in build_analysis_prompt(first)
+
+def test_complete_is_cached(stand_in, client_for):
+    client = client_for()
+    text = client.complete("serve one")
+    assert text == stand_in.answer("serve one")
+    assert client.complete("serve one") == text
+    assert len(stand_in.requests) == 1
+    assert stand_in.requests[0]['model'] == api_helper.DEFAULT_MODEL
+
+    # Different sampling settings are a different request
+    client_for(temperature=0.2).complete("serve one")
+    assert len(stand_in.requests) == 2
+
+def test_retries_server_errors(stand_in, client_for):
+    stand_in.failures = 2
+    assert client_for(max_retries=3, use_cache=False).complete("retry me") == stand_in.answer("retry me")
+    assert len(stand_in.requests) == 3
+
+def test_gives_up_after_max_retries(stand_in, client_for):
+    stand_in.failures = 5
+    client = client_for(max_retries=1, use_cache=False)
+    with pytest.raises(Exception):
+        client.complete("overloaded")
+    assert len(stand_in.requests) == 2
+
+    result = analyze_with_openai(feedback(95.0), client=client)
+    assert result['ai_enabled'] is False
+
+def test_timeout(stand_in, client_for):
+    stand_in.delay = 2.0
+    client = client_for(timeout=0.3, max_retries=0, use_cache=False)
+    start = time.perf_counter()
+    with pytest.raises(Exception) as error:
+        client.complete("slow")
+    assert time.perf_counter() - start < 1.5
+    assert 'timed out' in str(error.value).lower() or 'timeout' in type(error.value).__name__.lower()
+
+def test_stream(stand_in, client_for):
+    client = client_for()
+    assert list(client.stream("stream me")) == stand_in.chunks
+    # The finished stream is cached and comes back in one piece
+    assert list(client.stream("stream me")) == [''.join(stand_in.chunks)]
+    assert len(stand_in.requests) == 1
+
+def test_stream_cancellation(stand_in, client_for):
+    stand_in.chunks = [f"word{i} " for i in range(40)]
+    stand_in.chunk_delay = 0.02
+    client = client_for()
+    received = []
+    start = time.perf_counter()
+    for text in client.stream("cancel me", should_stop=lambda: len(received) >= 2):
+        received.append(text)
+    assert received == stand_in.chunks[:2]
+    assert time.perf_counter() - start < 0.5
+    # An abandoned stream is not cached
+    assert client.cached("cancel me") is None
+    # The connection was dropped, so the server never got to the end of the stream
+    time.sleep(40 * stand_in.chunk_delay + 0.5)
+    assert stand_in.streams_finished == 0
+
+def test_batch_dedupes_and_limits_concurrency(stand_in, client_for):
+    stand_in.delay = 0.2
+    feedback_list = [feedback(elbow) for elbow in (90.0, 100.0, 110.0, 90.0, 100.0, 90.0)]
+    analyze_batch(feedback_list, client=client_for(), concurrency=2)
+
+    assert len(stand_in.requests) == 3
+    assert stand_in.max_in_flight <= 2
+    for item in feedback_list:
+        assert item['ai_enabled']
+        assert item['ai_analysis'] == stand_in.answer(build_analysis_prompt(item))
+
+    # Everything is cached now: no new requests
+    analyze_batch([feedback(90.0), feedback(110.0)], client=client_for(), concurrency=2)
+    assert len(stand_in.requests) == 3
+
+def test_batch_reports_failed_prompts(stand_in, client_for):
+    bad, good = feedback(12345.0), feedback(95.0)
+    stand_in.fail_prompts = ('12345',)
+    analyze_batch([bad, good], client=client_for(max_retries=0))
+    assert bad['ai_enabled'] is False and bad['ai_error']
+    assert good['ai_enabled'] is True
+
+def test_rate_limiter(monkeypatch):
+    monkeypatch.setattr(RateLimiter, 'WINDOW', 0.3)
+
+    async def timed_acquires(limiter, tokens):
+        start = time.monotonic()
+        times = []
+        for count in tokens:
+            await limiter.acquire(count)
+            times.append(time.monotonic() - start)
+        return times
+
+    times = asyncio.run(timed_acquires(RateLimiter(requests_per_minute=2), [0, 0, 0]))
+    assert times[1] < 0.1 and times[2] >= 0.28
+
+    times = asyncio.run(timed_acquires(RateLimiter(tokens_per_minute=100), [60, 30, 60]))
+    assert times[1] < 0.1 and times[2] >= 0.28
+
+    # A request over the whole budget still goes through on an empty window
+    times = asyncio.run(timed_acquires(RateLimiter(tokens_per_minute=100), [500]))
+    assert times[0] < 0.1
@@ -0,0 +1,29 @@
+# tests/test_batch.py
+import pytest
+
+from backend import batch
+from vision.pose_runner import iter_pose_frames
+
+@pytest.fixture
+def garbage_video(tmp_path):
+    path = tmp_path / 'corrupt.mp4'
+    path.write_bytes(b'this is not a video' * 100)
+    return str(path)
+
+def test_unreadable_video_raises(garbage_video):
+    with pytest.raises(OSError):
+        list(iter_pose_frames(garbage_video, pose=None))
+
+def test_unreadable_video_is_not_analyzed(garbage_video):
+    with pytest.raises(OSError):
+        batch.analyze_video(garbage_video, pose=None)
+
+def test_unreadable_video_is_a_failed_job(garbage_video, monkeypatch):
+    class Pose:
+        def reset(self):
+            pass
+
+    monkeypatch.setattr('vision.pose_runner._worker_pose', Pose())
+    result = batch._process_job(garbage_video)
+    assert 'error' in result
+    assert 'feedback' not in result
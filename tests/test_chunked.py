@@ -0,0 +1,29 @@
+# tests/test_chunked.py
+import shutil
+import subprocess
+
+import pytest
+
+from benchmarks.synthetic import write_synthetic_serve_video
+from vision import decode
+from vision.chunked import plan_segments, probe_keyframes
+
+KEYFRAMES = [0, 37, 80]
+
+def test_plan_segments_uniform():
+    assert plan_segments(900, 3, overlap=15) == [(0, 0, 315), (300, 315, 615), (600, 615, None)]
+
+def test_plan_segments_seek_to_nearest_keyframe():
+    segments = plan_segments(900, 3, keyframes=[0, 250, 320, 580, 700], overlap=15)
+    assert segments == [(0, 0, 335), (320, 335, 595), (580, 595, None)]
+
+@pytest.mark.skipif(not (decode.FFMPEG and shutil.which('ffprobe')), reason="needs ffmpeg and ffprobe")
+def test_keyframes_are_presentation_indices(tmp_path):
+    source = str(tmp_path / 'source.mp4')
+    write_synthetic_serve_video(source, 120, 320, 240, fps=30)
+    # B-frames put each keyframe's packet ahead of the frames shown before it
+    video = str(tmp_path / 'bframes.mp4')
+    force = 'expr:' + '+'.join(f'eq(n,{frame})' for frame in KEYFRAMES)
+    subprocess.run([decode.FFMPEG, '-v', 'error', '-y', '-i', source, '-c:v', 'libx264', '-bf', '3',
+                    '-g', '1000', '-sc_threshold', '0', '-force_key_frames', force, video], check=True)
+    assert probe_keyframes(video) == KEYFRAMES
@@ -0,0 +1,96 @@
+# tests/test_compare.py
+import numpy as np
+import pytest
+
+from backend.compare import (CHANNELS, ReferenceLibrary, dtw_batch, dtw_path, envelopes,
+                             lb_keogh, serve_trajectory)
+
+LENGTH = 32
+
+def random_trajectories(rng, count, length=LENGTH):
+    """Smooth random walks shaped like resampled (length, channels) serve trajectories"""
+    steps = rng.normal(0, 0.05, size=(count, length, len(CHANNELS)))
+    return (rng.uniform(0, 1, size=(count, 1, len(CHANNELS))) + steps.cumsum(axis=1)).astype(np.float32)
+
+def brute_dtw(query, reference, radius):
+    query, reference = np.asarray(query, np.float64), np.asarray(reference, np.float64)
+    n = len(query)
+    D = np.full((n + 1, n + 1), np.inf)
+    D[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(1, n + 1):
+            if abs(i - j) <= radius:
+                cost = ((query[i - 1] - reference[j - 1]) ** 2).sum()
+                D[i, j] = cost + min(D[i - 1, j - 1], D[i - 1, j], D[i, j - 1])
+    return D[n, n]
+
+def brute_lb_keogh(query, reference, radius):
+    total = 0.0
+    for i in range(len(query)):
+        window = reference[max(0, i - radius):i + radius + 1]
+        lower, upper = window.min(axis=0), window.max(axis=0)
+        total += ((np.maximum(query[i] - upper, 0) ** 2) + (np.maximum(lower - query[i], 0) ** 2)).sum()
+    return total
+
+@pytest.mark.parametrize('radius', [1, 3, 8, LENGTH])
+def test_banded_dtw_matches_brute_force(radius):
+    rng = np.random.default_rng(radius)
+    query = random_trajectories(rng, 1)[0]
+    candidates = random_trajectories(rng, 12)
+    kept, distances = dtw_batch(query, candidates, radius)
+    assert kept.tolist() == list(range(12))
+    expected = [brute_dtw(query, candidate, radius) for candidate in candidates]
+    np.testing.assert_allclose(distances, expected, rtol=1e-9)
+
+    distance, path = dtw_path(query, candidates[0], radius)
+    assert distance == pytest.approx(expected[0], rel=1e-9)
+    assert path[0] == (0, 0) and path[-1] == (LENGTH - 1, LENGTH - 1)
+    assert all(abs(i - j) <= radius for i, j in path)
+    cost = sum(((query[i].astype(np.float64) - candidates[0][j]) ** 2).sum() for i, j in path)
+    assert cost == pytest.approx(distance, rel=1e-6)
+
+@pytest.mark.parametrize('radius', [1, 3, 8])
+def test_lb_keogh_matches_brute_force_and_bounds_dtw(radius):
+    rng = np.random.default_rng(10 + radius)
+    query = random_trajectories(rng, 1)[0]
+    candidates = random_trajectories(rng, 20)
+    lower, upper = envelopes(candidates, radius)
+    bounds = lb_keogh(query, lower, upper).sum(axis=1)
+    for bound, candidate in zip(bounds, candidates):
+        assert bound == pytest.approx(brute_lb_keogh(query, candidate, radius), rel=1e-5, abs=1e-9)
+        assert bound <= brute_dtw(query, candidate, radius) + 1e-9
+
+def test_early_abandoning_keeps_everything_under_the_threshold():
+    rng = np.random.default_rng(7)
+    query = random_trajectories(rng, 1)[0]
+    candidates = random_trajectories(rng, 40)
+    lower, upper = envelopes(candidates, 3)
+    per_point = lb_keogh(query, lower, upper)
+    rest = per_point[:, ::-1].cumsum(axis=1)[:, ::-1]
+    lb_rest = np.concatenate([rest, np.zeros((len(candidates), 1))], axis=1)
+
+    expected = np.array([brute_dtw(query, candidate, 3) for candidate in candidates])
+    threshold = np.median(expected)
+    kept, distances = dtw_batch(query, candidates, 3, lb_rest, threshold)
+    assert set(np.flatnonzero(expected < threshold)) <= set(kept.tolist())
+    np.testing.assert_allclose(distances, expected[kept], rtol=1e-9)
+
+def test_library_query_matches_brute_force_ranking():
+    rng = np.random.default_rng(3)
+    trajectories = random_trajectories(rng, 300)
+    library = ReferenceLibrary(trajectories, [f"ref{i}" for i in range(300)],
+                               np.full((300, 2), -1, dtype=np.int32))
+
+    frames = np.arange(1, 91)
+    walk = random_trajectories(rng, 1, len(frames))[0]
+    frame_data = {'phases': {}, 'all_frames': dict(
+        {'frame': frames}, **{name: walk[:, c] * scale
+                              for c, (name, scale) in enumerate(zip(CHANNELS, (180.0, 180.0, 1.0)))})}
+    query, _ = serve_trajectory(frame_data, LENGTH)
+
+    matches, stats = library.query(frame_data, k=5)
+    expected = np.argsort([brute_dtw(query, reference, library.radius) for reference in trajectories])[:5]
+    assert [match['name'] for match in matches] == [f"ref{i}" for i in expected]
+    # The bounds did prune: not every reference needed a full DTW
+    assert stats['dtw_computed'] < 300
+    assert stats['lb_pruned'] + stats['abandoned'] + stats['dtw_computed'] == 300
@@ -0,0 +1,135 @@
+# tests/test_decode.py
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import write_synthetic_serve_video
+from vision import decode
+from vision.decode import FFmpegDecoder, OpenCVDecoder, open_decoder, output_size, cache_settings
+from vision.landmark_cache import LandmarkCache, FULL_RESOLUTION_DECODE, CACHE_DTYPE
+
+N_FRAMES = 45
+FPS = 30
+
+needs_ffmpeg = pytest.mark.skipif(not decode.FFMPEG, reason="no ffmpeg binary (set SPIKESIGHT_FFMPEG)")
+
+@pytest.fixture(scope='module')
+def clip(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('decode') / 'clip.mp4')
+    write_synthetic_serve_video(path, N_FRAMES, 640, 360, fps=FPS)
+    return path
+
+def read_all(decoder):
+    items = []
+    try:
+        while True:
+            item = decoder.read()
+            if item is None:
+                return items
+            timestamp, frame = item
+            items.append((timestamp, frame.copy()))
+    finally:
+        decoder.close()
+
+def test_output_size():
+    assert output_size(3840, 2160, 1280) == (1280, 720)
+    assert output_size(640, 360, 1280) == (640, 360)
+    assert output_size(641, 361, None) == (641, 361)
+    width, height = output_size(1080, 1921, 500)
+    assert width % 2 == 0 and height % 2 == 0
+
+def test_opencv_decoder_downscales_into_the_ring(clip):
+    decoder = OpenCVDecoder(clip, max_width=320, ring_slots=4)
+    assert decoder.source_size == (640, 360) and decoder.size == (320, 180)
+    frames = []
+    while True:
+        item = decoder.read()
+        if item is None:
+            break
+        frames.append(item[1])
+    decoder.close()
+    assert len(frames) == N_FRAMES
+    assert frames[0].shape == (180, 320, 3)
+    # Every fourth frame reuses the same ring buffer
+    assert np.shares_memory(frames[0], frames[4])
+    assert not np.shares_memory(frames[0], frames[1])
+
+@needs_ffmpeg
+def test_ffmpeg_matches_opencv(clip):
+    reference = read_all(OpenCVDecoder(clip, max_width=320))
+    decoded = read_all(FFmpegDecoder(clip, max_width=320, ring_slots=6))
+    assert len(decoded) == len(reference) == N_FRAMES
+
+    reference_times = np.array([timestamp for timestamp, _ in reference])
+    times = np.array([timestamp for timestamp, _ in decoded])
+    assert times[0] == pytest.approx(0.0, abs=1e-6)
+    assert np.allclose(np.diff(times), 1 / FPS, atol=1e-3)
+    assert np.allclose(times, reference_times, atol=1e-3)
+
+    for (_, frame), (_, expected) in zip(decoded, reference):
+        assert frame.shape == expected.shape == (180, 320, 3)
+        # Different scalers, same picture
+        assert np.abs(frame.astype(np.int16) - expected).mean() < 8
+
+@needs_ffmpeg
+def test_ffmpeg_close_mid_stream(clip):
+    decoder = FFmpegDecoder(clip, ring_slots=3)
+    assert decoder.read() is not None
+    decoder.close()
+    assert decoder.proc.poll() is not None
+
+@needs_ffmpeg
+def test_ffmpeg_unreadable_video(tmp_path):
+    path = tmp_path / 'broken.mp4'
+    path.write_bytes(b'not a video' * 100)
+    with pytest.raises(OSError):
+        FFmpegDecoder(str(path))
+
+def test_auto_uses_ffmpeg_only_to_downscale(monkeypatch):
+    monkeypatch.setattr(decode, 'FFMPEG', '/usr/bin/ffmpeg')
+    assert decode.resolve_backend('auto', 3840, 1280) == 'ffmpeg'
+    assert decode.resolve_backend('auto', 1280, 1280) == 'opencv'
+    assert decode.resolve_backend('auto', 3840, None) == 'opencv'
+    assert decode.resolve_backend('ffmpeg', 640, 1280) == 'ffmpeg'
+    assert cache_settings('auto', 1280, 640) == {'decoder': 'opencv', 'max_width': 1280}
+    assert cache_settings('auto', 320, 640) == {'decoder': 'ffmpeg', 'max_width': 320}
+    monkeypatch.setattr(decode, 'FFMPEG', None)
+    assert cache_settings('auto', 320, 640) == {'decoder': 'opencv', 'max_width': 320}
+
+@needs_ffmpeg
+def test_auto_opens_ffmpeg_only_to_downscale(clip):
+    for max_width, expected in ((1280, 'opencv'), (320, 'ffmpeg')):
+        decoder = open_decoder(clip, 'auto', max_width, ring_slots=3)
+        decoder.close()
+        assert decoder.name == expected
+
+def test_opencv_unreadable_video(tmp_path):
+    path = tmp_path / 'broken.mp4'
+    path.write_bytes(b'not a video' * 100)
+    with pytest.raises(OSError):
+        OpenCVDecoder(str(path), ring_slots=3)
+    with pytest.raises(OSError):
+        open_decoder(str(tmp_path / 'missing.mp4'), 'auto')
+
+def test_auto_falls_back_to_opencv(clip, monkeypatch):
+    monkeypatch.setattr(decode, 'FFMPEG', None)
+    decoder = open_decoder(clip, 'auto', 320)
+    decoder.close()
+    assert decoder.name == 'opencv'
+    assert cache_settings('auto', 320) == {'decoder': 'opencv', 'max_width': 320}
+    with pytest.raises(ValueError):
+        open_decoder(clip, 'gstreamer')
+
+def test_cache_entries_depend_on_decoding(clip, tmp_path):
+    cache = LandmarkCache(str(tmp_path), pose_settings={'model_complexity': 1})
+    records = np.zeros(3, dtype=CACHE_DTYPE)
+    records['frame'] = [0, 1, 2]
+    gui = cache_settings('opencv', 1280)
+
+    assert cache.key_for(clip) == cache.key_for(clip, FULL_RESOLUTION_DECODE)
+    assert len({cache.key_for(clip), cache.key_for(clip, gui),
+                cache.key_for(clip, cache_settings('ffmpeg', 1280)),
+                cache.key_for(clip, cache_settings('opencv', 640))}) == 4
+
+    cache.store_records(clip, records, gui)
+    assert cache.load(clip) is None
+    assert list(cache.load(clip, gui)['frame']) == [0, 1, 2]
@@ -0,0 +1,40 @@
+# tests/test_display.py
+import numpy as np
+
+from vision.display import DisplayBuffer
+
+FRAME = np.zeros((90, 160, 3), dtype=np.uint8)
+
+def read(display):
+    with display.latest() as rgb_image:
+        return rgb_image is not None
+
+def test_every_frame_is_shown_when_the_gui_keeps_up():
+    display = DisplayBuffer(max_fps=0)
+    for _ in range(10):
+        assert display.submit(FRAME)
+        assert read(display)
+    assert (display.shown, display.dropped) == (10, 0)
+
+def test_replaced_frames_are_dropped_once():
+    display = DisplayBuffer(max_fps=0)
+    for _ in range(60):
+        display.submit(FRAME)
+    assert display.dropped == 59
+    assert display.pending
+    read(display)
+    read(display)  # nothing new: not shown again
+    assert (display.shown, display.dropped) == (1, 59)
+    assert not display.pending
+
+def test_rate_capped_frame_shown_later_is_not_dropped():
+    display = DisplayBuffer(max_fps=1)
+    assert display.wants_frame()
+    display.submit(FRAME)
+    read(display)
+    assert not display.wants_frame()
+    assert display.dropped == 1
+    # e.g. the last frame of a video, flushed after the rate cap turned it away
+    display.submit(FRAME, skipped=True)
+    read(display)
+    assert (display.shown, display.dropped) == (2, 0)
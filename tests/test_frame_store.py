@@ -0,0 +1,69 @@
+# tests/test_frame_store.py
+import numpy as np
+import pytest
+
+from backend.frame_store import FrameMetricStore
+from backend.landmarks import PoseFrame
+from backend.serve_analysis import ServeAnalyzer
+from backend.vectorized_engine import VectorizedAnalyzer
+from benchmarks.synthetic import synthetic_serve_landmarks
+
+def test_append_grows_and_keeps_rows():
+    store = FrameMetricStore(initial_capacity=2)
+    for i in range(10):
+        store.append(i + 1, i, i, i, i, frame_index=100 + i)
+    assert len(store) == 10
+    assert store.column('frame').tolist() == list(range(1, 11))
+    assert store.column('frame_index').tolist() == list(range(100, 110))
+    assert store.as_dicts()[3]['frame_index'] == 103
+
+def test_spilled_store_keeps_rows(tmp_path):
+    store = FrameMetricStore(initial_capacity=4, spill_rows=8, spill_dir=str(tmp_path))
+    for i in range(20):
+        store.append(i + 1, i, i, i, i)
+    assert store.spilled
+    assert store.column('elbow_angle').tolist() == list(range(20))
+    assert (store.column('frame_index') == -1).all()
+    store.close()
+
+def test_append_after_close_raises():
+    store = FrameMetricStore()
+    store.append(1, 0, 0, 0, 0)
+    store.close()
+    with pytest.raises(ValueError, match="closed"):
+        store.append(2, 0, 0, 0, 0)
+    with pytest.raises(ValueError, match="closed"):
+        store.column('frame')
+
+def test_row_for():
+    store = FrameMetricStore()
+    for frame in (3, 4, 6):
+        store.append(frame, 0, 0, 0, 0)
+    assert store.row_for(4) == 1
+    assert store.row_for(5) is None
+    assert store.row_for(7) is None
+
+def test_video_frame_for_follows_pose_frames():
+    landmarks = synthetic_serve_landmarks(n_frames=60)
+    timestamps = np.arange(60) / 30.0
+    analyzer = ServeAnalyzer(verbose=False)
+    for i, (frame, timestamp) in enumerate(zip(landmarks, timestamps)):
+        # Every other video frame, as when the pipeline skips frames
+        analyzer.process_frame(PoseFrame(frame, 2 * i, timestamp))
+    assert analyzer.video_frame_for(1) == 0
+    assert analyzer.video_frame_for(60) == 118
+    assert analyzer.video_frame_for(61) is None
+    assert analyzer.video_frame_for(None) is None
+
+    analyzer.reset_serve()
+    analyzer.process_frame(PoseFrame(landmarks[0], 500, timestamps[0]))
+    assert analyzer.video_frame_for(61) == 500
+    assert analyzer.video_frame_for(1) is None
+
+def test_vectorized_analyzer_stores_frame_indices():
+    landmarks = synthetic_serve_landmarks(n_frames=30)
+    timestamps = np.arange(30) / 30.0
+    analyzer = VectorizedAnalyzer().analyze(landmarks, timestamps, np.arange(10, 40))
+    assert analyzer.video_frame_for(1) == 10
+    assert analyzer.video_frame_for(30) == 39
+    assert VectorizedAnalyzer().analyze(landmarks, timestamps).video_frame_for(1) is None
@@ -0,0 +1,104 @@
+# tests/test_history.py
+import sqlite3
+import threading
+
+import pytest
+
+from backend.history import HistoryStore, serve_record
+
+def feedback(elbow=95.0, recommendations=('Low Contact Point',)):
+    return {
+        'recommendations': [{'title': title, 'advice': ''} for title in recommendations],
+        'frame_data': {
+            'total_frames': 120,
+            'phases': {
+                'trophy_pose': {'frame': 40, 'elbow_flexion': elbow, 'wrist_height': 0.2},
+                'ball_contact': {'frame': 60, 'shoulder_abduction': 130.0, 'elbow_extension': 170.0,
+                                 'max_velocity': 0.5},
+            },
+            'summary_stats': {'min_elbow_angle': elbow, 'max_wrist_velocity': 0.5},
+        },
+    }
+
+def record(video_hash, serve_index=1, track=0, athlete='ana', **kwargs):
+    return serve_record(feedback(**kwargs), athlete, recorded_at='2024-03-01T10:00:00',
+                        video_hash=video_hash, serve_index=serve_index, track=track)
+
+@pytest.fixture
+def store(tmp_path):
+    with HistoryStore(str(tmp_path / 'history.sqlite3')) as store:
+        yield store
+
+def test_ingest_and_query(store):
+    added, updated = store.add_serves([record(f'v{i}', elbow=70.0 + i) for i in range(20)], batch_size=7)
+    assert (added, updated) == (20, 0)
+    assert store.count('ana') == 20
+    assert len(store.find_serves(below={'trophy_elbow': 75})) == 5
+    assert len(store.find_serves(recommendation='Low Contact Point')) == 20
+    assert store.trend('ana', 'trophy_elbow', by='month') == [('2024-03', pytest.approx(79.5), 20)]
+
+def test_reanalysis_updates_the_stored_serve(store):
+    first = store.add_serve(record('v1', elbow=80.0))
+    second = store.add_serve(record('v1', elbow=100.0, recommendations=('Excellent Form!',)))
+    assert first == second
+    assert store.count() == 1
+    assert store.find_serves()[0]['trophy_elbow'] == 100.0
+    assert store.find_serves(recommendation='Low Contact Point') == []
+    assert len(store.find_serves(recommendation='Excellent Form!')) == 1
+    assert store.add_serves([record('v1'), record('v2')]) == (1, 1)
+
+def test_athletes_in_one_video_are_separate_serves(store):
+    store.add_serves([record('v1', track=1, athlete='ana #1'), record('v1', track=2, athlete='ana #2'),
+                      record('v1', serve_index=2, track=1, athlete='ana #1')])
+    assert store.count() == 3
+
+def test_concurrent_writers_keep_every_serve(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    HistoryStore(path).close()
+    errors = []
+
+    def ingest(writer):
+        try:
+            with HistoryStore(path) as store:
+                for batch in range(10):
+                    records = [record(f'{writer}-{batch}-{i}', recommendations=(f'{writer}-{batch}-{i}',))
+                               for i in range(20)]
+                    store.add_serves(records, batch_size=20)
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(writer,)) for writer in ('gui', 'cli')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+    with HistoryStore(path) as store:
+        assert store.count() == 400
+        # Every serve's recommendation row points at that serve
+        mismatched = store.conn.execute(
+            "SELECT COUNT(*) FROM serves JOIN recommendations ON serve_id = id "
+            "WHERE title != video_hash").fetchone()[0]
+        assert mismatched == 0
+        assert store.conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0] == 400
+
+def test_version_0_history_is_migrated(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE serves (id INTEGER PRIMARY KEY, athlete TEXT NOT NULL, recorded_at TEXT NOT NULL,
+            video_hash TEXT, video_path TEXT, serve_index INTEGER NOT NULL DEFAULT 1, total_frames INTEGER,
+            trophy_elbow REAL, recommendations TEXT, ingested_at TEXT NOT NULL,
+            UNIQUE (video_hash, serve_index));
+        INSERT INTO serves (athlete, recorded_at, video_hash, serve_index, trophy_elbow, ingested_at)
+            VALUES ('ana', '2024-01-01', 'v1', 1, 90.0, '2024-01-01'), ('ana', '2024-01-02', 'v1', 2, 95.0, '2024-01-02');
+    """)
+    conn.close()
+
+    with HistoryStore(path) as store:
+        assert store.count() == 2
+        # Track 2 of the same video is a new serve under the new key
+        store.add_serve(record('v1', track=2))
+        assert store.count() == 3
+        assert [serve['trophy_elbow'] for serve in store.find_serves(until='2024-02')] == [95.0, 90.0]
@@ -0,0 +1,78 @@
+# tests/test_replay.py
+import numpy as np
+import pytest
+
+from vision.replay import ReplayStore
+
+WIDTH, HEIGHT = 80, 60
+
+@pytest.fixture(scope='module')
+def frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, size=(HEIGHT, WIDTH, 3), dtype=np.uint8) for _ in range(8)]
+
+def frame_bytes(frames):
+    store = ReplayStore(budget_bytes=1 << 30)
+    for i, frame in enumerate(frames):
+        store.add(i, i / 30.0, frame)
+    return max(store._size(entry) for entry in store._frames.values())
+
+def fill(store, frames, n_frames, keys=(), landmarks=None):
+    # Marked before the frames arrive, as mark_recent() does for the frames still to come
+    for key in keys:
+        store.mark_key(key)
+    for i in range(n_frames):
+        store.add(i, i / 30.0, frames[i % len(frames)], landmarks)
+        assert store.nbytes <= store.budget_bytes
+    return store
+
+def assert_consistent(store):
+    order = store._order
+    assert order == sorted(store._frames)
+    assert store.nbytes == sum(store._size(entry) for entry in store._frames.values())
+
+def test_thinning_keeps_the_video_reachable_under_budget(frames):
+    budget = 60 * frame_bytes(frames)
+    store = fill(ReplayStore(budget, recent_frames=10, key_radius=5), frames, 600, keys={150})
+    assert_consistent(store)
+    assert store.stride > 1
+    # Frames off the stride are not even encoded once thinning has started
+    assert store.skipped > 0
+    assert store.evicted + store.skipped == 600 - len(store)
+
+    order = store._order
+    assert order[0] == 0 and order[-1] > 599 - store.stride
+    # Thinned, but no gaps wider than the stride
+    assert max(np.diff(order)) <= store.stride
+    # The frames around the key frame stay at full rate
+    assert set(range(145, 156)) <= set(order)
+
+def test_tiny_budget_drops_the_oldest_frames(frames):
+    budget = 5 * frame_bytes(frames)
+    store = fill(ReplayStore(budget, recent_frames=30, key_radius=2), frames, 300, keys={10})
+    assert_consistent(store)
+    assert 0 not in store._frames and 299 in store._frames
+    assert store.nbytes <= budget
+    assert len(store) <= 5
+
+def test_get_returns_downscaled_frame_and_landmarks(frames):
+    landmarks = np.random.default_rng(1).random((33, 4), dtype=np.float32)
+    store = ReplayStore(budget_bytes=1 << 20, max_width=40)
+    store.add(7, 0.25, frames[0], landmarks)
+    store.add(7, 0.5, frames[1])  # a frame is only stored once
+    timestamp, image, stored = store.get(7)
+    assert timestamp == 0.25
+    assert image.shape == (30, 40, 3)
+    np.testing.assert_array_equal(stored, landmarks)
+    assert store.get(8) is None
+
+def test_navigation(frames):
+    store = ReplayStore(budget_bytes=1 << 20)
+    for i in (2, 5, 9):
+        store.add(i, i / 30.0, frames[0])
+    assert store.frame_range() == (2, 9)
+    assert store.nearest(6) == 5
+    assert store.nearest(100) == 9
+    assert store.next_after(5) == 9
+    assert store.next_after(9) is None
+    assert store.timestamp(9) == pytest.approx(0.3)
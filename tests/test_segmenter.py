@@ -0,0 +1,41 @@
+# tests/test_segmenter.py
+from backend.landmarks import PoseFrame
+from backend.segmenter import ServeSegmenter
+from benchmarks.synthetic import synthetic_session_landmarks
+
+FPS = 30
+
+def run_session(segmenter, landmarks):
+    results, max_rows = [], 0
+    for i, frame in enumerate(landmarks):
+        result = segmenter.process_frame(PoseFrame(frame, i, i / FPS))
+        max_rows = max(max_rows, len(segmenter.analyzer.frame_store))
+        if result is not None:
+            results.append(result)
+    result = segmenter.finish()
+    if result is not None:
+        results.append(result)
+    return results, max_rows
+
+def test_serves_are_found_between_long_idle_gaps():
+    serve_frames, gap_frames = 90, 150
+    landmarks = synthetic_session_landmarks(n_serves=3, serve_frames=serve_frames, gap_frames=gap_frames)
+    results, max_rows = run_session(ServeSegmenter(max_idle_seconds=1.0), landmarks)
+
+    assert [result['serve'] for result in results] == [1, 2, 3]
+    # Idle history is trimmed to a second; only an active serve adds to it
+    assert max_rows <= FPS + 1 + serve_frames
+    for i, result in enumerate(results):
+        first = i * (serve_frames + gap_frames) + gap_frames
+        assert first <= result['start_frame'] <= result['trophy_video_frame']
+        assert result['trophy_video_frame'] < result['contact_video_frame'] <= result['end_frame']
+        assert result['end_frame'] < first + serve_frames
+
+def test_idle_trim_keeps_the_recent_frames():
+    landmarks = synthetic_session_landmarks(n_serves=1, serve_frames=90, gap_frames=100)[:100]
+    segmenter = ServeSegmenter(max_idle_seconds=1.0)
+    run_session(segmenter, landmarks)
+
+    frames = segmenter.analyzer.frame_store.column('frame_index')
+    assert frames.tolist() == list(range(100 - FPS - 1, 100))
+    assert segmenter.analyzer.video_frame_for(segmenter.analyzer.frame_count) == 99
@@ -0,0 +1,100 @@
+# tests/test_service.py
+import json
+import os
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from backend.service import AnalysisService, make_server
+from benchmarks.synthetic import write_synthetic_serve_video
+
+TIMEOUT = 120
+
+@pytest.fixture(scope='module')
+def videos(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('videos')
+    short, long = str(directory / 'short.mp4'), str(directory / 'long.mp4')
+    write_synthetic_serve_video(short, 20, 320, 240)
+    write_synthetic_serve_video(long, 400, 640, 360)
+    return {'short': short, 'long': long}
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    service = AnalysisService(str(tmp_path_factory.mktemp('service')), workers=1)
+    service.start()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    service.url = f"http://127.0.0.1:{server.server_port}"
+    yield service
+    server.shutdown()
+    server.server_close()
+    service.stop()
+
+def request(service, path, data=None):
+    """(status, decoded JSON body)"""
+    req = urllib.request.Request(service.url + path, data=data, method='POST' if data is not None else 'GET')
+    try:
+        with urllib.request.urlopen(req, timeout=TIMEOUT) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def upload(service, path, name=None):
+    with open(path, 'rb') as f:
+        return request(service, f"/jobs?filename={name or os.path.basename(path)}", f.read())
+
+def wait_for(service, job_id, statuses=('done', 'failed')):
+    deadline = time.time() + TIMEOUT
+    while time.time() < deadline:
+        _, job = request(service, f"/jobs/{job_id}")
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+def test_analyze_and_fetch_result(service, videos):
+    status, job = upload(service, videos['short'])
+    assert status == 202 and not job['deduplicated']
+    assert wait_for(service, job['id'])['status'] == 'done'
+
+    status, result = request(service, f"/jobs/{job['id']}/result")
+    assert status == 200
+    assert result['job'] == job['id']
+    assert 'recommendations' in result['feedback']
+
+    # The same clip again is the same job
+    status, again = upload(service, videos['short'], 'copy.mp4')
+    assert status == 200 and again['deduplicated'] and again['id'] == job['id']
+
+def test_corrupt_upload_fails(service):
+    status, job = request(service, "/jobs?filename=broken.mp4", b'not a video' * 1000)
+    assert status == 202
+    job = wait_for(service, job['id'])
+    assert job['status'] == 'failed' and job['error']
+    assert request(service, f"/jobs/{job['id']}/result")[0] == 409
+
+def test_bad_requests(service):
+    assert request(service, "/jobs?limit=abc")[0] == 400
+    assert request(service, "/jobs?limit=0")[0] == 400
+    assert request(service, "/jobs?limit=5")[0] == 200
+    assert request(service, "/jobs/nope")[0] == 404
+    assert request(service, "/nope")[0] == 404
+
+def test_worker_crash_requeues_the_job(service, videos):
+    status, job = upload(service, videos['long'])
+    assert status == 202
+    wait_for(service, job['id'], ('running',))
+    time.sleep(1.0)  # well into the video
+    for pid in list(service.pool._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    assert wait_for(service, job['id'])['status'] == 'done'
+    # The rebuilt pool keeps serving
+    status, result = request(service, f"/jobs/{job['id']}/result")
+    assert status == 200 and result['frames_analyzed'] >= 0
+    assert service.stats()['running'] == 0
@@ -0,0 +1,73 @@
+# tests/test_session_export.py
+import json
+import zipfile
+
+import numpy as np
+import pytest
+
+from backend.compare import frame_data_from_file
+from backend.landmarks import PoseFrame
+from backend.serve_analysis import ServeAnalyzer
+from backend.session_export import HEADER_NAME, export_session, open_session, write_session
+from benchmarks.synthetic import synthetic_serve_landmarks
+from vision.landmark_cache import to_records
+
+@pytest.fixture(scope='module')
+def analyzed():
+    landmarks = synthetic_serve_landmarks(120)
+    pose_frames = [PoseFrame(frame, 2 * i, i / 30.0) for i, frame in enumerate(landmarks)]
+    analyzer = ServeAnalyzer(verbose=False)
+    for pose_frame in pose_frames:
+        analyzer.process_frame(pose_frame)
+    return analyzer, to_records(pose_frames)
+
+def test_export_round_trip(tmp_path, analyzed):
+    analyzer, records = analyzed
+    path = export_session(str(tmp_path / 'serve.npz'), analyzer, records, video_path='serve.mp4', athlete='A')
+    frame_data = analyzer.export_frame_data()
+
+    with open_session(path) as session:
+        header = session.header
+        assert header['video'] == 'serve.mp4'
+        assert header['athlete'] == 'A'
+        assert header['total_frames'] == 120
+        assert header['phases'] == json.loads(json.dumps(frame_data['phases'], default=float))
+        assert 'frame_data' not in header['feedback']
+        assert header['feedback']['recommendations'] == analyzer.generate_feedback()['recommendations']
+
+        for name, column in frame_data['all_frames'].items():
+            assert isinstance(session[name], np.memmap)
+            np.testing.assert_array_equal(session[name], column)
+            assert session[name].dtype == column.dtype
+        np.testing.assert_array_equal(session['video_frame'], records['frame'])
+        np.testing.assert_array_equal(session['timestamp'], records['timestamp'])
+        np.testing.assert_array_equal(session['landmarks'], records['landmarks'])
+        assert sorted(session.keys()) == sorted(header['columns'])
+
+    # Still a plain .npz
+    with np.load(path) as npz:
+        np.testing.assert_array_equal(npz['elbow_angle'], frame_data['all_frames']['elbow_angle'])
+
+def test_compare_reads_exported_sessions(tmp_path, analyzed):
+    analyzer, _ = analyzed
+    path = export_session(str(tmp_path / 'serve.npz'), analyzer)
+    [(name, frame_data)] = frame_data_from_file(path)
+    assert name == path
+    np.testing.assert_array_equal(frame_data['all_frames']['wrist_height'],
+                                  analyzer.export_frame_data()['all_frames']['wrist_height'])
+
+def test_empty_and_multidimensional_columns(tmp_path):
+    columns = {'empty': np.empty(0, dtype=np.float32), 'grid': np.arange(24, dtype=np.int16).reshape(2, 3, 4)}
+    path = write_session(str(tmp_path / 'columns.npz'), columns, {})
+    with open_session(path) as session:
+        assert session['empty'].shape == (0,)
+        np.testing.assert_array_equal(session['grid'], columns['grid'])
+        assert session.header['columns']['grid'] == {'dtype': '<i2', 'shape': [2, 3, 4]}
+
+def test_compressed_members_are_read(tmp_path):
+    path = str(tmp_path / 'compressed.npz')
+    np.savez_compressed(path, values=np.arange(10.0))
+    with zipfile.ZipFile(path, 'a') as zf:
+        zf.writestr(HEADER_NAME, json.dumps({'columns': {'values': {}}}))
+    with open_session(path) as session:
+        np.testing.assert_array_equal(session['values'], np.arange(10.0))
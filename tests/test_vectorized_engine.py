@@ -0,0 +1,54 @@
+# tests/test_vectorized_engine.py
+import numpy as np
+import pytest
+
+from backend.landmarks import PoseFrame
+from backend.serve_analysis import ServeAnalyzer
+from backend.vectorized_engine import VectorizedAnalyzer
+from benchmarks.synthetic import synthetic_serve_landmarks, synthetic_session_landmarks
+
+def per_frame(landmarks, timestamps):
+    analyzer = ServeAnalyzer(verbose=False)
+    for i, frame in enumerate(landmarks):
+        analyzer.process_frame(PoseFrame(frame, i, None if timestamps is None else timestamps[i]))
+    return analyzer
+
+def assert_same_analysis(landmarks, timestamps):
+    expected = per_frame(landmarks, timestamps)
+    actual = VectorizedAnalyzer().analyze(landmarks, timestamps, np.arange(len(landmarks)))
+    assert actual.current_phase == expected.current_phase
+    assert actual.frame_count == expected.frame_count
+
+    expected_data, actual_data = expected.export_frame_data(), actual.export_frame_data()
+    for name, column in expected_data['all_frames'].items():
+        np.testing.assert_allclose(actual_data['all_frames'][name], column, rtol=1e-5, atol=1e-4)
+    for section in ('phases', 'summary_stats'):
+        for key, values in expected_data[section].items():
+            if isinstance(values, dict):
+                assert values.keys() == actual_data[section][key].keys()
+                for name, value in values.items():
+                    assert actual_data[section][key][name] == pytest.approx(value, rel=1e-6)
+            else:
+                assert actual_data[section][key] == pytest.approx(values, rel=1e-6)
+
+    expected_feedback, actual_feedback = expected.generate_feedback(), actual.generate_feedback()
+    assert ([rec['title'] for rec in actual_feedback['recommendations']] ==
+            [rec['title'] for rec in expected_feedback['recommendations']])
+
+@pytest.mark.parametrize('seed', range(8))
+def test_matches_per_frame_analyzer(seed):
+    rng = np.random.default_rng(seed)
+    n_frames = int(rng.integers(60, 180))
+    landmarks = synthetic_serve_landmarks(n_frames, noise=0.004, seed=seed)
+    # Jittered frame times, as from a variable frame rate video
+    timestamps = np.cumsum(rng.uniform(0.02, 0.05, n_frames))
+    assert_same_analysis(landmarks, timestamps)
+
+@pytest.mark.parametrize('cut', [0, 1, 30, 50, 60, 68, 69, 72, 75, 76, 95])
+def test_matches_per_frame_analyzer_on_partial_clips(cut):
+    # Clips that end in every phase of the serve
+    landmarks = synthetic_serve_landmarks(120, seed=3)[:cut]
+    assert_same_analysis(landmarks, np.arange(cut) / 30.0)
+
+def test_matches_per_frame_analyzer_without_timestamps():
+    assert_same_analysis(synthetic_session_landmarks(n_serves=2, seed=5), None)
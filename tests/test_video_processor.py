@@ -0,0 +1,40 @@
+# tests/test_video_processor.py
+import pytest
+
+from vision.video_processor import VideoProcessor
+
+@pytest.fixture
+def corrupt_video(tmp_path):
+    path = tmp_path / 'corrupt.mp4'
+    path.write_bytes(b'this is not a video' * 100)
+    return str(path)
+
+def run_processor(processor):
+    events = []
+    processor.processing_failed.connect(lambda message: events.append(('failed', message)))
+    processor.processing_finished.connect(lambda: events.append(('finished', None)))
+    processor.pose_data_extracted.connect(lambda pose_frame: events.append(('pose', pose_frame)))
+    # Synchronously on this thread: an exception would propagate here instead of aborting the app
+    processor.run()
+    return events
+
+@pytest.mark.parametrize('backend', ['opencv', 'auto'])
+@pytest.mark.parametrize('multi_athlete', [False, True])
+def test_corrupt_video_finishes_with_an_error(corrupt_video, backend, multi_athlete):
+    processor = VideoProcessor(corrupt_video, decode_backend=backend, replay_budget_mb=0,
+                               multi_athlete=multi_athlete)
+    events = run_processor(processor)
+    assert [kind for kind, _ in events] == ['failed', 'finished']
+    assert corrupt_video in events[0][1]
+
+def test_corrupt_video_finishes_with_an_error_in_worker_processes(corrupt_video):
+    processor = VideoProcessor(corrupt_video, workers=2)
+    events = run_processor(processor)
+    assert [kind for kind, _ in events] == ['failed', 'finished']
+
+def test_command_line_tools_report_unreadable_videos(corrupt_video):
+    from backend import segmenter
+    from vision import chunked
+
+    assert segmenter.main([corrupt_video]) == 1
+    assert chunked.main([corrupt_video, '--workers', '1']) == 1
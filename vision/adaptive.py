@@ -0,0 +1,137 @@
+# vision/adaptive.py
+import cv2
+
+from backend.serve_analysis import ServePhase
+
+# Phases where nothing interesting happens and inference can be sparse
+IDLE_PHASES = (ServePhase.STANCE, ServePhase.FOLLOW_THROUGH)
+
+class AdaptiveSampler:
+    """
+    Decides how much pose inference each frame gets.
+
+    While the analysis is idle (STANCE, FOLLOW_THROUGH) only every idle_stride-th
+    frame is inferred, on a copy downscaled by idle_scale. Once the serve starts
+    (ARM_COCKING onwards) every frame is inferred on a crop around the athlete's
+    bounding box. Landmarks from a crop are mapped back to full-frame
+    coordinates, so the rest of the app never sees the difference.
+
+    MediaPipe tracks landmarks in the coordinates of its input, so the crop only
+    moves when the athlete leaves it, and every change of crop or scale is
+    reported to the caller, which must reset the Pose tracker.
+    """
+
+    def __init__(self, idle_stride=3, idle_scale=0.5, roi_margin=0.3, roi_headroom=0.6):
+        self.idle_stride = max(int(idle_stride), 1)
+        self.idle_scale = idle_scale
+        self.roi_margin = roi_margin      # padding on every side, as a fraction of the box size
+        self.roi_headroom = roi_headroom  # extra padding above, for the arm going overhead
+        self.phase = ServePhase.STANCE
+        self.bbox = None                  # normalized (x0, y0, x1, y1) of the last detected pose
+        self.crop = None                  # pixel (x0, y0, x1, y1) of the crop in use while active
+        self.geometry = None              # (roi, input shape) of the last inferred frame
+
+        self.frames_seen = 0
+        self.frames_inferred = 0
+        self.inference_seconds = 0.0
+        self.tracker_resets = 0
+
+    def set_phase(self, phase):
+        """Called (from any thread) when the analysis engine changes phase"""
+        self.phase = phase
+
+    @property
+    def active(self):
+        return self.phase not in IDLE_PHASES
+
+    def prepare(self, frame_index, bgr_frame):
+        """
+        Return (rgb_input, roi, reset) for a frame that should be inferred, or None to skip it.
+        roi is the normalized (x0, y0, x1, y1) region of the frame the input covers;
+        reset is True when the crop or scale differs from the last inferred frame.
+        """
+        self.frames_seen += 1
+        h, w = bgr_frame.shape[:2]
+
+        if not self.active:
+            if frame_index % self.idle_stride:
+                return None
+            size = (max(int(w * self.idle_scale), 1), max(int(h * self.idle_scale), 1))
+            image = cv2.resize(bgr_frame, size, interpolation=cv2.INTER_AREA)
+            roi = (0.0, 0.0, 1.0, 1.0)
+            self.crop = None
+        else:
+            if self.crop is None or not self._inside_crop(w, h):
+                self.crop = self._crop_pixels(w, h)
+            x0, y0, x1, y1 = self.crop
+            image = bgr_frame[y0:y1, x0:x1]
+            roi = (x0 / w, y0 / h, x1 / w, y1 / h)
+
+        geometry = (roi, image.shape[:2])
+        reset = self.geometry is not None and geometry != self.geometry
+        self.geometry = geometry
+        self.tracker_resets += reset
+        self.frames_inferred += 1
+        # cvtColor also makes the (possibly strided) crop contiguous for MediaPipe
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB), roi, reset
+
+    def _inside_crop(self, w, h):
+        """Whether the athlete's box still fits in the current crop (a lost athlete never does)"""
+        if self.bbox is None:
+            return self.crop == (0, 0, w, h)
+        x0, y0, x1, y1 = self.crop
+        bx0, by0, bx1, by1 = self.bbox
+        return x0 <= bx0 * w and y0 <= by0 * h and bx1 * w <= x1 and by1 * h <= y1
+
+    def _crop_pixels(self, w, h):
+        if self.bbox is None:
+            return 0, 0, w, h
+        bx0, by0, bx1, by1 = self.bbox
+        bw, bh = bx1 - bx0, by1 - by0
+        x0 = max(bx0 - self.roi_margin * bw, 0.0)
+        x1 = min(bx1 + self.roi_margin * bw, 1.0)
+        y0 = max(by0 - (self.roi_margin + self.roi_headroom) * bh, 0.0)
+        y1 = min(by1 + self.roi_margin * bh, 1.0)
+        px0, py0 = int(x0 * w), int(y0 * h)
+        px1, py1 = max(int(x1 * w), px0 + 1), max(int(y1 * h), py0 + 1)
+        return px0, py0, px1, py1
+
+    def to_frame_coords(self, landmarks, roi):
+        """Map landmarks normalized to the roi back to full-frame coordinates, in place"""
+        x0, y0, x1, y1 = roi
+        if (x0, y0, x1, y1) == (0.0, 0.0, 1.0, 1.0):
+            return landmarks
+        landmarks[:, 0] = x0 + landmarks[:, 0] * (x1 - x0)
+        landmarks[:, 1] = y0 + landmarks[:, 1] * (y1 - y0)
+        # MediaPipe's z uses roughly the same scale as x
+        landmarks[:, 2] *= (x1 - x0)
+        return landmarks
+
+    def observe(self, landmarks):
+        """Track the athlete's bounding box from full-frame landmarks (None if no pose was found)"""
+        if landmarks is None:
+            # Lost the athlete; search the whole frame again
+            self.bbox = None
+            return
+        visible = landmarks[landmarks[:, 3] > 0.5]
+        if len(visible) == 0:
+            return
+        x0, y0 = visible[:, 0].min(), visible[:, 1].min()
+        x1, y1 = visible[:, 0].max(), visible[:, 1].max()
+        self.bbox = (max(float(x0), 0.0), max(float(y0), 0.0), min(float(x1), 1.0), min(float(y1), 1.0))
+
+    def record_inference(self, seconds):
+        self.inference_seconds += seconds
+
+    def report(self):
+        seen = self.frames_seen
+        inferred = self.frames_inferred
+        return {
+            'frames_seen': seen,
+            'frames_inferred': inferred,
+            'inferred_fraction': inferred / seen if seen else 0.0,
+            # A count of skipped pose.process calls, not a measured wall-clock speedup
+            'pose_call_reduction': seen / inferred if inferred else 0.0,
+            'mean_inference_ms': 1000 * self.inference_seconds / inferred if inferred else 0.0,
+            'tracker_resets': self.tracker_resets,
+        }
@@ -0,0 +1,176 @@
+# vision/chunked.py
+"""
+Parallel pose extraction for a single long video.
+
+The video is split into segments that start on keyframes, so every worker can
+seek straight to its segment. Each segment is decoded and run through a warm
+Pose model in its own process. A segment starts decoding `overlap` frames before
+its first frame, so the tracker has locked on by the time its frames count.
+The per-segment landmarks are stitched back together in frame order.
+
+Usage:
+    python -m vision.chunked <video> [--workers N] [--output result.json]
+"""
+import argparse
+import bisect
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import cv2
+import numpy as np
+
+from vision.landmark_cache import CACHE_DTYPE, to_records
+from vision.pose_runner import init_worker_pose, worker_pose, iter_pose_frames
+
+# Frames decoded before a segment starts, to warm up the pose tracker
+DEFAULT_OVERLAP = 15
+
+# More segments than workers evens out the load; too short and the overlap dominates
+SEGMENTS_PER_WORKER = 2
+MIN_SEGMENT_FRAMES = 300
+
+def probe_frame_count(video_path):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    finally:
+        cap.release()
+
+def probe_keyframes(video_path):
+    """Frame indices of the video's keyframes from ffprobe, or None if it is unavailable"""
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None:
+        return None
+    # Frames, unlike packets, come out in presentation order, which is how OpenCV
+    # counts them; packet order differs as soon as the video has B-frames
+    command = [ffprobe, '-v', 'error', '-select_streams', 'v:0', '-show_frames',
+               '-show_entries', 'frame=key_frame', '-of', 'csv=p=0', video_path]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=300, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+    # One line per frame, starting with 1 for keyframes
+    keyframes = [i for i, line in enumerate(output.split()) if line.split(',')[0] == '1']
+    return keyframes or None
+
+def plan_segments(n_frames, n_segments, keyframes=None, overlap=DEFAULT_OVERLAP):
+    """
+    Split [0, n_frames) into up to n_segments (seek, start, end) tuples.
+    Decoding starts at seek, frames before start only warm up the tracker.
+    With keyframes, every seek lands on a keyframe.
+    """
+    seeks = []
+    for i in range(1, n_segments):
+        seek = n_frames * i // n_segments
+        if keyframes:
+            # Nearest keyframe to the even split
+            j = bisect.bisect_left(keyframes, seek)
+            candidates = keyframes[max(j - 1, 0):j + 1]
+            seek = min(candidates, key=lambda k: abs(k - seek))
+        if seek > 0 and seek + overlap < n_frames and (not seeks or seek > seeks[-1]):
+            seeks.append(seek)
+
+    bounds = [0] + [seek + overlap for seek in seeks] + [None]
+    segments = [(0, 0, bounds[1])]
+    for i, seek in enumerate(seeks, 1):
+        segments.append((seek, bounds[i], bounds[i + 1]))
+    return segments
+
+def _extract_segment(video_path, seek, start, end):
+    """Worker: CACHE_DTYPE records for the poses found in frames [start, end)"""
+    pose = worker_pose()
+    # Segments from different parts of the video share this model
+    pose.reset()
+    pose_frames = [pose_frame for pose_frame in iter_pose_frames(video_path, pose, seek, end)
+                   if pose_frame.frame_index >= start]
+    return to_records(pose_frames)
+
+def extract_pose_records(video_path, workers=None, overlap=DEFAULT_OVERLAP, should_stop=None):
+    """
+    Extract the landmarks of a whole video using a pool of worker processes.
+    Returns CACHE_DTYPE records in frame order, or None if should_stop() became true.
+    """
+    workers = workers or os.cpu_count() or 1
+    n_frames = probe_frame_count(video_path)
+    n_segments = min(workers * SEGMENTS_PER_WORKER, max(n_frames // MIN_SEGMENT_FRAMES, 1))
+    keyframes = probe_keyframes(video_path) if n_segments > 1 else None
+    segments = plan_segments(n_frames, n_segments, keyframes, overlap)
+    print(f"Chunked pose extraction: {n_frames} frames in {len(segments)} segments "
+          f"on {min(workers, len(segments))} workers "
+          f"({'keyframe aligned' if keyframes else 'uniform split'})")
+
+    start_time = time.perf_counter()
+    # Spawn keeps MediaPipe's native threads out of forked children
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(segments)),
+                               mp_context=context,
+                               initializer=init_worker_pose)
+    stopped = False
+    try:
+        futures = [pool.submit(_extract_segment, video_path, *segment) for segment in segments]
+        parts = []
+        for i, future in enumerate(futures, 1):
+            while not stopped:
+                if should_stop is not None and should_stop():
+                    stopped = True
+                    break
+                try:
+                    parts.append(future.result(timeout=0.2))
+                    break
+                except TimeoutError:
+                    continue
+            if stopped:
+                for pending in futures:
+                    pending.cancel()
+                return None
+            print(f"  segment {i}/{len(segments)}: {len(parts[-1])} poses")
+    finally:
+        # Don't block a stop on segments that are already running
+        pool.shutdown(wait=not stopped)
+
+    records = np.concatenate(parts) if parts else np.empty(0, dtype=CACHE_DTYPE)
+    elapsed = time.perf_counter() - start_time
+    print(f"Chunked pose extraction done in {elapsed:.1f}s "
+          f"({n_frames / elapsed if elapsed > 0 else 0:.1f} frames/s)")
+    return records
+
+def analyze_video_parallel(video_path, workers=None, overlap=DEFAULT_OVERLAP):
+    """Headless analysis of one video with chunked pose extraction"""
+    from backend.batch import feedback_with_frame_data
+    from backend.vectorized_engine import VectorizedAnalyzer
+
+    records = extract_pose_records(video_path, workers, overlap)
+    analyzer = VectorizedAnalyzer().analyze(records['landmarks'], records['timestamp'], records['frame'])
+    return feedback_with_frame_data(analyzer)
+
+def main(argv=None):
+    from backend.batch import write_json
+
+    parser = argparse.ArgumentParser(description="Analyze one long video using every core")
+    parser.add_argument('video', help="Video file to analyze")
+    parser.add_argument('--workers', '-j', type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP,
+                        help="Tracker warm-up frames decoded before each segment")
+    parser.add_argument('--output', '-o', default=None,
+                        help="Write the feedback JSON here (default: <video>.json)")
+    args = parser.parse_args(argv)
+
+    try:
+        feedback = analyze_video_parallel(args.video, args.workers, args.overlap)
+    except OSError as e:
+        print(f"FAILED {args.video}: {e}")
+        return 1
+    output = args.output or args.video + '.json'
+    write_json(output, feedback)
+    print(f"Wrote {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
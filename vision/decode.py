@@ -0,0 +1,262 @@
+# vision/decode.py
+"""
+Video decode backends that downscale during decode and write into reused buffers.
+
+Pose inference only looks at a ~256 px input and the GUI shows a widget-sized
+image, so decoding 4K phone footage at full resolution mostly produces pixels
+that are thrown away again, plus a fresh 25 MB frame allocation every iteration.
+A decoder here delivers frames of at most max_width pixels across, written
+into a FrameRing of preallocated buffers that are reused round-robin.
+
+Backends:
+  ffmpeg  an ffmpeg subprocess that decodes, scales and converts to BGR in one
+          pass on its own cores, streaming raw frames over a pipe straight into
+          the ring ('auto' uses it for sources wider than max_width when an
+          ffmpeg binary is found; at the output size it is ~3x slower than OpenCV)
+  opencv  cv2.VideoCapture reading into one reused full-size buffer, then
+          resized into the ring (always available; 'auto' for everything else)
+
+Frames stay BGR so drawing, the display buffer and speed mode work unchanged;
+the RGB conversion for MediaPipe then runs on the small frame.
+"""
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+# ffmpeg binary (SPIKESIGHT_FFMPEG overrides the one on PATH)
+FFMPEG = os.getenv('SPIKESIGHT_FFMPEG') or shutil.which('ffmpeg')
+
+DECODE_BACKENDS = ('auto', 'ffmpeg', 'opencv')
+DEFAULT_DECODE_BACKEND = os.getenv('SPIKESIGHT_DECODER', 'auto')
+# Wide enough for a sharp full-window preview; pose inference needs far less
+DEFAULT_DECODE_WIDTH = int(os.getenv('SPIKESIGHT_DECODE_WIDTH', '1280'))
+
+_PTS_TIME = re.compile(rb'pts_time:\s*(-?[0-9.]+)')
+
+def probe_width(path):
+    """Frame width of a video file from its header, 0 if it can't be opened"""
+    cap = cv2.VideoCapture(path)
+    try:
+        return max(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 0) if cap.isOpened() else 0
+    finally:
+        cap.release()
+
+def resolve_backend(backend, source_width=None, max_width=None):
+    """
+    The backend open_decoder tries first. 'auto' becomes 'ffmpeg' only when the
+    source is wider than max_width, where scaling while decoding pays off.
+    """
+    if backend == 'auto':
+        downscaled = bool(max_width and source_width and source_width > max_width)
+        return 'ffmpeg' if FFMPEG and downscaled else 'opencv'
+    return backend
+
+def cache_settings(backend, max_width, source_width=None):
+    """
+    The landmark cache's `decode` key for frames from this backend at this width
+    limit (which, with the video, fixes the frame size pose inference sees).
+    'auto' needs the source width to tell which backend it will pick.
+    """
+    return {'decoder': resolve_backend(backend, source_width, max_width), 'max_width': max_width or None}
+
+def ring_slots_for(queue_depths, extra=3):
+    """
+    Ring size for a StagedPipeline: every queued item, one item held by the source
+    and by each stage, plus `extra` (the frame being decoded and one kept back by
+    the render stage), so a buffer is never overwritten while still in use.
+    """
+    return sum(queue_depths) + 1 + len(queue_depths) + extra
+
+def output_size(width, height, max_width=None):
+    """Frame size after limiting the width to max_width, keeping the aspect ratio (even sizes)"""
+    if not max_width or width <= max_width:
+        return width, height
+    scale = max_width / width
+    return max_width - max_width % 2, max(int(round(height * scale / 2)) * 2, 2)
+
+class FrameRing:
+    """Preallocated (slots, h, w, 3) uint8 frames handed out round-robin"""
+
+    def __init__(self, shape, slots):
+        self.frames = np.empty((slots,) + tuple(shape), dtype=np.uint8)
+        self.slots = slots
+        self._next = 0
+
+    def next(self):
+        frame = self.frames[self._next]
+        self._next = (self._next + 1) % self.slots
+        return frame
+
+class OpenCVDecoder:
+    """cv2.VideoCapture with a reused decode buffer, downscaled into the ring"""
+    name = 'opencv'
+
+    def __init__(self, path, max_width=None, ring_slots=None):
+        self.cap = cv2.VideoCapture(path)
+        self.source_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                            int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        if not self.cap.isOpened() or min(self.source_size) <= 0:
+            self.cap.release()
+            raise OSError(f"Could not read {path}")
+        self.size = output_size(*self.source_size, max_width)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.ring = FrameRing((self.size[1], self.size[0], 3), ring_slots) if ring_slots else None
+        self._scaled = self.size != self.source_size
+        self._decoded = None
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        """Return (timestamp, frame) for the next frame, or None at the end"""
+        ring = self.ring
+        if ring is None:
+            # No ring (the caller keeps frames): a new array per frame
+            ret, frame = self.cap.read()
+            if ret and self._scaled:
+                frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+        elif self._scaled:
+            ret, self._decoded = self.cap.read(self._decoded)
+            if ret:
+                # INTER_AREA looks slightly smoother but costs 4x as much on 4K input
+                frame = cv2.resize(self._decoded, self.size, dst=ring.next(), interpolation=cv2.INTER_LINEAR)
+        else:
+            # Decode straight into the ring slot
+            ret, frame = self.cap.read(ring.next())
+        if not ret:
+            return None
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0, frame
+
+    def close(self):
+        self.cap.release()
+
+class FFmpegDecoder:
+    """
+    ffmpeg subprocess decoding, scaling and converting to BGR, read from a pipe into
+    the ring. Presentation timestamps come from the showinfo filter on stderr.
+    """
+    name = 'ffmpeg'
+
+    def __init__(self, path, max_width=None, ring_slots=None, ffmpeg=None):
+        ffmpeg = ffmpeg or FFMPEG
+        if not ffmpeg:
+            raise FileNotFoundError("No ffmpeg binary found (install ffmpeg or set SPIKESIGHT_FFMPEG)")
+
+        # OpenCV applies the same rotation metadata as ffmpeg, so its first frame has the displayed size
+        cap = cv2.VideoCapture(path)
+        try:
+            ret, first = cap.read()
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        finally:
+            cap.release()
+        if not ret:
+            raise OSError(f"Could not read {path}")
+        height, width = first.shape[:2]
+        self.source_size = (width, height)
+        self.size = output_size(width, height, max_width)
+        self.ring = FrameRing((self.size[1], self.size[0], 3), ring_slots) if ring_slots else None
+        self._frame_bytes = self.size[0] * self.size[1] * 3
+
+        filters = []
+        if self.size != self.source_size:
+            filters.append(f"scale={self.size[0]}:{self.size[1]}:flags=area")
+        # Prints each frame's pts_time; the checksum it computes by default isn't needed
+        filters.append('showinfo=checksum=0')
+        command = [ffmpeg, '-nostdin', '-hide_banner', '-nostats', '-loglevel', 'info',
+                   '-i', path, '-map', '0:v:0', '-vf', ','.join(filters), '-vsync', 'passthrough',
+                   '-pix_fmt', 'bgr24', '-f', 'rawvideo', 'pipe:1']
+        # Unbuffered, so frames are read straight into the ring without an extra copy
+        self.proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+
+        self._timestamps = deque()
+        self._timestamps_ready = threading.Condition()
+        self._stderr_done = False
+        self._errors = deque(maxlen=20)
+        self._first_pts = None
+        self._stderr_thread = threading.Thread(target=self._read_stderr, name='ffmpeg-stderr', daemon=True)
+        self._stderr_thread.start()
+        self.frame_index = 0
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            match = _PTS_TIME.search(line)
+            if match is None:
+                self._errors.append(line.decode(errors='replace').rstrip())
+                continue
+            with self._timestamps_ready:
+                self._timestamps.append(float(match.group(1)))
+                self._timestamps_ready.notify()
+        with self._timestamps_ready:
+            self._stderr_done = True
+            self._timestamps_ready.notify()
+
+    def _next_timestamp(self):
+        with self._timestamps_ready:
+            self._timestamps_ready.wait_for(lambda: self._timestamps or self._stderr_done, timeout=1.0)
+            pts = self._timestamps.popleft() if self._timestamps else None
+        if pts is None:
+            return self.frame_index / self.fps
+        if self._first_pts is None:
+            self._first_pts = pts
+        # Start at 0 like OpenCV's CAP_PROP_POS_MSEC
+        return pts - self._first_pts
+
+    def is_opened(self):
+        # The end of the stream shows up as read() returning None
+        return not self.proc.stdout.closed
+
+    def read(self):
+        """Return (timestamp, frame) for the next frame, or None at the end"""
+        frame = self.ring.next() if self.ring is not None else np.empty((self.size[1], self.size[0], 3), np.uint8)
+        view = memoryview(frame.reshape(-1))
+        filled = 0
+        while filled < self._frame_bytes:
+            n = self.proc.stdout.readinto(view[filled:])
+            if not n:
+                if filled:
+                    print(f"ffmpeg: truncated last frame ({filled}/{self._frame_bytes} bytes)")
+                self._report_errors()
+                return None
+            filled += n
+        timestamp = self._next_timestamp()
+        self.frame_index += 1
+        return timestamp, frame
+
+    def _report_errors(self):
+        self.proc.wait()
+        if self.proc.returncode and self._errors:
+            print("ffmpeg failed:\n" + "\n".join(self._errors))
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+        self._stderr_thread.join(timeout=1.0)
+        self.proc.stderr.close()
+
+def open_decoder(path, backend=DEFAULT_DECODE_BACKEND, max_width=DEFAULT_DECODE_WIDTH, ring_slots=None):
+    """
+    Open a decoder for a video file. 'auto' uses ffmpeg for sources wider than
+    max_width when it is installed and OpenCV otherwise (or if ffmpeg fails);
+    ring_slots=None allocates a new array for every frame, for callers that
+    keep frames around.
+    """
+    if backend not in DECODE_BACKENDS:
+        raise ValueError(f"Unknown decode backend {backend!r} (choose from {', '.join(DECODE_BACKENDS)})")
+    if backend == 'auto' and resolve_backend(backend, probe_width(path), max_width) == 'opencv':
+        backend = 'opencv'
+    if backend != 'opencv':
+        try:
+            return FFmpegDecoder(path, max_width, ring_slots)
+        except OSError as e:
+            if backend == 'ffmpeg':
+                raise
+            print(f"ffmpeg decode unavailable ({e}); using OpenCV")
+    return OpenCVDecoder(path, max_width, ring_slots)
@@ -0,0 +1,124 @@
+# vision/display.py
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+class DisplayBuffer:
+    """
+    Latest-frame handoff between the video worker and the GUI.
+
+    The worker downscales each frame to the widget size, draws the pose on the
+    small copy and converts it to RGB into one of three reused buffers, and the
+    GUI reads whichever buffer holds the newest frame. Frames that arrive faster
+    than max_fps, or before the GUI picked up the previous one, are dropped
+    instead of queued.
+    """
+
+    def __init__(self, max_fps=30):
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self._lock = threading.Lock()
+        self._target_size = None
+        self._scratch = None
+        self._buffers = [None, None, None]
+        self._captured_at = [None, None, None]  # perf_counter() capture time of each buffer's frame
+        self.latest_captured_at = None          # capture time of the frame last handed to the GUI
+        self._front = None      # index of the newest complete frame
+        self._reading = None    # index the GUI is currently reading
+        self._pending = False   # newest frame not yet picked up by the GUI
+        self._last_submit = 0.0
+        self.seq = 0
+        self.submitted = 0  # frames rendered into a buffer
+        self.shown = 0      # frames the GUI picked up
+        self.dropped = 0    # frames never shown: rate capped, or replaced before the GUI read them
+
+    def set_target_size(self, width, height):
+        """Called from the GUI thread whenever the display widget changes size"""
+        with self._lock:
+            self._target_size = (max(width, 1), max(height, 1))
+
+    def wants_frame(self):
+        """False while we are inside the rate cap, so the worker can skip drawing altogether"""
+        if time.perf_counter() - self._last_submit < self.min_interval:
+            self.dropped += 1
+            return False
+        return True
+
+    @property
+    def pending(self):
+        """True while the newest frame is waiting for the GUI"""
+        return self._pending
+
+    def _fit(self, frame_w, frame_h):
+        target = self._target_size
+        if target is None:
+            return frame_w, frame_h
+        scale = min(target[0] / frame_w, target[1] / frame_h, 1.0)
+        return max(int(frame_w * scale), 1), max(int(frame_h * scale), 1)
+
+    def submit(self, bgr_frame, annotate=None, captured_at=None, skipped=False):
+        """
+        Downscale a BGR frame, let `annotate` draw on the small BGR copy, then
+        convert it to RGB in the next free buffer. Returns True when the GUI
+        should be told about it (i.e. it was idle), False if a notification is
+        already outstanding. captured_at (a perf_counter() time) is passed on
+        to the GUI as latest_captured_at, for latency measurements. skipped marks a
+        frame wants_frame() turned away earlier (e.g. the last one of a video), so
+        it stops counting as dropped.
+        """
+        self._last_submit = time.perf_counter()
+        h, w = bgr_frame.shape[:2]
+        out_w, out_h = self._fit(w, h)
+
+        with self._lock:
+            index = next(i for i in range(3) if i != self._front and i != self._reading)
+
+        buffer = self._buffers[index]
+        if buffer is None or buffer.shape[:2] != (out_h, out_w):
+            buffer = self._buffers[index] = np.empty((out_h, out_w, 3), dtype=np.uint8)
+
+        # Annotate at display resolution so the full-size frame is never copied
+        if self._scratch is None or self._scratch.shape[:2] != (out_h, out_w):
+            self._scratch = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        if (out_w, out_h) != (w, h):
+            cv2.resize(bgr_frame, (out_w, out_h), dst=self._scratch, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(self._scratch, bgr_frame)
+        if annotate is not None:
+            annotate(self._scratch)
+        cv2.cvtColor(self._scratch, cv2.COLOR_BGR2RGB, dst=buffer)
+
+        with self._lock:
+            self._captured_at[index] = captured_at
+            self._front = index
+            self.seq += 1
+            self.submitted += 1
+            if skipped:
+                self.dropped -= 1
+            notify = not self._pending
+            if not notify:
+                # The previous frame is replaced before the GUI saw it
+                self.dropped += 1
+            self._pending = True
+        return notify
+
+    @contextmanager
+    def latest(self):
+        """
+        Yield the newest RGB frame (or None). The buffer is reserved for the GUI
+        until the block exits, so wrap it and copy it into a pixmap inside the block.
+        """
+        with self._lock:
+            index = self._front
+            self._reading = index
+            if self._pending:
+                self.shown += 1
+            self._pending = False
+            self.latest_captured_at = self._captured_at[index] if index is not None else None
+        try:
+            yield self._buffers[index] if index is not None else None
+        finally:
+            with self._lock:
+                self._reading = None
@@ -0,0 +1,47 @@
+# vision/drawing.py
+import cv2
+
+# Same skeleton as mp.solutions.pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
+
+# Landmarks below this visibility are not drawn, as in MediaPipe's drawing utils
+VISIBILITY_THRESHOLD = 0.5
+
+CONNECTION_COLOR = (224, 224, 224)
+LANDMARK_COLOR = (0, 0, 255)
+BORDER_COLOR = (224, 224, 224)
+
+def draw_pose(image, landmarks, thickness=2, radius=2):
+    """Draw a (33, 4) normalized landmark array onto a BGR image in MediaPipe's style"""
+    h, w = image.shape[:2]
+    points = {}
+    for i, (x, y, _, visibility) in enumerate(landmarks.tolist()):
+        if visibility < VISIBILITY_THRESHOLD:
+            continue
+        if 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0:
+            points[i] = (min(int(x * w), w - 1), min(int(y * h), h - 1))
+
+    for start, end in POSE_CONNECTIONS:
+        if start in points and end in points:
+            cv2.line(image, points[start], points[end], CONNECTION_COLOR, thickness)
+
+    for point in points.values():
+        cv2.circle(image, point, radius + 1, BORDER_COLOR, thickness)
+        cv2.circle(image, point, radius, LANDMARK_COLOR, thickness)
+
+def draw_label(image, text, landmarks, color=(255, 200, 74)):
+    """Write a label (e.g. a track ID) just above the highest visible landmark"""
+    visible = landmarks[landmarks[:, 3] >= VISIBILITY_THRESHOLD]
+    if len(visible) == 0:
+        return
+    h, w = image.shape[:2]
+    top = visible[visible[:, 1].argmin()]
+    x = min(max(int(top[0] * w), 0), w - 1)
+    y = min(max(int(top[1] * h) - 10, 15), h - 1)
+    cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA)
@@ -0,0 +1,152 @@
+# vision/landmark_cache.py
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from backend.landmarks import NUM_LANDMARKS, LANDMARK_VALUES, PoseFrame
+
+# Bump when the stored layout or the landmark extraction changes
+CACHE_VERSION = 3
+
+# One record per frame with a detected pose
+CACHE_DTYPE = np.dtype([
+    ('frame', '<i4'),
+    ('timestamp', '<f8'),
+    ('landmarks', '<f4', (NUM_LANDMARKS, LANDMARK_VALUES)),
+])
+
+# How iter_pose_frames decodes (batch analysis, chunked extraction): full-resolution
+# OpenCV frames. Decoders that downscale produce different landmarks and use their
+# own entries (see vision.decode.cache_settings).
+FULL_RESOLUTION_DECODE = {'decoder': 'opencv', 'max_width': None}
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'spikesight', 'landmarks')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Content sampling for the video fingerprint
+SAMPLE_COUNT = 16
+SAMPLE_SIZE = 64 * 1024
+
+def fingerprint_video(video_path):
+    """Fast content hash: size, mtime and evenly spaced chunks of the file"""
+    stat = os.stat(video_path)
+    digest = hashlib.sha256()
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    with open(video_path, 'rb') as f:
+        if stat.st_size <= SAMPLE_COUNT * SAMPLE_SIZE:
+            digest.update(f.read())
+        else:
+            step = (stat.st_size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+            for i in range(SAMPLE_COUNT):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_SIZE))
+
+    return digest.hexdigest()
+
+class LandmarkCache:
+    """
+    On-disk cache of per-frame pose landmarks, keyed by video content, pose settings
+    and how the frames were decoded (the `decode` argument, FULL_RESOLUTION_DECODE
+    by default).
+
+    Each entry is a single .npy file of CACHE_DTYPE records that is memory-mapped on
+    load. The directory is kept under max_bytes by evicting least recently used entries.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, pose_settings=None):
+        if pose_settings is None:
+            from vision.pose_runner import POSE_CACHE_SETTINGS
+            pose_settings = POSE_CACHE_SETTINGS
+
+        self.cache_dir = cache_dir or os.getenv('SPIKESIGHT_CACHE_DIR') or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.settings_key = json.dumps(pose_settings, sort_keys=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, video_path, decode=None):
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_VERSION}".encode())
+        digest.update(self.settings_key.encode())
+        digest.update(json.dumps(decode or FULL_RESOLUTION_DECODE, sort_keys=True).encode())
+        digest.update(fingerprint_video(video_path).encode())
+        return digest.hexdigest()[:32]
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def load(self, video_path, decode=None):
+        """Return the cached records for a video (memory-mapped), or None on a miss"""
+        path = self._entry_path(self.key_for(video_path, decode))
+        try:
+            records = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        if records.dtype != CACHE_DTYPE:
+            return None
+
+        # Touch the entry so LRU eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return records
+
+    def store(self, video_path, pose_frames, decode=None):
+        """Save the PoseFrames of a fully processed video and trim the cache to size"""
+        return self.store_records(video_path, to_records(pose_frames), decode)
+
+    def store_records(self, video_path, records, decode=None):
+        """Save CACHE_DTYPE records of a fully processed video and trim the cache to size"""
+        path = self._entry_path(self.key_for(video_path, decode))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp_path, path)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+def to_records(pose_frames):
+    """Pack PoseFrames into a CACHE_DTYPE record array"""
+    records = np.empty(len(pose_frames), dtype=CACHE_DTYPE)
+    if pose_frames:
+        records['frame'] = [pose_frame.frame_index for pose_frame in pose_frames]
+        records['timestamp'] = [pose_frame.timestamp for pose_frame in pose_frames]
+        records['landmarks'] = [pose_frame.landmarks for pose_frame in pose_frames]
+    return records
+
+def iter_cached_frames(records):
+    """PoseFrames backed by (memory-mapped) cache records, without copying the landmarks"""
+    landmarks = records['landmarks']
+    for i in range(len(records)):
+        yield PoseFrame(landmarks[i], int(records['frame'][i]), float(records['timestamp'][i]))
@@ -0,0 +1,119 @@
+# vision/live.py
+import os
+import threading
+import time
+
+import cv2
+
+def parse_source(source):
+    """A camera index ('0', 0), a stream URL or a video file path"""
+    if isinstance(source, int):
+        return source
+    source = source.strip()
+    return int(source) if source.isdigit() else source
+
+def is_file_source(source):
+    return isinstance(source, str) and os.path.isfile(source)
+
+class LatestFrameGrabber:
+    """
+    Reads a camera, stream or file on its own thread and keeps only the newest frame.
+
+    A consumer that falls behind gets the most recent frame and every frame it
+    missed is dropped (counted in `dropped`), so latency never builds up in a
+    queue. Each frame carries the perf_counter() time it was captured. Video files
+    are played back at their own frame rate when realtime is set, standing in for
+    a camera.
+    """
+
+    def __init__(self, source, realtime=None):
+        self.source = parse_source(source)
+        self.realtime = is_file_source(self.source) if realtime is None else realtime
+        self.cap = cv2.VideoCapture(self.source)
+        if isinstance(self.source, int):
+            # Don't let the driver queue up stale frames
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._condition = threading.Condition()
+        self._latest = None      # (frame_index, captured_at, frame)
+        self._ended = False
+        self._stopped = False
+        self._thread = None
+
+        self.started_at = None
+        self.grabbed = 0
+        self.taken = 0
+        self.dropped = 0
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_index = 0
+        try:
+            while not self._stopped:
+                if self.realtime:
+                    # Wait for this frame's presentation time, like a camera would
+                    delay = self.started_at + frame_index / fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                captured_at = time.perf_counter()
+                with self._condition:
+                    if self._latest is not None:
+                        self.dropped += 1
+                    self._latest = (frame_index, captured_at, frame)
+                    self.grabbed += 1
+                    self._condition.notify()
+                frame_index += 1
+        finally:
+            self.cap.release()
+            with self._condition:
+                self._ended = True
+                self._condition.notify_all()
+
+    @property
+    def ended(self):
+        return self._ended and self._latest is None
+
+    def get(self, timeout=None):
+        """
+        Wait for a frame newer than the last one taken and return
+        (frame_index, captured_at, frame), or None once the source has ended
+        or the timeout expired (check `ended` to tell them apart).
+        """
+        with self._condition:
+            while self._latest is None and not self._ended:
+                if not self._condition.wait(timeout):
+                    return None
+            item = self._latest
+            self._latest = None
+            if item is not None:
+                self.taken += 1
+            return item
+
+    def stop(self):
+        self._stopped = True
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            'frames_grabbed': self.grabbed,
+            'frames_processed': self.taken,
+            'frames_dropped': self.dropped,
+            'capture_fps': self.grabbed / elapsed if elapsed > 0 else 0.0,
+            'processed_fps': self.taken / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,202 @@
+# vision/multi_athlete.py
+"""
+Pose tracking for several athletes in one shot.
+
+A HOG person detector finds people every few frames, an IoU tracker keeps their
+IDs stable from frame to frame, and each track gets its own MediaPipe Pose
+(MediaPipe follows one person per instance) run on a crop around the athlete.
+Each frame is decoded and color-converted once and all crops are inferred in
+parallel on a thread pool, so adding an athlete costs one crop inference rather
+than another pass over the frame.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from backend.landmarks import PoseFrame, landmarks_to_array
+from backend.instrumentation import profiler
+from vision.pose_runner import create_pose
+
+class PersonDetector:
+    """OpenCV's HOG pedestrian detector on a downscaled frame; returns normalized boxes"""
+
+    def __init__(self, detect_width=480, min_score=0.3, nms_threshold=0.4):
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.detect_width = detect_width
+        self.min_score = min_score
+        self.nms_threshold = nms_threshold
+
+    def detect(self, bgr_frame):
+        h, w = bgr_frame.shape[:2]
+        scale = min(self.detect_width / w, 1.0)
+        image = bgr_frame if scale == 1.0 else cv2.resize(bgr_frame, (int(w * scale), int(h * scale)),
+                                                          interpolation=cv2.INTER_AREA)
+        rects, weights = self.hog.detectMultiScale(image, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) == 0:
+            return []
+        scores = np.asarray(weights, dtype=np.float32).ravel()
+        keep = cv2.dnn.NMSBoxes([list(map(int, r)) for r in rects], scores.tolist(),
+                                self.min_score, self.nms_threshold)
+        ih, iw = image.shape[:2]
+        boxes = []
+        for i in np.asarray(keep).ravel():
+            x, y, bw, bh = rects[i]
+            boxes.append((x / iw, y / ih, (x + bw) / iw, (y + bh) / ih))
+        return boxes
+
+def iou(a, b):
+    """Intersection over union of two (x0, y0, x1, y1) boxes"""
+    ix = max(min(a[2], b[2]) - max(a[0], b[0]), 0.0)
+    iy = max(min(a[3], b[3]) - max(a[1], b[1]), 0.0)
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+class AthleteTrack:
+    """One tracked person: a normalized box, its own Pose model and a miss counter"""
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.missed = 0
+        self.pose = None  # created on the track's first inference
+
+    def close(self):
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+
+class IoUTracker:
+    """
+    Greedy IoU matching of detections to tracks. Unmatched detections start new
+    tracks (up to max_tracks); a track that is neither detected nor has a pose
+    for more than max_missed frames is dropped.
+    """
+
+    def __init__(self, iou_threshold=0.2, max_missed=15, max_tracks=4):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.max_tracks = max_tracks
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, detections):
+        pairs = sorted(((iou(track.box, box), t, d) for t, track in enumerate(self.tracks)
+                        for d, box in enumerate(detections)), reverse=True)
+        matched_tracks, matched_detections = set(), set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_detections:
+                continue
+            self.tracks[t].box = detections[d]
+            self.tracks[t].missed = 0
+            matched_tracks.add(t)
+            matched_detections.add(d)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+        for d, box in enumerate(detections):
+            if d not in matched_detections and len(self.tracks) < self.max_tracks:
+                self.tracks.append(AthleteTrack(self._next_id, box))
+                self._next_id += 1
+        self.prune()
+
+    def prune(self):
+        for track in self.tracks:
+            if track.missed > self.max_missed:
+                track.close()
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+    def close(self):
+        for track in self.tracks:
+            track.close()
+        self.tracks = []
+
+class MultiPoseRunner:
+    """
+    Per-frame multi-athlete pose inference: process() returns {track_id: PoseFrame}
+    with landmarks in full-frame coordinates, like the single-athlete path.
+    """
+
+    def __init__(self, max_athletes=4, detect_every=10, threads=None, roi_margin=0.15, roi_headroom=0.4):
+        self.detector = PersonDetector()
+        self.tracker = IoUTracker(max_tracks=max_athletes)
+        self.detect_every = max(int(detect_every), 1)
+        self.roi_margin = roi_margin      # padding on every side, as a fraction of the box size
+        self.roi_headroom = roi_headroom  # extra padding above, for the arm going overhead
+        self.executor = ThreadPoolExecutor(max_workers=threads or max_athletes,
+                                           thread_name_prefix='athlete-pose')
+
+    def process(self, frame_index, timestamp, bgr_frame):
+        tracker = self.tracker
+        if frame_index % self.detect_every == 0:
+            with profiler.timed('detect'):
+                tracker.update(self.detector.detect(bgr_frame))
+        if not tracker.tracks:
+            return {}
+
+        # One color conversion for all crops
+        with profiler.timed('color'):
+            rgb_frame = cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB)
+        h, w = rgb_frame.shape[:2]
+        futures = [(track, self.executor.submit(self._infer_track, track, rgb_frame, w, h))
+                   for track in tracker.tracks]
+
+        pose_frames = {}
+        for track, future in futures:
+            landmarks = future.result()
+            if landmarks is None:
+                track.missed += 1
+                continue
+            track.missed = 0
+            self._follow(track, landmarks)
+            pose_frames[track.id] = PoseFrame(landmarks, frame_index, timestamp)
+        tracker.prune()
+        return pose_frames
+
+    def _infer_track(self, track, rgb_frame, w, h):
+        """Pose on the crop around one track (runs on the thread pool); landmarks in frame coords"""
+        if track.pose is None:
+            track.pose = create_pose()
+        x0, y0, x1, y1 = self._crop_pixels(track.box, w, h)
+        # MediaPipe needs a contiguous image
+        crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+
+        with profiler.timed('pose'):
+            results = track.pose.process(crop)
+        if not results.pose_landmarks:
+            return None
+        landmarks = landmarks_to_array(results.pose_landmarks)
+        cw, ch = (x1 - x0) / w, (y1 - y0) / h
+        landmarks[:, 0] = x0 / w + landmarks[:, 0] * cw
+        landmarks[:, 1] = y0 / h + landmarks[:, 1] * ch
+        # MediaPipe's z uses roughly the same scale as x
+        landmarks[:, 2] *= cw
+        return landmarks
+
+    def _crop_pixels(self, box, w, h):
+        bx0, by0, bx1, by1 = box
+        bw, bh = bx1 - bx0, by1 - by0
+        x0 = max(bx0 - self.roi_margin * bw, 0.0)
+        x1 = min(bx1 + self.roi_margin * bw, 1.0)
+        y0 = max(by0 - (self.roi_margin + self.roi_headroom) * bh, 0.0)
+        y1 = min(by1 + self.roi_margin * bh, 1.0)
+        px0, py0 = int(x0 * w), int(y0 * h)
+        return px0, py0, max(int(x1 * w), px0 + 1), max(int(y1 * h), py0 + 1)
+
+    def _follow(self, track, landmarks):
+        """Move the track's box onto the athlete's landmarks, so crops follow them between detections"""
+        visible = landmarks[landmarks[:, 3] > 0.5]
+        if len(visible) == 0:
+            return
+        x0, y0 = visible[:, 0].min(), visible[:, 1].min()
+        x1, y1 = visible[:, 0].max(), visible[:, 1].max()
+        track.box = (max(float(x0), 0.0), max(float(y0), 0.0), min(float(x1), 1.0), min(float(y1), 1.0))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.tracker.close()
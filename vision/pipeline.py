@@ -0,0 +1,204 @@
+# vision/pipeline.py
+import queue
+import threading
+import time
+
+# Marks the end of the stream as it travels down the queues
+_END = object()
+
+class StageStats:
+    """Timing counters for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0      # time spent doing work
+        self.starved = 0.0   # time spent waiting for input
+        self.blocked = 0.0   # time spent waiting for room downstream (backpressure)
+
+    def as_dict(self, wall):
+        return {
+            'name': self.name,
+            'items': self.items,
+            'busy_s': self.busy,
+            'starved_s': self.starved,
+            'blocked_s': self.blocked,
+            'utilization': self.busy / wall if wall > 0 else 0.0,
+        }
+
+class BoundedQueue:
+    """queue.Queue that records how full it is every time an item is added"""
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.queue = queue.Queue(maxsize=depth)
+        self.fill_samples = 0
+        self.fill_total = 0
+
+    def put(self, item, stop_event, timeout=0.05):
+        while not stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=timeout)
+                self.fill_samples += 1
+                self.fill_total += self.queue.qsize()
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, stop_event, timeout=0.05):
+        while not stop_event.is_set():
+            try:
+                return self.queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+        return _END
+
+    def as_dict(self):
+        mean_fill = self.fill_total / self.fill_samples if self.fill_samples else 0.0
+        return {
+            'name': self.name,
+            'depth': self.depth,
+            'mean_fill': mean_fill,
+            'occupancy': mean_fill / self.depth,
+        }
+
+class StagedPipeline:
+    """
+    Runs a source and a chain of stages concurrently, connected by bounded queues.
+
+    The source iterable is consumed on its own thread, every stage except the last
+    gets its own thread, and the last stage runs on the thread that calls run().
+    A stage returns the item to pass downstream, or None to drop it. Full queues
+    block the producer, so a slow stage throttles everything upstream of it.
+    """
+
+    def __init__(self, source, stages, queue_depths=None, source_name='decode'):
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        if queue_depths is None:
+            queue_depths = [4] * len(stages)
+        if len(queue_depths) != len(stages):
+            raise ValueError("Need one queue depth per stage")
+
+        self.source = source
+        self.stages = stages
+        self._stop_event = threading.Event()
+        self._errors = []
+
+        names = [source_name] + [name for name, _ in stages]
+        self.stage_stats = [StageStats(name) for name in names]
+        self.queues = [
+            BoundedQueue(f"{names[i]}->{names[i + 1]}", depth)
+            for i, depth in enumerate(queue_depths)
+        ]
+        self.wall = 0.0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run_source(self):
+        stats = self.stage_stats[0]
+        out_queue = self.queues[0]
+        iterator = iter(self.source)
+        try:
+            while not self._stop_event.is_set():
+                t0 = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                t1 = time.perf_counter()
+                stats.busy += t1 - t0
+                stats.items += 1
+
+                if not out_queue.put(item, self._stop_event):
+                    break
+                stats.blocked += time.perf_counter() - t1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            out_queue.put(_END, self._stop_event)
+
+    def _run_stage(self, index):
+        """Run stage `index` (0-based into self.stages) until the end marker arrives"""
+        name, fn = self.stages[index]
+        stats = self.stage_stats[index + 1]
+        in_queue = self.queues[index]
+        out_queue = self.queues[index + 1] if index + 1 < len(self.queues) else None
+
+        try:
+            while True:
+                t0 = time.perf_counter()
+                item = in_queue.get(self._stop_event)
+                t1 = time.perf_counter()
+                stats.starved += t1 - t0
+                if item is _END:
+                    break
+
+                result = fn(item)
+                t2 = time.perf_counter()
+                stats.busy += t2 - t1
+                stats.items += 1
+
+                if out_queue is not None and result is not None:
+                    if not out_queue.put(result, self._stop_event):
+                        break
+                    stats.blocked += time.perf_counter() - t2
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if out_queue is not None:
+                out_queue.put(_END, self._stop_event)
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop_event.set()
+
+    def run(self):
+        """Run the pipeline to completion (or until stop()) and return the stats"""
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._run_source, name='pipeline-source', daemon=True)]
+        for index in range(len(self.stages) - 1):
+            threads.append(threading.Thread(
+                target=self._run_stage, args=(index,),
+                name=f"pipeline-{self.stages[index][0]}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        # The final stage runs on the caller's thread
+        self._run_stage(len(self.stages) - 1)
+
+        self._stop_event.set()
+        for thread in threads:
+            thread.join()
+        self.wall = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats()
+
+    def stats(self):
+        wall = self.wall
+        stages = [s.as_dict(wall) for s in self.stage_stats]
+        bottleneck = max(stages, key=lambda s: s['utilization'])['name'] if wall > 0 else None
+        delivered = self.stage_stats[-1].items
+        return {
+            'wall_seconds': wall,
+            'fps': delivered / wall if wall > 0 else 0.0,
+            'bottleneck': bottleneck,
+            'stages': stages,
+            'queues': [q.as_dict() for q in self.queues],
+        }
+
+def format_stats(stats):
+    """One-line-per-stage summary of StagedPipeline.stats()"""
+    lines = [f"Pipeline: {stats['fps']:.1f} fps over {stats['wall_seconds']:.1f}s, bottleneck={stats['bottleneck']}"]
+    for stage in stats['stages']:
+        lines.append(f"  {stage['name']:<10} busy {stage['utilization'] * 100:5.1f}%  "
+                     f"starved {stage['starved_s']:.2f}s  blocked {stage['blocked_s']:.2f}s  ({stage['items']} items)")
+    for q in stats['queues']:
+        lines.append(f"  queue {q['name']:<20} mean fill {q['mean_fill']:.1f}/{q['depth']}")
+    return "\n".join(lines)
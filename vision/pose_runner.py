@@ -0,0 +1,117 @@
+# vision/pose_runner.py
+import threading
+from contextlib import contextmanager
+from importlib import metadata
+
+from backend.landmarks import PoseFrame
+
+# mediapipe and cv2 are imported where they are used: importing mediapipe alone
+# takes most of a second, which the GUI does in the background after its window is up
+
+# Pose configuration shared by the GUI processor and the headless tools
+POSE_SETTINGS = {
+    'static_image_mode': False,
+    'model_complexity': 1,
+    'enable_segmentation': False,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+}
+
+# Everything that changes the landmarks a video produces, used to key the landmark cache
+POSE_CACHE_SETTINGS = dict(POSE_SETTINGS, mediapipe_version=metadata.version('mediapipe'))
+
+# Pose model owned by the current worker process (see init_worker_pose)
+_worker_pose = None
+
+# Long-lived model reused by successive videos in the GUI (see shared_pose)
+_shared_pose = None
+_shared_pose_busy = False
+_shared_pose_lock = threading.Lock()
+
+def create_pose():
+    """Build a MediaPipe Pose model with the app's settings"""
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(**POSE_SETTINGS)
+
+def warm_up_pose():
+    """Load the shared pose model ahead of the first video (safe to call from any thread)"""
+    global _shared_pose
+    with _shared_pose_lock:
+        if _shared_pose is None:
+            _shared_pose = create_pose()
+
+@contextmanager
+def shared_pose():
+    """
+    The process-wide pose model, loaded once and reset for each video, so only the
+    first video pays for model loading. If another video still holds it (e.g. one
+    that is being stopped), a private model is built and closed afterwards instead.
+    """
+    global _shared_pose, _shared_pose_busy
+    with _shared_pose_lock:
+        if _shared_pose_busy:
+            pose = None
+        else:
+            if _shared_pose is None:
+                _shared_pose = create_pose()
+            _shared_pose_busy = True
+            pose = _shared_pose
+
+    if pose is None:
+        pose = create_pose()
+        try:
+            yield pose
+        finally:
+            pose.close()
+        return
+
+    try:
+        # Drop the tracking state left over from the previous video
+        pose.reset()
+        yield pose
+    finally:
+        with _shared_pose_lock:
+            _shared_pose_busy = False
+
+def init_worker_pose():
+    """Process pool initializer: load one warm pose model per worker process"""
+    global _worker_pose
+    _worker_pose = create_pose()
+
+def worker_pose():
+    """The pose model loaded by init_worker_pose in this process"""
+    return _worker_pose
+
+def iter_pose_frames(video_path, pose, start=0, end=None):
+    """
+    Decode a video and yield a PoseFrame for every frame where a pose was found.
+    start/end limit decoding to the frame range [start, end). Raises OSError if
+    the video can't be opened or none of its frames decode.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise OSError(f"Could not open video {video_path}")
+        frame_index = 0
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            frame_index = start
+        decoded = False
+        while end is None or frame_index < end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            decoded = True
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            results = pose.process(rgb_frame)
+            if results.pose_landmarks:
+                yield PoseFrame.from_mediapipe(results.pose_landmarks, frame_index, timestamp)
+            frame_index += 1
+        if not decoded and (end is None or start < end):
+            raise OSError(f"No frames could be decoded from {video_path}")
+    finally:
+        cap.release()
@@ -0,0 +1,180 @@
+# vision/replay.py
+import bisect
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Memory for the replay of one video (SPIKESIGHT_REPLAY_MB, 0 turns replay off)
+DEFAULT_REPLAY_BUDGET_MB = float(os.getenv('SPIKESIGHT_REPLAY_MB', '64'))
+
+# Beyond this stride, thinning stops and the oldest frames are dropped instead
+MAX_STRIDE = 1 << 12
+
+class ReplayStore:
+    """
+    Downscaled, JPEG-compressed frames of the processed video with their landmarks,
+    for scrubbing and slow-motion replay after the analysis without decoding the
+    video or running pose detection again.
+
+    Frames are stored clean and the skeleton is drawn when a frame is shown. Once
+    the store goes over its byte budget it thins out older frames: every other
+    frame first, then every fourth, and so on, so the whole video stays reachable
+    at a lower frame rate. Key frames (around the phases of the serve) and the
+    most recent frames are kept at full rate. New frames that the current stride
+    would thin out are not encoded at all, unless they are near a key frame.
+    """
+
+    def __init__(self, budget_bytes, max_width=640, quality=80, recent_frames=30, key_radius=15):
+        self.budget_bytes = budget_bytes
+        self.max_width = max_width
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        self.recent_frames = recent_frames  # newest frames are never thinned (phases are marked after them)
+        self.key_radius = key_radius        # frames kept at full rate on each side of a key frame
+
+        self._lock = threading.Lock()       # written by the video thread, read by the GUI
+        self._frames = {}                   # frame index -> (timestamp, jpeg bytes, landmarks or None)
+        self._order = []                    # stored frame indices, ascending
+        self._key_ranges = []               # inclusive (first, last) frame index ranges
+        self._scratch = None
+        self.nbytes = 0
+        self.stride = 1
+        self.evicted = 0
+        self.skipped = 0                    # frames not stored because thinning would drop them anyway
+
+    def add(self, frame_index, timestamp, bgr_frame, landmarks=None):
+        """Called from the video thread for every processed frame, in frame order"""
+        with self._lock:
+            # A new frame is always the newest, so recent, but while thinning it only stays
+            # past the recent window if it is on the stride or near a key frame
+            skip = (self.stride < MAX_STRIDE and frame_index % self.stride != 0
+                    and not self._is_key(frame_index))
+            self.skipped += skip
+        if skip:
+            return
+        h, w = bgr_frame.shape[:2]
+        if w > self.max_width:
+            size = (self.max_width, max(int(h * self.max_width / w), 1))
+            if self._scratch is None or self._scratch.shape[:2] != (size[1], size[0]):
+                self._scratch = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            image = cv2.resize(bgr_frame, size, dst=self._scratch, interpolation=cv2.INTER_AREA)
+        else:
+            image = bgr_frame
+        ok, encoded = cv2.imencode('.jpg', image, self.encode_params)
+        if not ok:
+            return
+        jpeg = encoded.tobytes()
+        if landmarks is not None:
+            landmarks = landmarks.copy()
+
+        with self._lock:
+            if frame_index in self._frames:
+                return
+            self._frames[frame_index] = (timestamp, jpeg, landmarks)
+            self._order.append(frame_index)
+            self.nbytes += self._size(self._frames[frame_index])
+            if self.nbytes > self.budget_bytes:
+                self._evict()
+
+    @staticmethod
+    def _size(entry):
+        _, jpeg, landmarks = entry
+        return len(jpeg) + (landmarks.nbytes if landmarks is not None else 0)
+
+    def _is_key(self, frame_index):
+        return any(first <= frame_index <= last for first, last in self._key_ranges)
+
+    def _drop(self, frame_index):
+        self.nbytes -= self._size(self._frames.pop(frame_index))
+        self.evicted += 1
+
+    def _evict(self):
+        """Thin out old non-key frames until the store fits its budget (lock held)"""
+        newest = self._order[-1]
+        while self.nbytes > self.budget_bytes and self.stride < MAX_STRIDE:
+            # Frames added since the last thinning first go down to the current stride
+            keep = []
+            for i in self._order:
+                if i % self.stride == 0 or i > newest - self.recent_frames or self._is_key(i):
+                    keep.append(i)
+                else:
+                    self._drop(i)
+            self._order = keep
+            if self.nbytes > self.budget_bytes:
+                self.stride *= 2
+
+        # Still too big (a very long video or a tiny budget): oldest non-key frames, then any
+        for protect_keys in (True, False):
+            if self.nbytes <= self.budget_bytes:
+                break
+            keep = []
+            for i in self._order:
+                if self.nbytes > self.budget_bytes and i != newest and not (protect_keys and self._is_key(i)):
+                    self._drop(i)
+                else:
+                    keep.append(i)
+            self._order = keep
+
+    def mark_key(self, frame_index, radius=None):
+        """Keep the frames around frame_index (stored or still to come) at full rate"""
+        radius = self.key_radius if radius is None else radius
+        with self._lock:
+            self._key_ranges.append((frame_index - radius, frame_index + radius))
+
+    def mark_recent(self):
+        """Mark the newest frames as key frames, e.g. when the analysis changes phase"""
+        with self._lock:
+            if self._order:
+                newest = self._order[-1]
+                self._key_ranges.append((newest - self.recent_frames, newest + self.key_radius))
+
+    def __len__(self):
+        return len(self._order)
+
+    def frame_range(self):
+        """(first, last) stored frame index, or None when empty"""
+        with self._lock:
+            return (self._order[0], self._order[-1]) if self._order else None
+
+    def nearest(self, frame_index):
+        """The stored frame index closest to frame_index"""
+        with self._lock:
+            order = self._order
+            if not order:
+                return None
+            pos = bisect.bisect_left(order, frame_index)
+            candidates = order[max(pos - 1, 0):pos + 1]
+        return min(candidates, key=lambda i: abs(i - frame_index))
+
+    def next_after(self, frame_index):
+        """The first stored frame index after frame_index, or None at the end"""
+        with self._lock:
+            pos = bisect.bisect_right(self._order, frame_index)
+            return self._order[pos] if pos < len(self._order) else None
+
+    def timestamp(self, frame_index):
+        """Timestamp in seconds of a stored frame, or None"""
+        with self._lock:
+            entry = self._frames.get(frame_index)
+        return entry[0] if entry is not None else None
+
+    def get(self, frame_index):
+        """(timestamp, BGR image, landmarks or None) of a stored frame, or None"""
+        with self._lock:
+            entry = self._frames.get(frame_index)
+        if entry is None:
+            return None
+        timestamp, jpeg, landmarks = entry
+        image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return timestamp, image, landmarks
+
+    def stats(self):
+        with self._lock:
+            return {
+                'frames': len(self._order),
+                'megabytes': self.nbytes / (1024 * 1024),
+                'stride': self.stride,
+                'evicted': self.evicted,
+                'skipped': self.skipped,
+            }
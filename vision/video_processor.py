@@ -1,59 +1,498 @@
 # vision/video_processor.py
 from PyQt5.QtCore import QThread, pyqtSignal
+import time
+from concurrent.futures.process import BrokenProcessPool
 import numpy as np
-import mediapipe as mp
 import cv2
 
+from backend.landmarks import PoseFrame, landmarks_to_array
+from backend.instrumentation import profiler, StageTimer
+from vision.pose_runner import shared_pose
+from vision.landmark_cache import iter_cached_frames, FULL_RESOLUTION_DECODE
+from vision.chunked import extract_pose_records
+from vision.pipeline import StagedPipeline, format_stats
+from vision.display import DisplayBuffer
+from vision.drawing import draw_pose, draw_label
+from vision.adaptive import AdaptiveSampler
+from vision.live import LatestFrameGrabber
+from vision.decode import (open_decoder, ring_slots_for, cache_settings, probe_width,
+                           DEFAULT_DECODE_BACKEND, DEFAULT_DECODE_WIDTH)
+from vision.replay import ReplayStore, DEFAULT_REPLAY_BUDGET_MB
+from backend.serve_analysis import ServePhase
+
+# Frames decoded after follow-through before stopping early: the tail of the swing for the replay
+DEFAULT_FOLLOW_THROUGH_TAIL = 15
+
+# render->replay queue size; replay frames are JPEG-encoded on their own stage
+REPLAY_QUEUE_DEPTH = 4
+
 class VideoProcessor(QThread):
     frame_processed = pyqtSignal(np.ndarray)
-    pose_data_extracted = pyqtSignal(object, np.ndarray)
+    display_frame_ready = pyqtSignal()
+    pose_data_extracted = pyqtSignal(object)  # PoseFrame
+    athlete_pose_extracted = pyqtSignal(int, object)  # track ID, PoseFrame (multi-athlete mode)
+    pipeline_stats = pyqtSignal(dict)
     processing_finished = pyqtSignal()
+    processing_failed = pyqtSignal(str)  # the video could not be read; processing_finished follows
 
-    def __init__(self, video_path):
+    def __init__(self, video_path, queue_depths=(4, 4), landmark_cache=None,
+                 display_mode='throttled', max_display_fps=30, attach_images=False,
+                 speed_mode=False, idle_stride=3, idle_scale=0.5, workers=1, live=False,
+                 multi_athlete=False, max_athletes=4,
+                 decode_backend=DEFAULT_DECODE_BACKEND, decode_width=DEFAULT_DECODE_WIDTH,
+                 replay_budget_mb=DEFAULT_REPLAY_BUDGET_MB, stop_after_serve_tail=None):
+        """
+        queue_depths: (decode->inference, inference->render) queue sizes.
+        Larger queues absorb jitter between stages at the cost of memory,
+        since every queued item holds a full-resolution frame. With the replay
+        on, a render->replay queue of REPLAY_QUEUE_DEPTH is added.
+        landmark_cache: optional LandmarkCache; on a hit the cached landmarks
+        are emitted without decoding the video or running pose detection.
+        display_mode: 'throttled' renders into self.display (a DisplayBuffer) at
+        most max_display_fps times a second and signals display_frame_ready;
+        'full' emits every annotated full-resolution frame on frame_processed.
+        attach_images: include the decoded BGR frame in each emitted PoseFrame.
+        Off by default since the analysis only needs the landmarks.
+        speed_mode: infer every idle_stride-th frame at idle_scale resolution while
+        the engine is in STANCE or FOLLOW_THROUGH, and every frame on a crop around
+        the athlete during the serve. Needs set_phase() connected to the engine.
+        workers: with more than one, split the video into segments and extract
+        their landmarks in that many processes (see vision/chunked.py), then emit
+        them in order. Frames are not displayed and speed mode is not used.
+        live: treat video_path as a live source (camera index, stream URL, or a
+        file played back at real-time pace) and always process the newest frame.
+        multi_athlete: detect and track up to max_athletes people and run pose on
+        each of them (see vision/multi_athlete.py). Landmarks are emitted on
+        athlete_pose_extracted with their track ID instead of pose_data_extracted;
+        the landmark cache, workers and speed mode are not used.
+        decode_backend / decode_width: how video files are decoded (see
+        vision/decode.py); frames wider than decode_width are downscaled while
+        decoding, which is what the display and pose inference need anyway.
+        stop_after_serve_tail: stop decoding this many frames after the engine
+        reports follow-through (connect on_phase_event to AnalysisEngine.phase_event),
+        instead of running pose on the dead time to the end of the clip. None
+        processes the whole video.
+        """
         super().__init__()
         self._run_flag = True
         self.video_path = video_path
+        self.queue_depths = queue_depths
+        self.landmark_cache = landmark_cache
+        self.display_mode = display_mode
+        self.display = DisplayBuffer(max_display_fps) if display_mode == 'throttled' else None
+        self.attach_images = attach_images
+        self.workers = workers
+        self.live = live
+        self.multi_athlete = multi_athlete
+        self.max_athletes = max_athletes
+        self.decode_backend = decode_backend
+        self.decode_width = decode_width
+        # Landmark cache entry this run reads and writes: chunked extraction decodes at full resolution
+        self.cache_decode = (FULL_RESOLUTION_DECODE if workers > 1
+                             else cache_settings(decode_backend, decode_width))
+        self.grabber = None
+        self.sampler = (AdaptiveSampler(idle_stride, idle_scale)
+                        if speed_mode and workers <= 1 and not multi_athlete else None)
+        self.replay = (ReplayStore(int(replay_budget_mb * 1024 * 1024))
+                       if replay_budget_mb > 0 and workers <= 1 and not live and not multi_athlete else None)
+        self.pipeline = None
+        self.stop_after_serve_tail = stop_after_serve_tail
+        self.stop_after_frame = None  # set from the GUI thread, read by the decode thread
+        self.stopped_early = False
+
+    def set_phase(self, phase):
+        """Slot for AnalysisEngine.phase_changed; drives the speed mode sampler"""
+        if self.sampler is not None:
+            self.sampler.set_phase(phase)
+        # Keep the serve at full frame rate in the replay
+        if self.replay is not None and phase != ServePhase.STANCE:
+            self.replay.mark_recent()
+
+    def on_phase_event(self, event):
+        """Slot for AnalysisEngine.phase_event; schedules the early stop after follow-through"""
+        if (event['phase'] == 'follow_through' and self.stop_after_serve_tail is not None
+                and event.get('detected_video_frame') is not None):
+            self.stop_after_frame = event['detected_video_frame'] + self.stop_after_serve_tail
 
     def run(self):
-        mp_pose = mp.solutions.pose
-        pose = mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        mp_drawing = mp.solutions.drawing_utils
-        
-        cap = cv2.VideoCapture(self.video_path)
-        
-        while cap.isOpened() and self._run_flag:
-            ret, frame = cap.read()
-            if not ret:
+        try:
+            self.process()
+        except OSError as e:
+            # An unreadable or corrupt video; an exception leaving QThread.run would abort the app
+            self.fail(e)
+
+    def fail(self, error):
+        """Report a video that could not be processed and let the GUI return to idle"""
+        print(f"Could not process {self.video_path}: {error}")
+        self.processing_failed.emit(str(error))
+        self.processing_finished.emit()
+
+    def process(self):
+        if self.multi_athlete:
+            self.run_multi_athlete()
+            return
+
+        if self.landmark_cache is not None and not self.live:
+            if self.workers <= 1 and self.decode_backend == 'auto':
+                # Which backend 'auto' picks depends on the video's width
+                self.cache_decode = cache_settings('auto', self.decode_width, probe_width(self.video_path))
+            records = self.landmark_cache.load(self.video_path, self.cache_decode)
+            if records is not None:
+                self.replay_cached(records)
+                return
+
+        if self.workers > 1 and not self.live:
+            self.run_chunked()
+            return
+
+        # The warm model shared with earlier videos, so only the first one pays for loading it
+        with shared_pose() as pose:
+            if self.live:
+                self.run_live(pose)
+            else:
+                self.run_pipeline(pose)
+
+    def stage_queue_depths(self):
+        """Queue sizes of the file pipeline: the configured ones, plus render->replay"""
+        return list(self.queue_depths) + ([REPLAY_QUEUE_DEPTH] if self.replay is not None else [])
+
+    def open_decoder(self):
+        """
+        Decoder for the video file. Frames go into a ring sized for everything the
+        pipeline can hold, unless they are attached to PoseFrames and must outlive it.
+        """
+        ring_slots = None if self.attach_images else ring_slots_for(self.stage_queue_depths())
+        decoder = open_decoder(self.video_path, self.decode_backend, self.decode_width, ring_slots)
+        # 'auto' may have fallen back to OpenCV; cache the landmarks under the decoder actually used
+        self.cache_decode = cache_settings(decoder.name, self.decode_width)
+        print(f"Decoding with {decoder.name}: {decoder.source_size[0]}x{decoder.source_size[1]} -> "
+              f"{decoder.size[0]}x{decoder.size[1]}")
+        return decoder
+
+    def decode_frames(self, decoder):
+        """Yield (frame_index, timestamp, frame) from a decoder until it ends, stop() or the early stop"""
+        frame_index = 0
+        while decoder.is_opened() and self._run_flag:
+            if self.stop_after_frame is not None and frame_index > self.stop_after_frame:
+                self.stopped_early = True
+                print(f"Serve complete: stopped decoding after frame {frame_index - 1}")
+                break
+            start = profiler.start()
+            item = decoder.read()
+            profiler.stop('decode', start)
+            if item is None:
                 break
-            
-            # MediaPipe Processing Logic 
+            timestamp, frame = item
+            yield frame_index, timestamp, frame
+            frame_index += 1
+
+    def run_pipeline(self, pose):
+        """Decode, inference and rendering of a video file on separate threads"""
+        sampler = self.sampler
+
+        decoder = self.open_decoder()
+
+        # PoseFrames collected for the cache while processing
+        cached_frames = []
+
+        def run_inference(item):
+            frame_index, timestamp, frame = item
+            pose_frame, inferred = self.infer_frame(pose, frame_index, timestamp, frame)
+            return frame_index, timestamp, frame, pose_frame, inferred
+
+        # Last frame that was skipped by the display rate cap, shown once the video ends
+        undisplayed = []
+        # Landmarks of the last inferred frame, drawn over frames speed mode skipped
+        last_landmarks = [None]
+        # When the previous frame was rendered, for the frame interval (fps) histogram
+        last_rendered = [None]
+
+        def render(item):
+            frame_index, timestamp, frame, pose_frame, inferred = item
+            now = time.perf_counter()
+            if last_rendered[0] is not None:
+                profiler.record('frame', now - last_rendered[0])
+            last_rendered[0] = now
+
+            if inferred:
+                last_landmarks[0] = pose_frame.landmarks if pose_frame else None
+            landmarks = last_landmarks[0]
+
+            def annotate(image):
+                if landmarks is not None:
+                    draw_pose(image, landmarks)
+
+            if self.display is not None:
+                undisplayed[:] = [(frame, annotate)]
+                if self.display.wants_frame():
+                    undisplayed.clear()
+                    start = profiler.start()
+                    notify = self.display.submit(frame, annotate)
+                    profiler.stop('draw', start)
+                    if notify:
+                        self.display_frame_ready.emit()
+            else:
+                # Draw the pose annotation on the og BGR frame
+                start = profiler.start()
+                annotated_frame = frame.copy()
+                annotate(annotated_frame)
+                profiler.stop('draw', start)
+                # Emit wtih landmarks drawn on it
+                self.frame_processed.emit(annotated_frame)
+
+            if pose_frame is not None:
+                # Emit a compact landmark record for analysis
+                start = profiler.start()
+                self.pose_data_extracted.emit(pose_frame)
+                profiler.stop('emit', start)
+
+                if self.landmark_cache is not None:
+                    cached_frames.append(pose_frame)
+
+            if self.replay is not None:
+                return frame_index, timestamp, frame, landmarks
+            return None
+
+        def store_replay(item):
+            start = profiler.start()
+            self.replay.add(*item)
+            profiler.stop('replay', start)
+
+        # decode thread -> inference thread -> render/emit -> replay JPEG encoding on this thread
+        stages = [('inference', run_inference), ('render', render)]
+        if self.replay is not None:
+            stages.append(('replay', store_replay))
+        self.pipeline = StagedPipeline(
+            self.decode_frames(decoder),
+            stages,
+            queue_depths=self.stage_queue_depths())
+        if not self._run_flag:
+            self.pipeline.stop()
+
+        try:
+            stats = self.pipeline.run()
+        finally:
+            decoder.close()
+
+        if undisplayed:
+            self.display.submit(*undisplayed[0], skipped=True)
+            self.display_frame_ready.emit()
+
+        print(format_stats(stats))
+        if self.display is not None:
+            waiting = " (1 waiting for the GUI)" if self.display.pending else ""
+            print(f"Display: {self.display.shown} frames shown, {self.display.dropped} dropped{waiting}")
+        if self.replay is not None:
+            stats['replay'] = self.replay.stats()
+            print("Replay: {frames} frames in {megabytes:.1f} MB (stride {stride}, {evicted} evicted, "
+                  "{skipped} skipped)"
+                  .format(**stats['replay']))
+        if sampler is not None:
+            stats['speed_mode'] = sampler.report()
+            print("Speed mode: inferred {frames_inferred}/{frames_seen} frames ({inferred_fraction:.0%}), "
+                  "{pose_call_reduction:.1f}x fewer pose calls, {mean_inference_ms:.1f} ms per call, "
+                  "{tracker_resets} tracker resets"
+                  .format(**stats['speed_mode']))
+        self.pipeline_stats.emit(stats)
+
+        # Only complete, every-frame runs are cached; a stopped or speed mode run has gaps
+        if self.landmark_cache is not None and self._run_flag and not self.stopped_early and sampler is None:
+            self.landmark_cache.store(self.video_path, cached_frames, self.cache_decode)
+
+        self.processing_finished.emit()
+
+    def infer_frame(self, pose, frame_index, timestamp, frame):
+        """
+        Run pose detection on a BGR frame. Returns (pose_frame or None, inferred),
+        where inferred is False when speed mode skipped the frame.
+        """
+        sampler = self.sampler
+
+        # MediaPipe Processing Logic
+        start = profiler.start()
+        if sampler is None:
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(rgb_frame)
-
-            # Draw the pose annotation on the og BGR frame
-            annotated_frame = frame.copy()
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    annotated_frame,
-                    results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS)
-                
-                # Emit raw landmark data for analysis 
-                self.pose_data_extracted.emit(results.pose_landmarks, frame)
-
-            # Emit wtih landmarks drawn on it
-            self.frame_processed.emit(annotated_frame)
-
-        cap.release()
-        pose.close()
+            roi = None
+        else:
+            prepared = sampler.prepare(frame_index, frame)
+            if prepared is None:
+                return None, False
+            rgb_frame, roi, reset = prepared
+            if reset:
+                # Tracking carries landmarks over in input coordinates, which just changed
+                pose.reset()
+        profiler.stop('color', start)
+
+        start = time.perf_counter()
+        results = pose.process(rgb_frame)
+        inference_seconds = time.perf_counter() - start
+        profiler.record('pose', inference_seconds)
+        if sampler is not None:
+            sampler.record_inference(inference_seconds)
+
+        pose_frame = None
+        if results.pose_landmarks:
+            landmarks = landmarks_to_array(results.pose_landmarks)
+            if roi is not None:
+                sampler.to_frame_coords(landmarks, roi)
+            pose_frame = PoseFrame(landmarks, frame_index, timestamp,
+                                   image=frame if self.attach_images else None)
+        if sampler is not None:
+            sampler.observe(pose_frame.landmarks if pose_frame else None)
+        return pose_frame, True
+
+    def run_live(self, pose):
+        """
+        Live mode: always process the newest frame from the camera/stream and
+        drop the rest, so latency stays bounded when inference can't keep up.
+        PoseFrames carry capture timestamps, so the analysis sees real time gaps.
+        """
+        grabber = LatestFrameGrabber(self.video_path)
+        if not grabber.is_opened():
+            print(f"Could not open live source {self.video_path!r}")
+            self.processing_finished.emit()
+            return
+        self.grabber = grabber
+        latency = StageTimer('latency')
+        landmarks = None
+        grabber.start()
+        print(f"Live mode: {self.video_path!r}" + (" (file played back in real time)" if grabber.realtime else ""))
+
+        try:
+            while self._run_flag:
+                item = grabber.get(timeout=0.5)
+                if item is None:
+                    if grabber.ended:
+                        break
+                    continue
+                frame_index, captured_at, frame = item
+                timestamp = captured_at - grabber.started_at
+
+                pose_frame, inferred = self.infer_frame(pose, frame_index, timestamp, frame)
+                if inferred:
+                    # Frames speed mode skipped keep the last skeleton
+                    landmarks = pose_frame.landmarks if pose_frame is not None else None
+
+                def annotate(image, landmarks=landmarks):
+                    if landmarks is not None:
+                        draw_pose(image, landmarks)
+
+                if self.display is not None:
+                    if self.display.wants_frame() and self.display.submit(frame, annotate, captured_at):
+                        self.display_frame_ready.emit()
+                else:
+                    annotated_frame = frame.copy()
+                    annotate(annotated_frame)
+                    self.frame_processed.emit(annotated_frame)
+
+                if pose_frame is not None:
+                    self.pose_data_extracted.emit(pose_frame)
+
+                # Capture to result handed to the GUI and the analysis
+                seconds = time.perf_counter() - captured_at
+                latency.add(seconds)
+                profiler.record('latency', seconds)
+        finally:
+            grabber.stop()
+
+        stats = grabber.report()
+        stats['latency_ms'] = {key: value for key, value in latency.summary(0).items()
+                               if key.endswith('_ms')}
+        print("Live: processed {frames_processed}/{frames_grabbed} frames ({frames_dropped} dropped), "
+              "{processed_fps:.1f} fps".format(**stats))
+        print("Live latency: p50 {p50_ms:.0f} ms, p95 {p95_ms:.0f} ms, max {max_ms:.0f} ms".format(**stats['latency_ms']))
+        self.pipeline_stats.emit(stats)
+        self.processing_finished.emit()
+
+    def run_multi_athlete(self):
+        """Decode, per-athlete pose inference and rendering of a video with several servers in it"""
+        from vision.multi_athlete import MultiPoseRunner
+
+        # Open the video first, so an unreadable one doesn't leave the runner's threads behind
+        decoder = self.open_decoder()
+        runner = MultiPoseRunner(max_athletes=self.max_athletes)
+        last_rendered = [None]
+
+        def run_inference(item):
+            frame_index, timestamp, frame = item
+            return frame, runner.process(frame_index, timestamp, frame)
+
+        def render(item):
+            frame, pose_frames = item
+            now = time.perf_counter()
+            if last_rendered[0] is not None:
+                profiler.record('frame', now - last_rendered[0])
+            last_rendered[0] = now
+
+            def annotate(image):
+                for track_id, pose_frame in pose_frames.items():
+                    draw_pose(image, pose_frame.landmarks)
+                    draw_label(image, f"#{track_id}", pose_frame.landmarks)
+
+            if self.display is not None:
+                if self.display.wants_frame():
+                    start = profiler.start()
+                    notify = self.display.submit(frame, annotate)
+                    profiler.stop('draw', start)
+                    if notify:
+                        self.display_frame_ready.emit()
+            else:
+                annotated_frame = frame.copy()
+                annotate(annotated_frame)
+                self.frame_processed.emit(annotated_frame)
+
+            for track_id, pose_frame in pose_frames.items():
+                self.athlete_pose_extracted.emit(track_id, pose_frame)
+
+        self.pipeline = StagedPipeline(
+            self.decode_frames(decoder),
+            [('inference', run_inference), ('render', render)],
+            queue_depths=list(self.queue_depths))
+        if not self._run_flag:
+            self.pipeline.stop()
+
+        try:
+            stats = self.pipeline.run()
+        finally:
+            decoder.close()
+            runner.close()
+
+        print(format_stats(stats))
+        self.pipeline_stats.emit(stats)
+        self.processing_finished.emit()
+
+    def run_chunked(self):
+        """Extract landmarks in parallel worker processes, then emit them in frame order"""
+        try:
+            records = extract_pose_records(self.video_path, self.workers,
+                                           should_stop=lambda: not self._run_flag)
+        except (OSError, BrokenProcessPool) as e:
+            # Raised again here from the worker that could not read its segment, or a crashed worker
+            self.fail(e)
+            return
+        if records is None:
+            self.processing_finished.emit()
+            return
+
+        if self.landmark_cache is not None:
+            self.landmark_cache.store_records(self.video_path, records, self.cache_decode)
+        for pose_frame in iter_cached_frames(records):
+            if not self._run_flag:
+                break
+            self.pose_data_extracted.emit(pose_frame)
+        self.processing_finished.emit()
+
+    def replay_cached(self, records):
+        """Feed cached landmarks to the analysis engine without decoding the video"""
+        print(f"Landmark cache hit: replaying {len(records)} frames")
+        for pose_frame in iter_cached_frames(records):
+            if not self._run_flag:
+                break
+            self.pose_data_extracted.emit(pose_frame)
         self.processing_finished.emit()
 
     def stop(self):
         self._run_flag = False
-        self.wait()
\ No newline at end of file
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        self.wait()